@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import Recurso
+
+
+@admin.register(Recurso)
+class RecursoAdmin(admin.ModelAdmin):
+    list_display = ("nombre", "tipo", "activo", "actualizado")
+    list_filter = ("tipo", "activo")
+    search_fields = ("nombre",)
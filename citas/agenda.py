@@ -0,0 +1,218 @@
+"""
+Conflictos de agenda y capacidad del taller.
+
+Una cita ocupa [fecha_inicio, fecha_fin) salvo que esté cancelada o marcada
+como no asistida. Al guardarla se rechaza si:
+
+- el mismo vehículo tiene otra cita que se cruza,
+- el recurso asignado (bahía o técnico) ya está ocupado en ese intervalo,
+- en algún instante del intervalo se superaría la capacidad del taller
+  (número de bahías activas; sin bahías configuradas no hay límite).
+
+Los solapamientos se buscan con ``inicio < otro_fin AND fin > otro_inicio``.
+Para que sea un rango sobre los índices (vehiculo, fecha_inicio),
+(recurso, fecha_inicio) y fecha_inicio, la búsqueda se acota a las citas que
+empiezan desde ``inicio - duración máxima`` (``CITAS_DURACION_MAXIMA_HORAS``);
+por eso las citas no pueden durar más que eso. La capacidad se mide con un
+barrido (sweep line) sobre las citas de la ventana.
+
+``guardar`` valida y guarda en una transacción que serializa a los escritores
+(bloqueo de filas donde la base lo soporta, cerrojo de escritura en SQLite),
+así dos reservas simultáneas no pueden ocupar el mismo hueco.
+``verificar_lote`` aplica las mismas reglas en memoria a muchas citas a la vez
+(``python manage.py verificar_agenda``).
+"""
+from __future__ import annotations
+
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import F
+
+from vehiculos.models import Vehiculo
+
+from .models import Cita, Recurso
+
+# Estados que no ocupan la agenda
+ESTADOS_LIBRES = ("cancelada", "no_show")
+
+
+class Conflicto(NamedTuple):
+    tipo: str  # "vehiculo" | "recurso" | "capacidad"
+    mensaje: str
+    citas: Tuple[int, ...]
+
+
+def duracion_maxima() -> timedelta:
+    return timedelta(hours=getattr(settings, "CITAS_DURACION_MAXIMA_HORAS", 168))
+
+
+def capacidad() -> Optional[int]:
+    """Citas simultáneas admitidas: bahías activas (None si no hay bahías configuradas)."""
+    return Recurso.objects.filter(tipo=Recurso.Tipo.BAHIA, activo=True).count() or None
+
+
+def ocupantes(inicio, fin, excluir_pk=None):
+    """Citas que ocupan algún instante de [inicio, fin), como rango sobre fecha_inicio."""
+    qs = Cita.objects.filter(
+        fecha_inicio__gte=inicio - duracion_maxima(),
+        fecha_inicio__lt=fin,
+        fecha_fin__gt=inicio,
+    ).exclude(estado__in=ESTADOS_LIBRES)
+    if excluir_pk:
+        qs = qs.exclude(pk=excluir_pk)
+    return qs
+
+
+def max_simultaneas(intervalos: Iterable[Tuple[object, object]]) -> int:
+    """Máximo de intervalos [inicio, fin) superpuestos en un mismo instante (barrido)."""
+    eventos = []
+    for inicio, fin in intervalos:
+        eventos.append((inicio, 1))
+        eventos.append((fin, -1))
+    # En el mismo instante los fines van antes que los inicios: [a, b) y [b, c) no se cruzan
+    eventos.sort(key=lambda e: (e[0], e[1]))
+    actual = maximo = 0
+    for _, delta in eventos:
+        actual += delta
+        maximo = max(maximo, actual)
+    return maximo
+
+
+def conflictos(
+    inicio,
+    fin,
+    vehiculo_id=None,
+    recurso_id=None,
+    excluir_pk=None,
+    estado=None,
+    cap: Optional[int] = None,
+) -> List[Conflicto]:
+    """Conflictos que tendría una cita en [inicio, fin) (lista vacía si cabe)."""
+    if estado in ESTADOS_LIBRES or not (inicio and fin) or fin <= inicio:
+        return []
+    encontrados = []
+    candidatos = ocupantes(inicio, fin, excluir_pk)
+
+    if vehiculo_id:
+        ids = tuple(candidatos.filter(vehiculo_id=vehiculo_id).values_list("pk", flat=True)[:5])
+        if ids:
+            encontrados.append(Conflicto("vehiculo", "El vehículo ya tiene otra cita en ese horario.", ids))
+
+    if recurso_id:
+        ids = tuple(candidatos.filter(recurso_id=recurso_id).values_list("pk", flat=True)[:5])
+        if ids:
+            encontrados.append(Conflicto("recurso", "El recurso asignado ya está ocupado en ese horario.", ids))
+
+    cap = capacidad() if cap is None else cap
+    if cap:
+        filas = list(candidatos.values_list("pk", "fecha_inicio", "fecha_fin"))
+        # Con menos citas que bahías no hace falta barrer
+        if len(filas) >= cap:
+            ocupadas = max_simultaneas((max(i, inicio), min(f, fin)) for _, i, f in filas)
+            if ocupadas >= cap:
+                encontrados.append(
+                    Conflicto(
+                        "capacidad",
+                        f"El taller ya tiene {ocupadas} citas simultáneas en ese horario (capacidad {cap}).",
+                        tuple(pk for pk, _, _ in filas[:5]),
+                    )
+                )
+    return encontrados
+
+
+def verificar(cita: Cita) -> None:
+    """``ValidationError`` con los conflictos de ``cita`` (sin bloquear)."""
+    if cita.fecha_inicio and cita.fecha_fin and cita.fecha_fin - cita.fecha_inicio > duracion_maxima():
+        horas = int(duracion_maxima().total_seconds() // 3600)
+        raise ValidationError({"fecha_fin": f"Una cita no puede durar más de {horas} horas."})
+    encontrados = conflictos(
+        cita.fecha_inicio,
+        cita.fecha_fin,
+        vehiculo_id=cita.vehiculo_id,
+        recurso_id=cita.recurso_id,
+        excluir_pk=cita.pk,
+        estado=cita.estado,
+    )
+    if encontrados:
+        raise ValidationError([c.mensaje for c in encontrados])
+
+
+def _bloquear(vehiculo_id) -> None:
+    """Serializa las reservas hasta el final de la transacción."""
+    if connection.features.has_select_for_update:
+        # El vehículo y todos los recursos activos (la capacidad es global)
+        list(Vehiculo.objects.select_for_update().filter(pk=vehiculo_id).values_list("pk", flat=True))
+        list(Recurso.objects.select_for_update().filter(activo=True).values_list("pk", flat=True))
+    else:
+        # SQLite no bloquea filas: una escritura inocua toma el cerrojo de escritura de la
+        # base antes de leer la agenda, y otra reserva espera a que esta termine.
+        Vehiculo.objects.filter(pk=vehiculo_id).update(actualizado=F("actualizado"))
+
+
+def guardar(cita: Cita, **kwargs) -> Cita:
+    """Verifica conflictos y guarda ``cita`` de forma atómica; ``ValidationError`` si no cabe."""
+    with transaction.atomic():
+        _bloquear(cita.vehiculo_id)
+        verificar(cita)
+        cita.save(**kwargs)
+    return cita
+
+
+def verificar_lote(
+    citas: Iterable[Sequence],
+    cap: Optional[int] = None,
+) -> List[Conflicto]:
+    """
+    Conflictos entre las citas dadas como tuplas (pk, inicio, fin, vehiculo_id, recurso_id),
+    en memoria y en O(n log n): un barrido por inicio con un heap de las citas en curso.
+    Cada solapamiento por vehículo o recurso se informa una vez (par de citas) y la
+    capacidad una vez por tramo en que se supera.
+    """
+    ordenadas = sorted(citas, key=lambda c: (c[1], c[2]))
+    en_curso = []  # heap (fin, pk)
+    por_vehiculo = defaultdict(set)
+    por_recurso = defaultdict(set)
+    datos = {}
+    encontrados = []
+    excedido = False
+    for pk, inicio, fin, vehiculo_id, recurso_id in ordenadas:
+        while en_curso and en_curso[0][0] <= inicio:
+            _, terminado = heapq.heappop(en_curso)
+            v, r = datos.pop(terminado)
+            por_vehiculo[v].discard(terminado)
+            if r:
+                por_recurso[r].discard(terminado)
+        if not en_curso:
+            excedido = False
+
+        for otro in sorted(por_vehiculo[vehiculo_id]):
+            encontrados.append(Conflicto("vehiculo", f"Citas {otro} y {pk} se cruzan para el mismo vehículo.", (otro, pk)))
+        if recurso_id:
+            for otro in sorted(por_recurso[recurso_id]):
+                encontrados.append(Conflicto("recurso", f"Citas {otro} y {pk} se cruzan en el mismo recurso.", (otro, pk)))
+
+        heapq.heappush(en_curso, (fin, pk))
+        datos[pk] = (vehiculo_id, recurso_id)
+        por_vehiculo[vehiculo_id].add(pk)
+        if recurso_id:
+            por_recurso[recurso_id].add(pk)
+
+        if cap and len(en_curso) > cap:
+            if not excedido:
+                encontrados.append(
+                    Conflicto(
+                        "capacidad",
+                        f"{len(en_curso)} citas simultáneas desde la cita {pk} (capacidad {cap}).",
+                        tuple(sorted(p for _, p in en_curso)),
+                    )
+                )
+            excedido = True
+        elif cap:
+            excedido = False
+    return encontrados
@@ -7,4 +7,7 @@ from django.apps import AppConfig
 class CitasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'citas'
-    verbose_name = 'Citas'
\ No newline at end of file
+    verbose_name = 'Citas'
+
+    def ready(self):
+        from . import signals  # noqa: F401
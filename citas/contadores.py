@@ -0,0 +1,148 @@
+"""
+Contadores de actividad guardados en Cliente, Vehiculo y Servicio.
+
+``citas_count`` y ``ultima_cita`` (inicio de la cita más reciente) en los tres
+modelos, y ``vehiculos_count`` en Cliente, reemplazan los ``Count``/``Max``
+sobre citas y vehículos que hacían las listas. Las señales de
+``citas.signals`` los ajustan con un UPDATE atómico por fila (``F()``): sumar
+o restar no pierde cambios con escrituras concurrentes. ``ultima_cita`` solo
+se vuelve a leer de la tabla de citas cuando se quita o mueve la cita que la
+define.
+
+Un ``save()`` ordinario de esos modelos deja fuera los contadores (ver
+``citas.contadores_modelo``): una instancia leída antes de un cambio no los pisa.
+
+Las escrituras masivas (``bulk_create``, ``update``, borrados en SQL) no emiten
+señales: ``python manage.py recount`` recalcula o verifica todo y
+``recalcular(instancia)`` repara una sola fila.
+"""
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+from django.db.models import Case, Count, F, IntegerField, Max, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from clientes.models import Cliente
+from servicios.models import Servicio
+from vehiculos.models import Vehiculo
+
+from .models import Cita
+
+# FK de la cita -> modelo que lleva sus contadores
+PADRES = (("cliente_id", Cliente), ("vehiculo_id", Vehiculo), ("servicio_id", Servicio))
+
+
+def _sumar(campo: str, delta: int):
+    if delta > 0:
+        return F(campo) + delta
+    # Nunca bajo cero (columna positiva): un contador desfasado lo arregla ``recount``
+    return Greatest(F(campo) + delta, Value(0))
+
+
+def _ultima_en_tabla(fk: str):
+    return Subquery(
+        Cita.objects.filter(**{fk: OuterRef("pk")}).order_by("-fecha_inicio").values("fecha_inicio")[:1]
+    )
+
+
+def _ajustar(modelo, fk: str, pk, delta: int = 0, quitar=None, poner=None) -> None:
+    """Suma ``delta`` citas al padre ``pk``; ``quitar``/``poner`` son inicios que salen o entran."""
+    if not pk:
+        return
+    cambios = {}
+    if delta:
+        cambios["citas_count"] = _sumar("citas_count", delta)
+    if poner or quitar:
+        ultima = F("ultima_cita")
+        if poner:
+            ultima = Greatest(Coalesce(F("ultima_cita"), Value(poner)), Value(poner))
+        if quitar:
+            # Si salía la más reciente, la tabla (ya sin ella) dice cuál es la nueva
+            ultima = Case(When(ultima_cita=quitar, then=_ultima_en_tabla(fk)), default=ultima)
+        cambios["ultima_cita"] = ultima
+    if cambios:
+        modelo.objects.filter(pk=pk).update(**cambios)
+
+
+def cita_guardada(cita: Cita, previa: Optional[Dict] = None) -> None:
+    """Ajusta los contadores tras crear (``previa`` None) o modificar una cita."""
+    for fk, modelo in PADRES:
+        actual = getattr(cita, fk)
+        if previa is None:
+            _ajustar(modelo, fk, actual, +1, poner=cita.fecha_inicio)
+        elif previa[fk] != actual:
+            _ajustar(modelo, fk, previa[fk], -1, quitar=previa["fecha_inicio"])
+            _ajustar(modelo, fk, actual, +1, poner=cita.fecha_inicio)
+        elif previa["fecha_inicio"] != cita.fecha_inicio:
+            _ajustar(modelo, fk, actual, quitar=previa["fecha_inicio"], poner=cita.fecha_inicio)
+
+
+def cita_borrada(cita: Cita) -> None:
+    for fk, modelo in PADRES:
+        _ajustar(modelo, fk, getattr(cita, fk), -1, quitar=cita.fecha_inicio)
+
+
+def vehiculo_guardado(vehiculo: Vehiculo, cliente_previo=None) -> None:
+    """Tras crear un vehículo (``cliente_previo`` None) o cambiarlo de cliente."""
+    if cliente_previo == vehiculo.cliente_id:
+        return
+    if cliente_previo:
+        Cliente.objects.filter(pk=cliente_previo).update(vehiculos_count=_sumar("vehiculos_count", -1))
+    Cliente.objects.filter(pk=vehiculo.cliente_id).update(vehiculos_count=_sumar("vehiculos_count", +1))
+
+
+def vehiculo_borrado(vehiculo: Vehiculo) -> None:
+    Cliente.objects.filter(pk=vehiculo.cliente_id).update(vehiculos_count=_sumar("vehiculos_count", -1))
+
+
+# ---------- Recuento ----------
+def _conteo(modelo, fk: str):
+    filas = modelo.objects.filter(**{fk: OuterRef("pk")}).order_by().values(fk).annotate(n=Count("pk")).values("n")
+    return Coalesce(Subquery(filas, output_field=IntegerField()), Value(0))
+
+
+def _ultima(fk: str):
+    filas = Cita.objects.filter(**{fk: OuterRef("pk")}).order_by().values(fk).annotate(m=Max("fecha_inicio")).values("m")
+    return Subquery(filas)
+
+
+def _valores(modelo, fk: str) -> Dict:
+    valores = {"citas_count": _conteo(Cita, fk), "ultima_cita": _ultima(fk)}
+    if modelo is Cliente:
+        valores["vehiculos_count"] = _conteo(Vehiculo, "cliente_id")
+    return valores
+
+
+def _igual(campo: str, real: str) -> Q:
+    return Q(**{campo: F(real)}) | Q(**{f"{campo}__isnull": True, f"{real}__isnull": True})
+
+
+def desajustes() -> Dict[str, int]:
+    """Filas cuyo contador guardado no coincide con las tablas, por modelo."""
+    resultado = {}
+    for fk, modelo in PADRES:
+        valores = _valores(modelo, fk)
+        coincide = Q()
+        for campo in valores:
+            coincide &= _igual(campo, f"real_{campo}")
+        # Case: una comparación con NULL cuenta como distinta, no se descarta
+        qs = modelo.objects.annotate(**{f"real_{campo}": expr for campo, expr in valores.items()}).annotate(
+            coincide_contadores=Case(When(coincide, then=Value(1)), default=Value(0), output_field=IntegerField())
+        )
+        resultado[modelo._meta.label] = qs.filter(coincide_contadores=0).count()
+    return resultado
+
+
+def recontar() -> Dict[str, int]:
+    """Recalcula todos los contadores desde las tablas (un UPDATE por modelo)."""
+    return {modelo._meta.label: modelo.objects.update(**_valores(modelo, fk)) for fk, modelo in PADRES}
+
+
+def recalcular(instancia) -> None:
+    """Recalcula desde las tablas los contadores de un Cliente, Vehiculo o Servicio y los recarga."""
+    modelo = type(instancia)
+    fk = next(fk for fk, padre in PADRES if padre is modelo)
+    valores = _valores(modelo, fk)
+    modelo.objects.filter(pk=instancia.pk).update(**valores)
+    instancia.refresh_from_db(fields=list(valores))
@@ -0,0 +1,34 @@
+"""
+``save()`` de los modelos con contadores de actividad (ver ``citas.contadores``).
+
+Vive aparte de ``citas.contadores`` porque Cliente, Vehiculo y Servicio lo
+heredan y ese módulo importa esos modelos.
+"""
+from __future__ import annotations
+
+from typing import Tuple
+
+
+class ContadoresMixin:
+    """
+    Deja fuera de un ``save()`` ordinario los campos de ``CONTADORES``.
+
+    Esos campos los mantiene ``citas.contadores`` con UPDATE atómicos
+    (``F()``): una instancia leída antes de un cambio no debe pisarlos al
+    guardarse. Para repararlos, ``contadores.recalcular(instancia)``.
+
+    Solo afecta a instancias ya guardadas o leídas de la base
+    (``_state.adding`` False) y sin ``update_fields``/``force_insert``
+    explícitos. Como el UPDATE lleva ``update_fields``, guardar una de ellas
+    cuya fila ya se borró lanza ``DatabaseError`` en lugar de volver a
+    insertarla, como cualquier ``save(update_fields=...)`` de Django.
+    """
+
+    CONTADORES: Tuple[str, ...] = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name not in self.CONTADORES
+            ]
+        super().save(*args, **kwargs)
@@ -0,0 +1,211 @@
+"""
+Huecos libres para agendar un servicio.
+
+Para cada día de la ventana se toman las citas que ocupan ese día (una sola
+consulta para todos los días que no están en caché, ver ``agenda.ocupantes``)
+y un barrido (sweep line) calcula los tramos en que el taller tiene capacidad
+libre dentro del horario de atención; los huecos son los inicios, alineados a
+``CITAS_INTERVALO_MINUTOS`` desde la apertura, en los que cabe la duración
+del servicio. Opcionalmente se excluyen los tramos en que el vehículo o el
+recurso pedidos ya están ocupados.
+
+Horario: ``CITAS_HORARIO`` = {día de la semana (0 = lunes): ("08:00", "18:00")};
+los días ausentes están cerrados.
+
+Caché: los intervalos ocupados de cada día se guardan bajo una generación por
+día; las señales de ``Cita`` incrementan la generación de los días que tocaba
+la cita antes y después del cambio (ver ``citas.signals``). Generaciones y
+entradas viven en el alias de ``dashboard.cache`` y siguen sus reglas: si ese
+alias es local a cada proceso, ninguna dura más de ``DASHBOARD_CACHE_TTL_LOCAL``
+segundos, lo más que otro worker puede seguir ofreciendo un hueco ya reservado.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from dashboard import cache as dashboard_cache
+
+from . import agenda
+
+HORARIO_DEFECTO = {
+    0: ("08:00", "18:00"),
+    1: ("08:00", "18:00"),
+    2: ("08:00", "18:00"),
+    3: ("08:00", "18:00"),
+    4: ("08:00", "18:00"),
+    5: ("08:00", "13:00"),
+}
+MAX_DIAS = 31
+CACHE_TIMEOUT = 24 * 3600
+
+# (inicio, fin, vehiculo_id, recurso_id)
+Intervalo = Tuple[datetime, datetime, int, Optional[int]]
+
+
+def horario() -> dict:
+    return getattr(settings, "CITAS_HORARIO", HORARIO_DEFECTO)
+
+
+def intervalo_minutos() -> int:
+    return int(getattr(settings, "CITAS_INTERVALO_MINUTOS", 30))
+
+
+def _hora(valor: str) -> time:
+    horas, minutos = valor.split(":")
+    return time(int(horas), int(minutos))
+
+
+def atencion(dia: date) -> Optional[Tuple[datetime, datetime]]:
+    """Apertura y cierre (datetimes locales) del día, o None si está cerrado."""
+    franja = horario().get(dia.weekday())
+    if not franja:
+        return None
+    apertura, cierre = (timezone.make_aware(datetime.combine(dia, _hora(h))) for h in franja)
+    return (apertura, cierre) if cierre > apertura else None
+
+
+def _inicio_dia(dia: date) -> datetime:
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def dias_de(inicio: datetime, fin: datetime) -> List[date]:
+    """Días locales que toca el intervalo [inicio, fin)."""
+    primero = timezone.localtime(inicio).date()
+    ultimo = timezone.localtime(fin - timedelta(microseconds=1)).date()
+    return [primero + timedelta(days=i) for i in range((ultimo - primero).days + 1)]
+
+
+# ---------- Caché por día ----------
+def _clave_generacion(dia: date) -> str:
+    return f"citas:disponibilidad:gen:{dia:%Y-%m-%d}"
+
+
+def _generaciones(dias: Sequence[date]) -> dict:
+    claves = {dia: _clave_generacion(dia) for dia in dias}
+    actuales = dashboard_cache.generaciones(claves.values())
+    return {dia: actuales[clave] for dia, clave in claves.items()}
+
+
+def invalidar_dias(dias: Iterable[date]) -> None:
+    """Deja obsoletos los intervalos cacheados de esos días."""
+    for dia in set(dias):
+        dashboard_cache.incrementar(_clave_generacion(dia))
+
+
+def ocupados(dias: Sequence[date]) -> dict:
+    """{día: [Intervalo]} con las citas que ocupan cada día (una consulta para los que falten)."""
+    cache = dashboard_cache.cache()
+    generaciones = _generaciones(dias)
+    claves = {dia: f"citas:disponibilidad:{generaciones[dia]}:{dia:%Y-%m-%d}" for dia in dias}
+    cacheados = cache.get_many(claves.values())
+    resultado = {dia: cacheados[clave] for dia, clave in claves.items() if clave in cacheados}
+    faltantes = [dia for dia in dias if dia not in resultado]
+    if faltantes:
+        por_dia = {dia: [] for dia in faltantes}
+        desde, hasta = _inicio_dia(min(faltantes)), _inicio_dia(max(faltantes) + timedelta(days=1))
+        filas = agenda.ocupantes(desde, hasta).order_by().values_list(
+            "fecha_inicio", "fecha_fin", "vehiculo_id", "recurso_id"
+        )
+        for fila in filas:
+            for dia in dias_de(fila[0], fila[1]):
+                if dia in por_dia:
+                    por_dia[dia].append(tuple(fila))
+        cache.set_many(
+            {claves[dia]: filas_dia for dia, filas_dia in por_dia.items()},
+            timeout=dashboard_cache.vigencia(CACHE_TIMEOUT),
+        )
+        resultado.update(por_dia)
+    return resultado
+
+
+# ---------- Barrido ----------
+def tramos_libres(
+    apertura: datetime,
+    cierre: datetime,
+    intervalos: Iterable[Intervalo],
+    cap: Optional[int],
+    vehiculo_id=None,
+    recurso_id=None,
+) -> List[Tuple[datetime, datetime]]:
+    """
+    Tramos de [apertura, cierre) con menos de ``cap`` citas en curso (sin límite si es None)
+    y sin citas del vehículo/recurso indicados.
+    """
+    limite = cap or 1
+    eventos = []
+    for inicio, fin, vehiculo, recurso in intervalos:
+        bloquea = (vehiculo_id and vehiculo == vehiculo_id) or (recurso_id and recurso == recurso_id)
+        # Una cita del mismo vehículo/recurso llena el taller; sin capacidad solo cuentan esas
+        peso = limite if bloquea else (1 if cap else 0)
+        if peso and fin > apertura and inicio < cierre:
+            eventos.append((max(inicio, apertura), peso))
+            eventos.append((min(fin, cierre), -peso))
+    eventos.sort(key=lambda e: (e[0], e[1]))
+
+    libres = []
+    carga = 0
+    desde = apertura
+    for instante, delta in eventos:
+        antes = carga
+        carga += delta
+        if antes < limite <= carga:
+            if instante > desde:
+                libres.append((desde, instante))
+        elif carga < limite <= antes:
+            desde = instante
+    if carga < limite and cierre > desde:
+        libres.append((desde, cierre))
+    return libres
+
+
+def huecos(
+    apertura: datetime,
+    libres: Sequence[Tuple[datetime, datetime]],
+    duracion: timedelta,
+    paso: timedelta,
+    no_antes_de: Optional[datetime] = None,
+) -> List[datetime]:
+    """Inicios alineados a ``paso`` desde la apertura en los que cabe ``duracion``."""
+    inicios = []
+    for desde, hasta in libres:
+        if no_antes_de and no_antes_de > desde:
+            desde = no_antes_de
+        # Primer múltiplo de ``paso`` (desde la apertura) que no sea anterior a ``desde``
+        pasos = -(-(desde - apertura) // paso)
+        t = apertura + pasos * paso
+        while t + duracion <= hasta:
+            inicios.append(t)
+            t += paso
+    return inicios
+
+
+def disponibilidad(
+    duracion: timedelta,
+    desde: date,
+    dias: int,
+    vehiculo_id=None,
+    recurso_id=None,
+    cap: Optional[int] = None,
+) -> List[dict]:
+    """Huecos por día: [{"fecha": date, "huecos": [(inicio, fin), ...]}, ...]."""
+    fechas = [desde + timedelta(days=i) for i in range(dias)]
+    abiertos = {dia: atencion(dia) for dia in fechas}
+    ocupado = ocupados([dia for dia, franja in abiertos.items() if franja])
+    cap = agenda.capacidad() if cap is None else cap
+    paso = timedelta(minutes=intervalo_minutos())
+    ahora = timezone.now()
+
+    resultado = []
+    for dia in fechas:
+        franja = abiertos[dia]
+        inicios = []
+        if franja and franja[1] > ahora:
+            apertura, cierre = franja
+            libres = tramos_libres(apertura, cierre, ocupado[dia], cap, vehiculo_id, recurso_id)
+            inicios = huecos(apertura, libres, duracion, paso, no_antes_de=ahora)
+        resultado.append({"fecha": dia, "huecos": [(t, t + duracion) for t in inicios]})
+    return resultado
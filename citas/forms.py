@@ -2,32 +2,44 @@
 from datetime import timedelta
 
 from django import forms
+from django.urls import reverse_lazy
 
-from .models import Cita
+from . import agenda
+from .models import Cita, Recurso
+from clientes.forms import CAMPOS_SELECTOR, etiqueta_cliente
 from clientes.models import Cliente
+from dashboard.widgets import SelectRemoto
 from servicios.models import Servicio
 from vehiculos.models import Vehiculo
 
 _DT_FORMAT = "%Y-%m-%dT%H:%M"  # para input type="datetime-local"
 
 # Campos base obligatorios (ajusta si tus nombres difieren)
-_BASE_FIELDS = ["cliente", "vehiculo", "servicio", "fecha_inicio", "fecha_fin", "estado"]
+_BASE_FIELDS = ["cliente", "vehiculo", "servicio", "recurso", "fecha_inicio", "fecha_fin", "estado"]
 # Añadimos 'notas' solo si existe en el modelo
 if hasattr(Cita, "notas"):
     _BASE_FIELDS.append("notas")
 
 class CitaForm(forms.ModelForm):
+    # Solo se renderiza el cliente elegido; el resto se busca (clientes:api_buscar)
     cliente = forms.ModelChoiceField(
-        queryset=Cliente.objects.all().order_by("nombre"),
+        queryset=Cliente.objects.all(),
         required=True,
         label="Cliente",
-        help_text="Selecciona el cliente",
+        help_text="Busca por nombre, documento o teléfono",
+        widget=SelectRemoto(reverse_lazy("clientes:api_buscar"), placeholder="Buscar cliente por nombre, documento o teléfono…"),
     )
     servicio = forms.ModelChoiceField(
         queryset=Servicio.objects.filter(activo=True).order_by("nombre"),
         required=True,
         label="Servicio",
     )
+    recurso = forms.ModelChoiceField(
+        queryset=Recurso.objects.filter(activo=True),
+        required=False,
+        label="Bahía / técnico",
+        empty_label="Sin asignar",
+    )
 
     class Meta:
         model = Cita
@@ -42,9 +54,9 @@ class CitaForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Etiqueta enriquecida para cliente
-        self.fields["cliente"].label_from_instance = (
-            lambda c: f"{c.nombre}" + (f" · {getattr(c, 'telefono', '')}" if getattr(c, 'telefono', '') else "")
+        # Etiqueta enriquecida para cliente (la misma que devuelve la búsqueda)
+        self.fields["cliente"].label_from_instance = lambda c: etiqueta_cliente(
+            {campo: getattr(c, campo) for campo in CAMPOS_SELECTOR}
         )
         # Vehículos dinámicos según cliente
         self.fields["vehiculo"].queryset = Vehiculo.objects.none()
@@ -73,4 +85,21 @@ class CitaForm(forms.ModelForm):
 
         if fi and ff and ff <= fi:
             self.add_error("fecha_fin", "La fecha fin debe ser posterior a la fecha inicio.")
+        elif fi and ff and ff - fi > agenda.duracion_maxima():
+            horas = int(agenda.duracion_maxima().total_seconds() // 3600)
+            self.add_error("fecha_fin", f"Una cita no puede durar más de {horas} horas.")
+        elif fi and ff and not self.errors:
+            # Aviso temprano; la vista vuelve a verificar con la agenda bloqueada al guardar
+            vehiculo = cleaned.get("vehiculo")
+            recurso = cleaned.get("recurso")
+            campos = {"vehiculo": "vehiculo", "recurso": "recurso", "capacidad": None}
+            for conflicto in agenda.conflictos(
+                fi,
+                ff,
+                vehiculo_id=vehiculo.pk if vehiculo else None,
+                recurso_id=recurso.pk if recurso else None,
+                excluir_pk=self.instance.pk,
+                estado=cleaned.get("estado"),
+            ):
+                self.add_error(campos[conflicto.tipo], conflicto.mensaje)
         return cleaned
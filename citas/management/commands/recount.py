@@ -0,0 +1,44 @@
+"""
+Recalcula los contadores de actividad desnormalizados (``citas.contadores``):
+citas y vehículos por cliente, citas por vehículo y por servicio, y la fecha de
+la última cita de cada uno. Sirve tras cargas masivas sin señales o para
+reparar desajustes.
+
+Uso:
+    python manage.py recount
+    python manage.py recount --verificar      # solo informa, no escribe
+"""
+from __future__ import annotations
+
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from citas import contadores
+
+
+class Command(BaseCommand):
+    help = "Recalcula citas_count, vehiculos_count y ultima_cita de clientes, vehículos y servicios."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verificar", action="store_true", help="Cuenta las filas desajustadas sin corregirlas.")
+        parser.add_argument("--estricto", action="store_true", help="Con --verificar, termina con error si hay desajustes.")
+
+    def handle(self, *args, **options):
+        inicio = perf_counter()
+        if options["verificar"]:
+            desajustes = contadores.desajustes()
+            for modelo, n in desajustes.items():
+                self.stdout.write(f"{modelo}: {n} fila(s) desajustada(s)")
+            resumen = f"Verificación en {perf_counter() - inicio:.2f}s; {sum(desajustes.values())} desajuste(s)."
+            if sum(desajustes.values()) and options["estricto"]:
+                raise CommandError(resumen)
+            self.stdout.write(self.style.WARNING(resumen) if sum(desajustes.values()) else self.style.SUCCESS(resumen))
+            return
+
+        with transaction.atomic():
+            filas = contadores.recontar()
+        for modelo, n in filas.items():
+            self.stdout.write(f"{modelo}: {n} fila(s)")
+        self.stdout.write(self.style.SUCCESS(f"Contadores recalculados en {perf_counter() - inicio:.2f}s."))
@@ -0,0 +1,66 @@
+"""
+Revisa la agenda en bloque: citas del mismo vehículo o recurso que se cruzan
+y tramos que superan la capacidad del taller (bahías activas).
+
+Las citas se leen con una sola consulta y se verifican en memoria con un
+barrido (``citas.agenda.verificar_lote``).
+
+Uso:
+    python manage.py verificar_agenda                  # desde hoy
+    python manage.py verificar_agenda --desde 2024-01-01 --hasta 2024-12-31 --estricto
+"""
+from __future__ import annotations
+
+from datetime import datetime, time
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from citas import agenda
+from citas.models import Cita
+
+
+def _fecha(valor, nombre):
+    dia = parse_date(valor)
+    if dia is None:
+        raise CommandError(f"--{nombre} inválido: use AAAA-MM-DD.")
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+class Command(BaseCommand):
+    help = "Detecta solapamientos por vehículo/recurso y excesos de capacidad en la agenda."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", help="AAAA-MM-DD (por defecto hoy).")
+        parser.add_argument("--hasta", help="AAAA-MM-DD (por defecto sin límite).")
+        parser.add_argument("--max-conflictos", type=int, default=50, help="Conflictos a listar.")
+        parser.add_argument("--estricto", action="store_true", help="Termina con error si hay conflictos.")
+
+    def handle(self, *args, **options):
+        desde = _fecha(options["desde"], "desde") if options["desde"] else timezone.make_aware(
+            datetime.combine(timezone.localdate(), time.min)
+        )
+        qs = Cita.objects.exclude(estado__in=agenda.ESTADOS_LIBRES).filter(fecha_fin__gt=desde)
+        if options["hasta"]:
+            qs = qs.filter(fecha_inicio__lt=_fecha(options["hasta"], "hasta"))
+
+        inicio = perf_counter()
+        filas = list(qs.order_by().values_list("pk", "fecha_inicio", "fecha_fin", "vehiculo_id", "recurso_id"))
+        cap = agenda.capacidad()
+        encontrados = agenda.verificar_lote(filas, cap=cap)
+        duracion = perf_counter() - inicio
+
+        for conflicto in encontrados[: options["max_conflictos"]]:
+            self.stdout.write(f"[{conflicto.tipo}] {conflicto.mensaje}")
+        if len(encontrados) > options["max_conflictos"]:
+            self.stdout.write(f"… y {len(encontrados) - options['max_conflictos']} más.")
+
+        resumen = (
+            f"{len(filas)} citas revisadas en {duracion * 1000:.0f} ms "
+            f"(capacidad: {cap or 'sin límite'}); {len(encontrados)} conflicto(s)."
+        )
+        if encontrados and options["estricto"]:
+            raise CommandError(resumen)
+        self.stdout.write(self.style.WARNING(resumen) if encontrados else self.style.SUCCESS(resumen))
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.24 on 2026-10-17 00:00
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def congelar_precios(apps, schema_editor):
+    # Sin historial de precios, las citas existentes toman el precio/costo actual del servicio.
+    Cita = apps.get_model("citas", "Cita")
+    Servicio = apps.get_model("servicios", "Servicio")
+    servicio = Servicio.objects.filter(pk=OuterRef("servicio_id"))
+    Cita.objects.update(
+        precio_servicio=Subquery(servicio.values("precio")[:1]),
+        costo_servicio=Subquery(servicio.values("costo")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citas', '0002_remove_vehiculo_cliente_and_more'),
+        ('servicios', '0002_servicio_costo_alter_servicio_duracion_minutos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cita',
+            name='costo_servicio',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='cita',
+            name='precio_servicio',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.RunPython(congelar_precios, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.24 on 2026-10-17 00:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citas', '0003_cita_precio_costo_servicio'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cita',
+            index=models.Index(fields=['actualizado'], name='citas_cita_actuali_4df551_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.24 on 2026-10-17 00:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citas', '0004_cita_citas_cita_actuali_4df551_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recurso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=60, unique=True)),
+                ('tipo', models.CharField(choices=[('bahia', 'Bahía'), ('tecnico', 'Técnico')], default='bahia', max_length=10)),
+                ('activo', models.BooleanField(default=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'recurso',
+                'verbose_name_plural': 'recursos',
+                'ordering': ['tipo', 'nombre'],
+            },
+        ),
+        migrations.AddField(
+            model_name='cita',
+            name='recurso',
+            field=models.ForeignKey(blank=True, help_text='Bahía o técnico asignado', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='citas', to='citas.recurso'),
+        ),
+        migrations.AddIndex(
+            model_name='cita',
+            index=models.Index(fields=['vehiculo', 'fecha_inicio'], name='cita_vehiculo_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cita',
+            index=models.Index(fields=['recurso', 'fecha_inicio'], name='cita_recurso_inicio_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.24 on 2026-10-17 00:45
+
+from django.db import migrations
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def llenar_contadores(apps, schema_editor):
+    # Carga inicial de los contadores de actividad (ver citas.contadores).
+    Cita = apps.get_model("citas", "Cita")
+    Vehiculo = apps.get_model("vehiculos", "Vehiculo")
+
+    def conteo(modelo, fk):
+        filas = modelo.objects.filter(**{fk: OuterRef("pk")}).order_by().values(fk).annotate(n=Count("pk")).values("n")
+        return Coalesce(Subquery(filas, output_field=IntegerField()), Value(0))
+
+    def ultima(fk):
+        return Subquery(
+            Cita.objects.filter(**{fk: OuterRef("pk")}).order_by().values(fk).annotate(m=Max("fecha_inicio")).values("m")
+        )
+
+    for app_label, nombre, fk in (
+        ("clientes", "Cliente", "cliente_id"),
+        ("vehiculos", "Vehiculo", "vehiculo_id"),
+        ("servicios", "Servicio", "servicio_id"),
+    ):
+        valores = {"citas_count": conteo(Cita, fk), "ultima_cita": ultima(fk)}
+        if nombre == "Cliente":
+            valores["vehiculos_count"] = conteo(Vehiculo, "cliente_id")
+        apps.get_model(app_label, nombre).objects.update(**valores)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citas', '0005_recurso_cita_recurso'),
+        ('clientes', '0006_cliente_citas_count_cliente_ultima_cita_and_more'),
+        ('vehiculos', '0002_vehiculo_citas_count_vehiculo_ultima_cita_and_more'),
+        ('servicios', '0003_servicio_citas_count_servicio_ultima_cita'),
+    ]
+
+    operations = [
+        migrations.RunPython(llenar_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.24 on 2026-10-17 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citas', '0006_contadores_actividad'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cita',
+            name='citas_cita_estado_2000d2_idx',
+        ),
+        migrations.AddIndex(
+            model_name='cita',
+            index=models.Index(fields=['estado', 'fecha_inicio'], name='cita_estado_inicio_idx'),
+        ),
+    ]
@@ -4,6 +4,31 @@ from clientes.models import Cliente
 from vehiculos.models import Vehiculo
 from servicios.models import Servicio
 
+class Recurso(models.Model):
+    """
+    Bahía o técnico del taller: atiende una sola cita a la vez. Las bahías
+    activas fijan además la capacidad del taller (citas simultáneas).
+    """
+
+    class Tipo(models.TextChoices):
+        BAHIA = "bahia", "Bahía"
+        TECNICO = "tecnico", "Técnico"
+
+    nombre = models.CharField(max_length=60, unique=True)
+    tipo = models.CharField(max_length=10, choices=Tipo.choices, default=Tipo.BAHIA)
+    activo = models.BooleanField(default=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "recurso"
+        verbose_name_plural = "recursos"
+        ordering = ["tipo", "nombre"]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} · {self.nombre}"
+
+
 class Cita(models.Model):
     ESTADOS = [
         ("pendiente", "Pendiente"),
@@ -29,6 +54,13 @@ class Cita(models.Model):
     servicio = models.ForeignKey(
         Servicio, on_delete=models.PROTECT, related_name="citas"
     )
+    recurso = models.ForeignKey(
+        Recurso, on_delete=models.PROTECT, related_name="citas", null=True, blank=True,
+        help_text="Bahía o técnico asignado",
+    )
+    # Precio y costo del servicio vigentes al agendar (no cambian si luego se edita el servicio)
+    precio_servicio = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+    costo_servicio = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
 
     creado = models.DateTimeField(auto_now_add=True)
     actualizado = models.DateTimeField(auto_now=True)
@@ -37,9 +69,40 @@ class Cita(models.Model):
         ordering = ["-fecha_inicio"]
         indexes = [
             models.Index(fields=["fecha_inicio"]),
-            models.Index(fields=["estado"]),
+            # Por estado y, dentro de cada estado, en orden de inicio (selector de citas facturables)
+            models.Index(fields=["estado", "fecha_inicio"], name="cita_estado_inicio_idx"),
+            # Max(actualizado) para el ETag del calendario
+            models.Index(fields=["actualizado"]),
+            # Solapamientos por vehículo / recurso (ver citas.agenda)
+            models.Index(fields=["vehiculo", "fecha_inicio"], name="cita_vehiculo_inicio_idx"),
+            models.Index(fields=["recurso", "fecha_inicio"], name="cita_recurso_inicio_idx"),
         ]
 
+    # Campos cuyo valor anterior necesitan las señales (disponibilidad y contadores)
+    CAMPOS_SEGUIDOS = ("cliente_id", "vehiculo_id", "servicio_id", "fecha_inicio", "fecha_fin")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._servicio_id_cargado = instance.__dict__.get("servicio_id")
+        # Valores leídos, para que las señales comparen contra ellos sin releer la fila
+        # (citas.signals); con campos diferidos se releen al guardar.
+        if all(campo in instance.__dict__ for campo in cls.CAMPOS_SEGUIDOS):
+            instance._cargado = {campo: instance.__dict__[campo] for campo in cls.CAMPOS_SEGUIDOS}
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Congela precio/costo al crear la cita o al cambiarle el servicio
+        cambio_servicio = self.servicio_id != getattr(self, "_servicio_id_cargado", None)
+        if self.servicio_id and (cambio_servicio or self.precio_servicio is None):
+            self.precio_servicio = self.servicio.precio
+            self.costo_servicio = self.servicio.costo
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "precio_servicio", "costo_servicio"}
+        super().save(*args, **kwargs)
+        self._servicio_id_cargado = self.servicio_id
+
     def __str__(self):
         return f"{self.titulo} - {self.cliente} ({self.fecha_inicio:%Y-%m-%d %H:%M})"
 
@@ -0,0 +1,80 @@
+"""
+Señales de citas:
+
+- invalidan la caché de disponibilidad (``citas.disponibilidad``) de los días
+  que ocupaba una cita antes y después de guardarla o borrarla;
+- mantienen los contadores de actividad de Cliente, Vehiculo y Servicio
+  (``citas.contadores``) en la misma transacción que la escritura.
+"""
+from __future__ import annotations
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from vehiculos.models import Vehiculo
+
+from . import contadores, disponibilidad
+from .models import Cita
+
+
+def _dias(*intervalos):
+    dias = set()
+    for inicio, fin in intervalos:
+        if inicio and fin and fin > inicio:
+            dias.update(disponibilidad.dias_de(inicio, fin))
+    return dias
+
+
+def _invalidar(dias):
+    if dias:
+        transaction.on_commit(lambda: disponibilidad.invalidar_dias(dias))
+
+
+@receiver(pre_save, sender=Cita, dispatch_uid="citas_cita_pre_save")
+def _recordar_cargado(sender, instance, raw=False, **kwargs):
+    # Instancias que no salieron de la base (p. ej. Cita(pk=...)) o con campos diferidos
+    if raw or not instance.pk or hasattr(instance, "_cargado"):
+        return
+    instance._cargado = Cita.objects.filter(pk=instance.pk).values(*Cita.CAMPOS_SEGUIDOS).first()
+
+
+@receiver(post_save, sender=Cita, dispatch_uid="citas_cita_post_save")
+def _cita_guardada(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    previa = None if created else getattr(instance, "_cargado", None)
+    if created or previa:
+        contadores.cita_guardada(instance, previa)
+    anterior = (previa["fecha_inicio"], previa["fecha_fin"]) if previa else (None, None)
+    _invalidar(_dias(anterior, (instance.fecha_inicio, instance.fecha_fin)))
+    instance._cargado = {campo: getattr(instance, campo) for campo in Cita.CAMPOS_SEGUIDOS}
+
+
+@receiver(post_delete, sender=Cita, dispatch_uid="citas_cita_post_delete")
+def _cita_borrada(sender, instance, **kwargs):
+    contadores.cita_borrada(instance)
+    _invalidar(_dias((instance.fecha_inicio, instance.fecha_fin)))
+
+
+@receiver(pre_save, sender=Vehiculo, dispatch_uid="citas_vehiculo_pre_save")
+def _recordar_cliente_vehiculo(sender, instance, raw=False, **kwargs):
+    instance._cliente_previo = None
+    if raw or not instance.pk:
+        return
+    instance._cliente_previo = Vehiculo.objects.filter(pk=instance.pk).values_list("cliente_id", flat=True).first()
+
+
+@receiver(post_save, sender=Vehiculo, dispatch_uid="citas_vehiculo_post_save")
+def _vehiculo_guardado(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        contadores.vehiculo_guardado(instance)
+    elif getattr(instance, "_cliente_previo", None):
+        contadores.vehiculo_guardado(instance, instance._cliente_previo)
+
+
+@receiver(post_delete, sender=Vehiculo, dispatch_uid="citas_vehiculo_post_delete")
+def _vehiculo_borrado(sender, instance, **kwargs):
+    contadores.vehiculo_borrado(instance)
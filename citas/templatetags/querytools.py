@@ -21,6 +21,9 @@ def keep_query(context, **override):
     """
     request = _get_request(context)
     q = request.GET.copy()
+    if set(override) - {"cursor"}:
+        # Otro filtro/orden: el cursor de paginación ya no aplica
+        q.pop("cursor", None)
     for k, v in override.items():
         if v is None:
             q.pop(k, None)
@@ -55,4 +58,23 @@ def toggle_order(context, field_name):
         new_o = field_name
     q = request.GET.copy()
     q["o"] = new_o
+    q.pop("cursor", None)
+    q.pop("page", None)
+    return q.urlencode()
+
+
+@register.simple_tag(takes_context=True)
+def cursor_query(context, cursor=None):
+    """
+    Query actual apuntando a otra página de la paginación por cursor
+    (``dashboard.paginacion``); sin cursor vuelve a la primera página.
+    Uso: href="?{% cursor_query page_obj.next_cursor %}"
+    """
+    request = _get_request(context)
+    q = request.GET.copy()
+    q.pop("page", None)
+    if cursor:
+        q["cursor"] = cursor
+    else:
+        q.pop("cursor", None)
     return q.urlencode()
@@ -0,0 +1,94 @@
+"""
+Pruebas de ``citas.agenda``: reglas de solapamiento y reservas simultáneas.
+
+``TransactionTestCase`` porque la carrera necesita transacciones reales: cada
+hilo abre su propia conexión y ``agenda.guardar`` debe serializarlas.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from clientes.models import Cliente
+from servicios.models import Servicio
+from vehiculos.models import Vehiculo
+
+from . import agenda
+from .models import Cita
+
+
+class AgendaTests(TransactionTestCase):
+    def setUp(self):
+        self.cliente = Cliente.objects.create(nombre="Ana Pérez")
+        self.vehiculo = Vehiculo.objects.create(cliente=self.cliente, marca="Yamaha", modelo="FZ", anio=2022, placa="ABC12D")
+        self.servicio = Servicio.objects.create(nombre="Cambio de aceite", duracion_minutos=60, precio=50000)
+        self.inicio = timezone.make_aware(datetime(2031, 1, 6, 9, 0))
+
+    def _cita(self, inicio, fin, estado="pendiente") -> Cita:
+        return Cita(
+            titulo="Revisión",
+            fecha_inicio=inicio,
+            fecha_fin=fin,
+            estado=estado,
+            cliente=self.cliente,
+            vehiculo=self.vehiculo,
+            servicio=self.servicio,
+        )
+
+    def test_reservas_simultaneas_del_mismo_hueco(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("La carrera necesita una base en archivo (DATABASES['default']['TEST']['NAME']).")
+        fin = self.inicio + timedelta(hours=1)
+        barrera = threading.Barrier(2)
+        resultados = []
+        verificar = agenda.verificar
+
+        def verificar_lento(cita):
+            # Ensancha la ventana entre verificar y guardar: sin el bloqueo ambas pasarían
+            verificar(cita)
+            time.sleep(0.2)
+
+        def reservar():
+            try:
+                barrera.wait()
+                agenda.guardar(self._cita(self.inicio, fin))
+                resultados.append("guardada")
+            except ValidationError:
+                resultados.append("rechazada")
+            except Exception as exc:  # el hilo no propaga: que el fallo aparezca en la aserción
+                resultados.append(repr(exc))
+            finally:
+                connection.close()
+
+        with mock.patch.object(agenda, "verificar", verificar_lento):
+            hilos = [threading.Thread(target=reservar) for _ in range(2)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+
+        self.assertEqual(sorted(resultados), ["guardada", "rechazada"])
+        self.assertEqual(Cita.objects.filter(vehiculo=self.vehiculo).count(), 1)
+
+    def test_huecos_contiguos_permitidos(self):
+        agenda.guardar(self._cita(self.inicio, self.inicio + timedelta(hours=1)))
+        agenda.guardar(self._cita(self.inicio + timedelta(hours=1), self.inicio + timedelta(hours=2)))
+        self.assertEqual(Cita.objects.count(), 2)
+
+    def test_solapamiento_de_un_minuto_rechazado(self):
+        agenda.guardar(self._cita(self.inicio, self.inicio + timedelta(hours=1)))
+        with self.assertRaises(ValidationError):
+            agenda.guardar(self._cita(self.inicio + timedelta(minutes=59), self.inicio + timedelta(hours=2)))
+        self.assertEqual(Cita.objects.count(), 1)
+
+    def test_citas_canceladas_no_ocupan(self):
+        agenda.guardar(self._cita(self.inicio, self.inicio + timedelta(hours=1), estado="cancelada"))
+        agenda.guardar(self._cita(self.inicio, self.inicio + timedelta(hours=1)))
+        self.assertEqual(Cita.objects.exclude(estado="cancelada").count(), 1)
@@ -12,6 +12,7 @@ urlpatterns = [
     path("<int:pk>/eliminar/", views.CitaDeleteView.as_view(), name="delete"),
     path("export/", views.citas_export_csv, name="export"),
     path("api/vehiculos-por-cliente/", views.api_vehiculos_por_cliente, name="api_vehiculos"),
+    path("api/disponibilidad/", views.api_disponibilidad, name="api_disponibilidad"),
     path("calendar.json", views.calendar_json, name="calendar_json"),
     path("ics/<int:pk>/", views.cita_ics, name="ics"),
 ]
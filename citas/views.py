@@ -1,11 +1,18 @@
 # citas/views.py
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
 from django.contrib import messages
-from django.db.models import Q
-from django.http import JsonResponse, HttpResponse
-from django.urls import reverse_lazy
+from django.core.exceptions import ValidationError
+from django.http import HttpResponseRedirect, JsonResponse, HttpResponse
+from django.urls import reverse, reverse_lazy
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-import csv
+from dashboard import busqueda, exportar
+from dashboard.condicional import condicional, marca_tablas
+from dashboard.paginacion import PaginacionKeysetMixin
+from . import agenda, disponibilidad
 from .models import Cita
 from .forms import CitaForm
 from vehiculos.models import Vehiculo
@@ -23,8 +30,23 @@ class CitaDuracionesMixin:
         }
         return ctx
 
+
+class CitaAgendaMixin:
+    """Guarda la cita verificando conflictos con la agenda bloqueada (ver ``citas.agenda``)."""
+
+    mensaje_exito = ""
+
+    def form_valid(self, form):
+        try:
+            self.object = agenda.guardar(form.save(commit=False))
+        except ValidationError as exc:
+            form.add_error(None, exc)
+            return self.form_invalid(form)
+        messages.success(self.request, self.mensaje_exito)
+        return HttpResponseRedirect(self.get_success_url())
+
 # ---------- LISTA CON BUSCADOR / FILTROS / ORDEN ----------
-class CitaListView(ListView):
+class CitaListView(PaginacionKeysetMixin, ListView):
     model = Cita
     template_name = "citas/list.html"
     context_object_name = "object_list"
@@ -40,12 +62,7 @@ class CitaListView(ListView):
         o = self.request.GET.get("o", "").strip()
 
         if q:
-            qs = qs.filter(
-                Q(cliente__nombre__icontains=q)
-                | Q(vehiculo__placa__icontains=q)
-                | Q(servicio__nombre__icontains=q)
-                | Q(notas__icontains=q)
-            )
+            qs = busqueda.filtrar(qs, q)
 
         if estado:
             qs = qs.filter(estado=estado)
@@ -75,7 +92,10 @@ class CitaListView(ListView):
             "servicio__nombre", "-servicio__nombre",
             "estado", "-estado",
         }
-        qs = qs.order_by(o if o in allowed else "-fecha_inicio")
+        if o in allowed:
+            qs = qs.order_by(o)
+        else:
+            qs = busqueda.por_relevancia(qs, "-fecha_inicio")
         return qs
 
     def get_context_data(self, **kwargs):
@@ -112,27 +132,21 @@ class CitaDetailView(DetailView):
 
 
 # ---------- CREAR ----------
-class CitaCreateView(CitaDuracionesMixin, CreateView):
+class CitaCreateView(CitaAgendaMixin, CitaDuracionesMixin, CreateView):
     model = Cita
     form_class = CitaForm
     template_name = "citas/form.html"
     success_url = reverse_lazy("citas:list")
-
-    def form_valid(self, form):
-        messages.success(self.request, "Cita creada correctamente.")
-        return super().form_valid(form)
+    mensaje_exito = "Cita creada correctamente."
 
 
 # ---------- EDITAR ----------
-class CitaUpdateView(CitaDuracionesMixin, UpdateView):
+class CitaUpdateView(CitaAgendaMixin, CitaDuracionesMixin, UpdateView):
     model = Cita
     form_class = CitaForm
     template_name = "citas/form.html"
     success_url = reverse_lazy("citas:list")
-
-    def form_valid(self, form):
-        messages.success(self.request, "Cita actualizada correctamente.")
-        return super().form_valid(form)
+    mensaje_exito = "Cita actualizada correctamente."
 
 
 # ---------- ELIMINAR ----------
@@ -157,50 +171,201 @@ def api_vehiculos_por_cliente(request):
 
 
 # ---------- Export CSV ----------
-# ---------- Export CSV ----------
-def citas_export_csv(request):
-    qs = CitaListView()
-    qs.request = request
-    queryset = qs.get_queryset()
-
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="citas.csv"'
-    writer = csv.writer(response)
-    writer.writerow(["ID", "Cliente", "Vehiculo", "Servicio", "Inicio", "Fin", "Estado", "Notas"])
-    for c in queryset:
-        writer.writerow([
-            c.id,
-            getattr(c.cliente, "nombre", ""),
-            getattr(c.vehiculo, "placa", ""),
-            getattr(c.servicio, "nombre", ""),
-            timezone.localtime(c.fecha_inicio).strftime("%Y-%m-%d %H:%M"),
-            timezone.localtime(c.fecha_fin).strftime("%Y-%m-%d %H:%M") if c.fecha_fin else "",
-            c.estado,
-            getattr(c, "notas", "").replace("\n", " "),
-        ])
-    return response
+def hoja_export_citas(request):
+    """Citas con los filtros de la lista (vista directa y exportación en segundo plano)."""
+    vista = CitaListView()
+    vista.setup(request)
+    fecha = exportar.formato_fecha()
+    return exportar.Hoja(
+        "Citas",
+        ["ID", "Cliente", "Vehiculo", "Servicio", "Inicio", "Fin", "Estado", "Notas"],
+        vista.get_queryset(),
+        ["id", "cliente__nombre", "vehiculo__placa", "servicio__nombre", "fecha_inicio", "fecha_fin", "estado"],
+        formatear=lambda f: (
+            f[0],
+            f[1] or "",
+            f[2] or "",
+            f[3] or "",
+            fecha(f[4]),
+            fecha(f[5]),
+            f[6],
+            "",  # Cita no tiene notas: la columna se conserva vacía, como siempre
+        ),
+    )
 
 
+def citas_export_csv(request):
+    return exportar.respuesta_csv("citas.csv", hoja_export_citas(request))
+
 
 # ---------- Calendar JSON (para FullCalendar o dashboard) ----------
+# Ventana por defecto sin start/end: seis semanas desde el inicio del mes (vista mensual)
+CALENDARIO_DIAS_DEFECTO = 42
+_ID_MARCADOR = 987654321
+
+
+def _parse_instante(valor, nombre):
+    """Fecha u hora ISO 8601 de FullCalendar (``2024-05-01`` o ``2024-05-01T00:00:00-05:00``)."""
+    # Un "+hh:mm" sin codificar en el querystring llega como espacio
+    valor = valor.strip().replace(" ", "+")
+    instante = parse_datetime(valor)
+    if instante is None:
+        dia = parse_date(valor)
+        if dia is None:
+            raise ValueError(f"Parámetro '{nombre}' inválido: use AAAA-MM-DD o fecha y hora ISO 8601.")
+        instante = datetime.combine(dia, time.min)
+    if timezone.is_naive(instante):
+        instante = timezone.make_aware(instante)
+    return instante
+
+
+def _citas_calendario(request):
+    """
+    Citas que se cruzan con [start, end), opcionalmente por estado y vehículo.
+    ``ValueError`` con un mensaje para el cliente si los parámetros no son válidos.
+    """
+    start = request.GET.get("start", "")
+    end = request.GET.get("end", "")
+    inicio = _parse_instante(start, "start") if start else None
+    fin = _parse_instante(end, "end") if end else None
+    if inicio is None and fin is None:
+        inicio = timezone.make_aware(datetime.combine(timezone.localdate().replace(day=1), time.min))
+    if inicio is None:
+        inicio = fin - timedelta(days=CALENDARIO_DIAS_DEFECTO)
+    if fin is None:
+        fin = inicio + timedelta(days=CALENDARIO_DIAS_DEFECTO)
+    if fin <= inicio:
+        raise ValueError("'end' debe ser posterior a 'start'.")
+    max_dias = getattr(settings, "CITAS_CALENDARIO_MAX_DIAS", 400)
+    if fin - inicio > timedelta(days=max_dias):
+        raise ValueError(f"El rango no puede superar {max_dias} días.")
+
+    # Rango sobre fecha_inicio (índice) acotado por la duración máxima, como agenda.ocupantes
+    qs = Cita.objects.filter(
+        fecha_inicio__gte=inicio - agenda.duracion_maxima(),
+        fecha_inicio__lt=fin,
+        fecha_fin__gt=inicio,
+    )
+    estados = [e.strip() for valor in request.GET.getlist("estado") for e in valor.split(",") if e.strip()]
+    if estados:
+        qs = qs.filter(estado__in=estados)
+    vehiculo = request.GET.get("vehiculo", "").strip()
+    if vehiculo:
+        if not vehiculo.isdigit():
+            raise ValueError(f"Vehículo inválido '{vehiculo}'.")
+        qs = qs.filter(vehiculo_id=int(vehiculo))
+    return qs
+
+
+def _validador_calendario(request):
+    # Altas, bajas y ediciones de las citas de la ventana o de los nombres que muestran los eventos
+    try:
+        citas = _citas_calendario(request)
+    except ValueError as exc:
+        return ("error", str(exc)), None
+    # Solo las filas que nombran los eventos: subconsultas sobre la ventana, no las tablas enteras
+    return marca_tablas(
+        citas,
+        Cliente.objects.filter(pk__in=citas.values("cliente_id")),
+        Vehiculo.objects.filter(pk__in=citas.values("vehiculo_id")),
+        Servicio.objects.filter(pk__in=citas.values("servicio_id")),
+    )
+
+
+@condicional(_validador_calendario)
 def calendar_json(request):
-    # Devuelve eventos minimos: title, start, end, url
-    eventos = []
-    for c in Cita.objects.select_related("cliente", "vehiculo", "servicio"):
-        eventos.append({
-            "id": c.id,
-            "title": f"{getattr(c.servicio, 'nombre', 'Servicio')} - {getattr(c.cliente, 'nombre', '')}",
-            "start": timezone.localtime(c.fecha_inicio).isoformat(),
-            "end": timezone.localtime(c.fecha_fin).isoformat() if c.fecha_fin else None,
-            "url": reverse_lazy("citas:detail", args=[c.id]),
+    """
+    Eventos para FullCalendar en la ventana ?start=&end= (ISO 8601), opcionalmente
+    ?estado=pendiente,confirmada y ?vehiculo=<id>. Solo se leen las columnas que
+    necesita cada evento.
+    """
+    try:
+        citas = _citas_calendario(request)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    tz = timezone.get_current_timezone()
+    url_detalle = reverse("citas:detail", args=[_ID_MARCADOR]).replace(str(_ID_MARCADOR), "{}")
+    filas = citas.order_by("fecha_inicio").values_list(
+        "id", "fecha_inicio", "fecha_fin", "estado", "servicio__nombre", "cliente__nombre", "vehiculo__placa"
+    )
+    eventos = [
+        {
+            "id": pk,
+            "title": f"{servicio or 'Servicio'} - {cliente or ''}",
+            "start": inicio.astimezone(tz).isoformat(),
+            "end": fin.astimezone(tz).isoformat() if fin else None,
+            "url": url_detalle.format(pk),
             "extendedProps": {
-                "estado": c.estado,
-                "vehiculo": getattr(c.vehiculo, "placa", ""),
-            }
-        })
+                "estado": estado,
+                "vehiculo": placa or "",
+            },
+        }
+        for pk, inicio, fin, estado, servicio, cliente, placa in filas
+    ]
     return JsonResponse(eventos, safe=False)
 
 
+# ---------- Disponibilidad (huecos libres para agendar) ----------
+def _entero(request, nombre, defecto=None):
+    valor = request.GET.get(nombre, "").strip()
+    if not valor:
+        return defecto
+    if not valor.isdigit():
+        raise ValueError(f"Parámetro '{nombre}' inválido.")
+    return int(valor)
+
+
+def api_disponibilidad(request):
+    """
+    Huecos libres para ?servicio=<id> (duración del servicio) desde ?desde=AAAA-MM-DD
+    (hoy por defecto) durante ?dias= días (7 por defecto), opcionalmente sin cruzarse
+    con ?vehiculo=<id> ni ?recurso=<id>. Ver ``citas.disponibilidad``.
+    """
+    try:
+        servicio_id = _entero(request, "servicio")
+        if servicio_id is None:
+            raise ValueError("Falta el parámetro 'servicio'.")
+        servicio = Servicio.objects.filter(pk=servicio_id).values_list("duracion_minutos", flat=True).first()
+        if not servicio:
+            raise ValueError(f"Servicio {servicio_id} no existe o no tiene duración.")
+        desde = request.GET.get("desde", "").strip()
+        dia = parse_date(desde) if desde else timezone.localdate()
+        if dia is None:
+            raise ValueError("Parámetro 'desde' inválido: use AAAA-MM-DD.")
+        dias = _entero(request, "dias", 7)
+        if not 1 <= dias <= disponibilidad.MAX_DIAS:
+            raise ValueError(f"'dias' debe estar entre 1 y {disponibilidad.MAX_DIAS}.")
+        vehiculo_id = _entero(request, "vehiculo")
+        recurso_id = _entero(request, "recurso")
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    duracion = timedelta(minutes=servicio)
+    tz = timezone.get_current_timezone()
+    cap = agenda.capacidad()
+    resultado = disponibilidad.disponibilidad(
+        duracion, dia, dias, vehiculo_id=vehiculo_id, recurso_id=recurso_id, cap=cap
+    )
+    return JsonResponse(
+        {
+            "servicio": servicio_id,
+            "duracion_minutos": servicio,
+            "capacidad": cap,
+            "dias": [
+                {
+                    "fecha": d["fecha"].isoformat(),
+                    "slots": [
+                        {"inicio": i.astimezone(tz).isoformat(), "fin": f.astimezone(tz).isoformat()}
+                        for i, f in d["huecos"]
+                    ],
+                }
+                for d in resultado
+            ],
+        }
+    )
+
+
 # ---------- ICS individual ----------
 def cita_ics(request, pk):
     c = Cita.objects.select_related("cliente", "vehiculo", "servicio").get(pk=pk)
@@ -9,6 +9,14 @@ import re
 PHONE_RE = re.compile(r"^[\d\s\-\+\(\)]{6,}$")
 DOC_RE = re.compile(r"^[\w\-\.\s]{4,}$")
 
+# Columnas que usan los selectores de cliente (ver ``clientes.views.ClienteBuscarView``)
+CAMPOS_SELECTOR = ("nombre", "documento", "telefono")
+
+
+def etiqueta_cliente(valores: dict) -> str:
+    """"Nombre · documento · teléfono" (omite los vacíos) a partir de ``CAMPOS_SELECTOR``."""
+    return " · ".join(str(valores[campo]) for campo in CAMPOS_SELECTOR if valores.get(campo))
+
 
 class ClienteForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.24 on 2026-10-17 00:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0005_rename_clientes_clie_puntos_8a2c2d_idx_clientes_cl_puntos__71196f_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='citas_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Citas'),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='ultima_cita',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Última cita'),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='vehiculos_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Vehículos'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['citas_count'], name='clientes_cl_citas_c_15ad2e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['ultima_cita'], name='clientes_cl_ultima__a84dde_idx'),
+        ),
+    ]
@@ -2,8 +2,10 @@
 from __future__ import annotations
 from django.db import models
 
+from citas.contadores_modelo import ContadoresMixin
 
-class Cliente(models.Model):
+
+class Cliente(ContadoresMixin, models.Model):
     class Origen(models.TextChoices):
         REFERIDO = "referido", "Referido"
         ONLINE = "online", "Canal digital"
@@ -22,6 +24,10 @@ class Cliente(models.Model):
     puntos_saldo = models.PositiveIntegerField("Puntos disponibles", default=0)
     nivel = models.CharField("Nivel fidelización", max_length=30, blank=True)
     ultimo_contacto = models.DateTimeField("Ultimo contacto", blank=True, null=True)
+    # Actividad desnormalizada (citas.contadores; ``python manage.py recount`` la repara)
+    vehiculos_count = models.PositiveIntegerField("Vehículos", default=0, editable=False)
+    citas_count = models.PositiveIntegerField("Citas", default=0, editable=False)
+    ultima_cita = models.DateTimeField("Última cita", blank=True, null=True, editable=False)
     creado = models.DateTimeField(auto_now_add=True)
     actualizado = models.DateTimeField(auto_now=True)
 
@@ -37,11 +43,15 @@ class Cliente(models.Model):
             models.Index(fields=["origen"]),
             models.Index(fields=["es_empresa"]),
             models.Index(fields=["puntos_saldo"]),
+            models.Index(fields=["citas_count"]),
+            models.Index(fields=["ultima_cita"]),
         ]
 
     def __str__(self) -> str:
         return self.nombre
 
+    CONTADORES = ("vehiculos_count", "citas_count", "ultima_cita")
+
     @property
     def tipo_display(self) -> str:
         return "Empresa" if self.es_empresa else "Persona"
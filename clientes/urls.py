@@ -3,6 +3,7 @@ from __future__ import annotations
 from django.urls import path
 
 from .views import (
+    ClienteBuscarView,
     ClienteCreateView,
     ClienteDeleteView,
     ClienteDetailView,
@@ -18,6 +19,7 @@ urlpatterns = [
     path("", ClienteListView.as_view(), name="list"),
     path("nuevo/", ClienteCreateView.as_view(), name="create"),
     path("exportar/", ClienteExportCSVView.as_view(), name="export"),
+    path("api/buscar/", ClienteBuscarView.as_view(), name="api_buscar"),
     path("<int:pk>/", ClienteDetailView.as_view(), name="detail"),
     path("<int:pk>/editar/", ClienteUpdateView.as_view(), name="edit"),
     path("<int:pk>/actualizar/", ClienteUpdateView.as_view(), name="update"),
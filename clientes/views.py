@@ -3,17 +3,16 @@ Views for the clientes app with enhanced filtering and presentation.
 """
 from __future__ import annotations
 
-import csv
 from contextlib import suppress
 from datetime import timedelta
 from typing import Any
 
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.exceptions import FieldError, ValidationError
-from django.db.models import Count, Max, Q, Sum, Value
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Q, Sum, Value
 from django.db.models.functions import Coalesce
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
@@ -26,18 +25,11 @@ from django.views.generic import (
     UpdateView,
 )
 
-from .forms import ClienteForm
-from .models import Cliente
-
+from dashboard import busqueda, exportar
+from dashboard.paginacion import PaginacionKeysetMixin
 
-def annotate_cliente_queryset(qs):
-    with suppress(FieldError):
-        qs = qs.annotate(vehiculos_count=Count("vehiculos", distinct=True))
-    with suppress(FieldError):
-        qs = qs.annotate(citas_count=Count("citas", distinct=True))
-    with suppress(FieldError):
-        qs = qs.annotate(ultima_cita=Max("citas__fecha_inicio"))
-    return qs
+from .forms import CAMPOS_SELECTOR, ClienteForm, etiqueta_cliente
+from .models import Cliente
 
 
 class ClienteFilterMixin:
@@ -58,15 +50,9 @@ class ClienteFilterMixin:
 
     def apply_filters(self, qs):
         self.get_filter_values()
-        qs = annotate_cliente_queryset(qs)
 
         if self.search_query:
-            qs = qs.filter(
-                Q(nombre__icontains=self.search_query)
-                | Q(telefono__icontains=self.search_query)
-                | Q(email__icontains=self.search_query)
-                | Q(documento__icontains=self.search_query)
-            )
+            qs = busqueda.filtrar(qs, self.search_query)
 
         if self.tipo_filter == "empresa":
             qs = qs.filter(es_empresa=True)
@@ -86,6 +72,8 @@ class ClienteFilterMixin:
             )
         elif self.estado_filter == "nuevos":
             qs = qs.filter(creado__gte=self.reciente_threshold)
+        elif self.estado_filter == "sin_citas":
+            qs = qs.filter(citas_count=0)
 
         allowed_orders = {
             "nombre",
@@ -96,11 +84,15 @@ class ClienteFilterMixin:
             "-actualizado",
             "ultimo_contacto",
             "-ultimo_contacto",
+            "citas_count",
+            "-citas_count",
+            "ultima_cita",
+            "-ultima_cita",
         }
         if self.order in allowed_orders:
             qs = qs.order_by(self.order)
         else:
-            qs = qs.order_by("nombre")
+            qs = busqueda.por_relevancia(qs, "nombre")
         return qs
 
     def get_summary_context(self, queryset):
@@ -129,7 +121,7 @@ class ClienteFilterMixin:
         }
 
 
-class ClienteListView(LoginRequiredMixin, ClienteFilterMixin, ListView):
+class ClienteListView(LoginRequiredMixin, ClienteFilterMixin, PaginacionKeysetMixin, ListView):
     model = Cliente
     template_name = "clientes/list.html"
     context_object_name = "clientes"
@@ -143,6 +135,7 @@ class ClienteListView(LoginRequiredMixin, ClienteFilterMixin, ListView):
 
         params = self.request.GET.copy()
         params.pop("page", None)
+        params.pop("cursor", None)
         query_string = params.urlencode()
 
         summary = self.get_summary_context(self.object_list)
@@ -164,6 +157,7 @@ class ClienteListView(LoginRequiredMixin, ClienteFilterMixin, ListView):
                     ("reciente", "Contacto reciente"),
                     ("inactivo", "Inactivos"),
                     ("sin_contacto", "Sin contacto"),
+                    ("sin_citas", "Sin citas"),
                 ],
                 "summary": summary,
                 "recent_clients": Cliente.objects.order_by("-creado")[:5],
@@ -222,8 +216,7 @@ class ClienteDetailView(LoginRequiredMixin, DetailView):
     context_object_name = "cliente"
 
     def get_queryset(self):
-        qs = Cliente.objects.all()
-        return annotate_cliente_queryset(qs)
+        return Cliente.objects.all()
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         ctx = super().get_context_data(**kwargs)
@@ -295,16 +288,40 @@ class ClienteDetailView(LoginRequiredMixin, DetailView):
         return ctx
 
 
+class ClienteBuscarView(LoginRequiredMixin, View):
+    """Sugerencias para los selectores de cliente: prefijo en nombre, documento o teléfono."""
+
+    limite = 20
+
+    def get(self, request, *args, **kwargs):
+        texto = (request.GET.get("q") or "").strip()
+        if not texto:
+            return JsonResponse({"results": []})
+        resultados = busqueda.sugerencias(
+            Cliente.objects.order_by("nombre"),
+            texto,
+            CAMPOS_SELECTOR,
+            etiqueta_cliente,
+            campos=CAMPOS_SELECTOR,
+            limite=self.limite,
+        )
+        return JsonResponse({"results": resultados})
+
+
 class ClienteExportCSVView(LoginRequiredMixin, ClienteFilterMixin, View):
     """Exporta la lista filtrada (misma búsqueda) a CSV."""
 
     def get(self, request, *args, **kwargs):
+        return exportar.respuesta_csv("clientes.csv", self.hoja())
+
+    def hoja(self) -> exportar.Hoja:
+        """Clientes filtrados; también la usa la exportación en segundo plano."""
         qs = self.apply_filters(Cliente.objects.all()).order_by("nombre")
 
-        response = HttpResponse(content_type="text/csv; charset=utf-8")
-        response["Content-Disposition"] = 'attachment; filename="clientes.csv"'
-        writer = csv.writer(response)
-        writer.writerow(
+        origenes = dict(Cliente.Origen.choices)
+        fecha = exportar.formato_fecha()
+        return exportar.Hoja(
+            "Clientes",
             [
                 "Nombre",
                 "Documento",
@@ -317,25 +334,35 @@ class ClienteExportCSVView(LoginRequiredMixin, ClienteFilterMixin, View):
                 "Vehículos",
                 "Citas",
                 "Creado",
-            ]
+            ],
+            qs,
+            [
+                "nombre",
+                "documento",
+                "es_empresa",
+                "telefono",
+                "email",
+                "direccion",
+                "origen",
+                "ultimo_contacto",
+                "vehiculos_count",
+                "citas_count",
+                "creado",
+            ],
+            formatear=lambda f: (
+                f[0],
+                f[1] or "",
+                "Empresa" if f[2] else "Persona",
+                f[3] or "",
+                f[4] or "",
+                f[5] or "",
+                origenes.get(f[6], f[6]),
+                fecha(f[7]),
+                f[8],
+                f[9],
+                fecha(f[10]),
+            ),
         )
-        for c in qs:
-            writer.writerow(
-                [
-                    c.nombre,
-                    c.documento or "",
-                    c.tipo_display,
-                    c.telefono or "",
-                    c.email or "",
-                    c.direccion or "",
-                    c.get_origen_display(),
-                    c.ultimo_contacto.strftime("%Y-%m-%d %H:%M") if c.ultimo_contacto else "",
-                    getattr(c, "vehiculos_count", ""),
-                    getattr(c, "citas_count", ""),
-                    c.creado.strftime("%Y-%m-%d %H:%M"),
-                ]
-            )
-        return response
 
 
 class ClienteTouchView(LoginRequiredMixin, View):
@@ -0,0 +1,398 @@
+"""
+Búsqueda de texto completo para las listas de clientes, vehículos, citas y repuestos.
+
+En SQLite cada modelo indexado tiene una tabla virtual FTS5
+(``busqueda_<app>_<modelo>``) cuyo rowid es la pk del objeto y cuyas columnas
+son los campos buscables, incluidos los de relaciones (``cliente__nombre``).
+El tokenizador ``unicode61 remove_diacritics 2`` ignora mayúsculas y tildes;
+cada palabra buscada se toma como prefijo (``"jos"*``) y deben aparecer todas.
+Sin otro orden pedido, los resultados salen por relevancia (bm25,
+``por_relevancia``). Un texto sin espacios con dígitos (teléfono, documento,
+placa) busca además el prefijo de la columna completa en los ``identificadores``
+del índice (``"300456"`` encuentra ``3004567890``, ``"abc1"`` la placa
+``ABC12D``), sin relevancia: un rango (``>=``/``<``) que usa el índice B-tree de
+la columna, porque el ``LIKE`` de SQLite no distingue mayúsculas y no lo usa.
+Un fragmento del medio (``"4567"``) no se encuentra.
+
+El índice se mantiene con señales (``dashboard.signals``) dentro de la misma
+transacción que la escritura: guardar o borrar un objeto reescribe su fila y,
+si cambió un campo que copian otros índices (el nombre del cliente, la placa,
+el nombre del servicio), también las filas que dependen de él. Las escrituras
+masivas (``bulk_create``, ``update``) no emiten señales: después de una carga
+así, ``python manage.py reindexar_busqueda`` reconstruye las tablas.
+
+Backends:
+- SQLite con FTS5 (tablas creadas por la migración 0006 o por el comando).
+- PostgreSQL: ``SearchVector``/``SearchRank`` sobre los mismos campos con la
+  configuración ``BUSQUEDA_PG_CONFIG`` ('simple' por defecto; usar una con
+  ``unaccent`` para ignorar tildes). Para que use índice hace falta un índice
+  GIN sobre la misma expresión.
+- En otro caso, o si la tabla FTS5 no existe, ``icontains`` sobre los campos
+  (también encuentra fragmentos, recorriendo la tabla).
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+from functools import lru_cache, reduce
+from operator import or_
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, router
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+TOKENIZADOR = "unicode61 remove_diacritics 2"
+ANOTACION = "rango_busqueda"
+_PALABRA = re.compile(r"\w+", re.UNICODE)
+
+
+class Indice(NamedTuple):
+    modelo: str  # "app_label.Modelo"
+    campos: Tuple[str, ...]
+    # Campos con índice B-tree en los que un número o placa se busca como prefijo
+    identificadores: Tuple[str, ...] = ()
+
+    @property
+    def tabla(self) -> str:
+        return "busqueda_" + self.modelo.lower().replace(".", "_")
+
+    @property
+    def columnas(self) -> List[str]:
+        return [campo.replace("__", "_") for campo in self.campos]
+
+    def model(self):
+        return apps.get_model(self.modelo)
+
+
+INDICES: Dict[str, Indice] = {
+    "clientes.cliente": Indice(
+        "clientes.Cliente", ("nombre", "documento", "telefono", "email"), ("documento", "telefono")
+    ),
+    "vehiculos.vehiculo": Indice("vehiculos.Vehiculo", ("placa", "marca", "modelo", "cliente__nombre"), ("placa",)),
+    "citas.cita": Indice(
+        "citas.Cita", ("cliente__nombre", "vehiculo__placa", "servicio__nombre", "descripcion"), ("vehiculo__placa",)
+    ),
+    "inventario.repuesto": Indice(
+        "inventario.Repuesto", ("nombre", "codigo", "descripcion", "proveedor"), ("codigo",)
+    ),
+}
+
+
+class Dependencia(NamedTuple):
+    indice: Indice
+    fk: str  # attname en el modelo indexado (p. ej. "cliente_id")
+    campos: Tuple[str, ...]  # campos del modelo relacionado que copia el índice
+
+
+def indice_de(modelo) -> Optional[Indice]:
+    return INDICES.get(modelo._meta.label_lower)
+
+
+def dependencias(modelo) -> List[Dependencia]:
+    """Índices que copian campos de ``modelo`` a través de una FK."""
+    return _dependencias(modelo._meta.label_lower)
+
+
+@lru_cache(maxsize=None)
+def _dependencias(etiqueta: str) -> List[Dependencia]:
+    resultado = []
+    for indice in INDICES.values():
+        relaciones: Dict[str, List[str]] = {}
+        for campo in indice.campos:
+            if "__" in campo:
+                relacion, resto = campo.split("__", 1)
+                relaciones.setdefault(relacion, []).append(resto)
+        for relacion, campos in relaciones.items():
+            fk = indice.model()._meta.get_field(relacion)
+            if fk.related_model._meta.label_lower == etiqueta:
+                resultado.append(Dependencia(indice, fk.attname, tuple(campos)))
+    return resultado
+
+
+def campos_relevantes(modelo) -> frozenset:
+    """Campos de ``modelo`` cuyo cambio reescribe alguna fila de índice (propia o dependiente)."""
+    return _campos_relevantes(modelo._meta.label_lower)
+
+
+@lru_cache(maxsize=None)
+def _campos_relevantes(etiqueta: str) -> frozenset:
+    campos = set()
+    indice = INDICES.get(etiqueta)
+    if indice is not None:
+        opts = indice.model()._meta
+        for campo in indice.campos:
+            campo_modelo = opts.get_field(campo.split("__", 1)[0])
+            campos.update({campo_modelo.name, campo_modelo.attname})
+    for dependencia in _dependencias(etiqueta):
+        campos.update(dependencia.campos)
+    return frozenset(campos)
+
+
+# ---------- Backend ----------
+_tablas_fts: Dict[str, set] = {}
+
+
+def _alias(modelo) -> str:
+    return router.db_for_read(modelo)
+
+
+def fts5_disponible(connection) -> bool:
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp._busqueda_prueba USING fts5(x)")
+            cursor.execute("DROP TABLE temp._busqueda_prueba")
+        except Exception:
+            return False
+    return True
+
+
+def _tablas_existentes(connection) -> set:
+    if connection.alias not in _tablas_fts:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'busqueda\\_%' ESCAPE '\\'")
+            _tablas_fts[connection.alias] = {fila[0] for fila in cursor.fetchall()}
+    return _tablas_fts[connection.alias]
+
+
+def backend(indice: Indice) -> Optional[str]:
+    """'fts5', 'postgres' o None (icontains) para la base del modelo."""
+    connection = connections[_alias(indice.model())]
+    if connection.vendor == "postgresql":
+        return "postgres"
+    if connection.vendor == "sqlite" and indice.tabla in _tablas_existentes(connection):
+        return "fts5"
+    return None
+
+
+def crear_tabla(indice: Indice, connection) -> None:
+    columnas = ", ".join(indice.columnas)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {indice.tabla} USING fts5({columnas}, tokenize='{TOKENIZADOR}')"
+        )
+    _tablas_fts.pop(connection.alias, None)
+
+
+def eliminar_tabla(indice: Indice, connection) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {indice.tabla}")
+    _tablas_fts.pop(connection.alias, None)
+
+
+# ---------- Escritura ----------
+def _sql(queryset, *campos):
+    qs = queryset.order_by().values_list(*campos)
+    return qs.query.get_compiler(using=qs.db).as_sql()
+
+
+def indexar(indice: Indice, queryset) -> None:
+    """Reescribe las filas de índice de los objetos de ``queryset`` (INSERT ... SELECT)."""
+    connection = connections[queryset.db]
+    sql_pks, params_pks = _sql(queryset, "pk")
+    sql_filas, params_filas = _sql(queryset, "pk", *indice.campos)
+    columnas = ", ".join(["rowid", *indice.columnas])
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {indice.tabla} WHERE rowid IN ({sql_pks})", params_pks)
+        cursor.execute(f"INSERT INTO {indice.tabla} ({columnas}) {sql_filas}", params_filas)
+
+
+def desindexar(indice: Indice, pks: Iterable[int], using: str) -> None:
+    pks = list(pks)
+    if not pks:
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {indice.tabla} WHERE rowid IN ({', '.join(['%s'] * len(pks))})", pks
+        )
+
+
+def reconstruir(indice: Indice, using: Optional[str] = None) -> int:
+    """Borra y vuelve a llenar la tabla del índice; devuelve las filas indexadas."""
+    modelo = indice.model()
+    using = using or router.db_for_write(modelo)
+    connection = connections[using]
+    eliminar_tabla(indice, connection)
+    crear_tabla(indice, connection)
+    queryset = modelo._default_manager.using(using).all()
+    indexar(indice, queryset)
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {indice.tabla}({indice.tabla}) VALUES ('optimize')")
+        cursor.execute(f"SELECT COUNT(*) FROM {indice.tabla}")
+        return cursor.fetchone()[0]
+
+
+# ---------- Consulta ----------
+def palabras(texto: str) -> List[str]:
+    return _PALABRA.findall((texto or "").lower())
+
+
+def consulta_fts(texto: str, columnas: Optional[Sequence[str]] = None) -> Optional[str]:
+    """Expresión MATCH: cada palabra como prefijo, todas obligatorias (en ``columnas`` si se dan)."""
+    tokens = palabras(texto)
+    if not tokens:
+        return None
+    filtro = f"{{{' '.join(columnas)}}} : " if columnas else ""
+    return " ".join(f'{filtro}"{t}"*' for t in tokens)
+
+
+def _icontains(queryset, campos: Sequence[str], texto: str):
+    return queryset.filter(reduce(or_, (Q(**{f"{campo}__icontains": texto}) for campo in campos)))
+
+
+def _es_identificador(texto: str) -> bool:
+    """Un texto sin espacios y con algún dígito: teléfono, documento o placa."""
+    return not any(c.isspace() for c in texto) and any(c.isdigit() for c in texto)
+
+
+def _prefijo(campos: Sequence[str], texto: str) -> Optional[Q]:
+    """Columnas de ``campos`` que empiezan por ``texto`` (tal cual, en mayúsculas o minúsculas)."""
+    if not campos:
+        return None
+    variantes = dict.fromkeys((texto, texto.upper(), texto.lower()))
+    return reduce(
+        or_,
+        (
+            Q(**{f"{campo}__gte": variante, f"{campo}__lt": variante + "\U0010ffff"})
+            for campo in campos
+            for variante in variantes
+        ),
+    )
+
+
+def filtrar(queryset, texto: str, campos: Optional[Sequence[str]] = None):
+    """
+    Filtra ``queryset`` por ``texto`` con el backend disponible y, si el backend la
+    calcula, anota la relevancia en ``rango_busqueda`` (menor es mejor; ver
+    ``por_relevancia``). ``campos`` limita la búsqueda a parte de los campos del índice.
+    """
+    indice = indice_de(queryset.model)
+    texto = (texto or "").strip()
+    if not texto or indice is None:
+        return queryset
+    campos = tuple(campos or indice.campos)
+    tipo = backend(indice)
+    columnas = None if campos == indice.campos else [c.replace("__", "_") for c in campos]
+    expresion = consulta_fts(texto, columnas)
+    prefijo = None
+    if _es_identificador(texto):
+        prefijo = _prefijo([c for c in indice.identificadores if c in campos], texto)
+
+    if tipo == "fts5" and expresion:
+        connection = connections[queryset.db]
+        meta = queryset.model._meta
+        tabla = indice.tabla
+        if prefijo is not None:
+            # Número o placa: prefijo de la columna o palabra del índice, los dos por índice
+            coincidencias = RawSQL(f"SELECT rowid FROM {tabla} WHERE {tabla} MATCH %s", [expresion])
+            return queryset.filter(prefijo | Q(pk__in=coincidencias))
+        columna_pk = f"{connection.ops.quote_name(meta.db_table)}.{connection.ops.quote_name(meta.pk.column)}"
+        # Join con la tabla FTS5: SQLite recorre el MATCH una vez y busca cada fila por pk;
+        # el bm25 (columna ``rank``) sale del mismo recorrido. Una subconsulta correlacionada
+        # repetiría el MATCH por fila. Como anotación (no ``extra(select=)``) el rango
+        # se puede filtrar, lo que necesita la paginación por cursor.
+        return queryset.extra(
+            tables=[tabla],
+            where=[f"{tabla}.rowid = {columna_pk}", f"{tabla} MATCH %s"],
+            params=[expresion],
+        ).annotate(**{ANOTACION: RawSQL(f"{tabla}.rank", [], output_field=FloatField())})
+
+    if tipo == "postgres" and expresion:
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        config = getattr(settings, "BUSQUEDA_PG_CONFIG", "simple")
+        vector = SearchVector(*campos, config=config)
+        consulta = SearchQuery(" & ".join(f"{t}:*" for t in palabras(texto)), config=config, search_type="raw")
+        filtro = Q(_vector_busqueda=consulta)
+        if prefijo is not None:
+            filtro |= prefijo
+        return (
+            queryset.annotate(_vector_busqueda=vector)
+            .filter(filtro)
+            .annotate(**{ANOTACION: SearchRank(vector, consulta) * Value(-1.0)})
+        )
+
+    return _icontains(queryset, campos, texto)
+
+
+def por_relevancia(queryset, *desempate):
+    """Ordena por relevancia si ``filtrar`` la anotó; si no, solo por ``desempate``."""
+    if ANOTACION in queryset.query.annotations:
+        return queryset.order_by(ANOTACION, *desempate)
+    return queryset.order_by(*desempate)
+
+
+# ---------- Sugerencias (selectores con búsqueda) ----------
+SUGERENCIAS_TIMEOUT = 300
+
+
+def _clave_sugerencias(modelo) -> str:
+    return f"busqueda:sugerencias:gen:{modelo._meta.label_lower}"
+
+
+def invalidar_sugerencias(*modelos) -> None:
+    """Deja obsoletas las sugerencias cacheadas que dependen de ``modelos``."""
+    from . import cache as dashboard_cache
+
+    for modelo in modelos:
+        dashboard_cache.incrementar(_clave_sugerencias(modelo))
+
+
+def sugerencias(
+    queryset,
+    texto: str,
+    columnas: Sequence[str],
+    etiqueta: Callable[[dict], str],
+    campos: Optional[Sequence[str]] = None,
+    limite: int = 20,
+    depende_de: Sequence = (),
+    partes: Sequence[Q] = (),
+) -> List[dict]:
+    """
+    ``[{"id", "text"}]`` de los ``limite`` objetos más relevantes para ``texto``
+    (prefijo en ``campos``), leídos con ``values("pk", *columnas)`` sin instanciar
+    modelos. El resultado se cachea bajo la consulta SQL y la generación del modelo
+    y de ``depende_de``, que las señales de búsqueda incrementan al escribir.
+
+    ``partes`` divide el queryset en filtros disjuntos consultados por separado
+    (``limite`` filas cada uno) y mezclados por el orden: así cada consulta recorre
+    un índice ya ordenado, p. ej. uno por estado con un índice (estado, fecha),
+    en vez de ordenar todas las filas de un ``estado IN (...)``.
+    """
+    from . import cache as dashboard_cache
+
+    qs = por_relevancia(filtrar(queryset, texto, campos), *(queryset.query.order_by or ["pk"]))
+    orden = [o for o in qs.query.order_by if isinstance(o, str)]
+    claves_orden = [o.lstrip("-") for o in orden]
+    consultas = [
+        parte.values("pk", *columnas, *(c for c in claves_orden if c not in columnas and c != "pk"))[:limite]
+        for parte in ([qs.filter(q) for q in partes] or [qs])
+    ]
+    sqls = []
+    for consulta in consultas:
+        try:
+            sqls.append(consulta.query.get_compiler(using=consulta.db).as_sql())
+        except EmptyResultSet:
+            pass
+    if not sqls:
+        return []
+    modelos = [queryset.model, *depende_de]
+    generaciones = [dashboard_cache.generacion(_clave_sugerencias(m)) for m in modelos]
+    huella = hashlib.md5(f"{qs.db}|{sqls!r}|{generaciones}".encode()).hexdigest()
+    clave = f"busqueda:sugerencias:{huella}"
+    resultado = dashboard_cache.cache().get(clave)
+    if resultado is None:
+        filas = [fila for consulta in consultas for fila in consulta]
+        if len(consultas) > 1:
+            # Ordenamientos estables de la última clave a la primera
+            for campo in reversed(orden):
+                nombre = campo.lstrip("-")
+                filas.sort(key=lambda f: (f[nombre] is not None, f[nombre]), reverse=campo.startswith("-"))
+        resultado = [{"id": fila["pk"], "text": etiqueta(fila)} for fila in filas[:limite]]
+        dashboard_cache.cache().set(clave, resultado, timeout=dashboard_cache.vigencia(SUGERENCIAS_TIMEOUT))
+    return resultado
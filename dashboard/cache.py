@@ -0,0 +1,183 @@
+"""
+Caché versionada de los paneles del dashboard.
+
+Cada panel se guarda bajo una clave derivada de los filtros normalizados
+(desde, hasta, estados) y de un contador de generación. Cualquier escritura
+en las tablas que alimentan los paneles incrementa la generación (ver
+``dashboard.signals``), de modo que las entradas anteriores dejan de
+consultarse sin tener que borrarlas: una vista repetida sale de la caché y
+nunca devuelve datos viejos.
+
+Usa el alias ``dashboard`` de ``CACHES``. Con varios procesos/workers ese
+alias debe apuntar a un backend compartido (Redis, Memcached, base de datos):
+con LocMemCache cada proceso tiene su propia generación y no ve las
+invalidaciones de los demás ni las de los comandos de gestión. En ese caso
+(``compartida()`` es False) la generación, la marca de escritura y los paneles
+duran como máximo ``DASHBOARD_CACHE_TTL_LOCAL`` segundos (60 por defecto), que
+es lo más que un panel puede quedar desfasado; ``manage.py check`` lo avisa
+con ``dashboard.W001`` fuera de DEBUG.
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, InvalidCacheBackendError
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from . import panels
+
+GEN_KEY = "dashboard:gen"
+# Solo cambia cuando se escribe una cita de un mes ya cerrado (ver dashboard.cohortes).
+GEN_HISTORICA_KEY = "dashboard:gen:historico"
+# Momento (epoch) de la última invalidación, para el Last-Modified de las APIs
+ESCRITURA_KEY = "dashboard:gen:escritura"
+HITS_KEY = "dashboard:stats:hits"
+MISSES_KEY = "dashboard:stats:misses"
+
+
+def cache():
+    """Alias ``dashboard`` de ``CACHES`` (o ``default`` si no está definido)."""
+    try:
+        return caches["dashboard"]
+    except InvalidCacheBackendError:
+        return caches["default"]
+
+
+def compartida() -> bool:
+    """True si el alias es visible desde todos los procesos (no vive en la memoria de cada uno)."""
+    return not isinstance(cache(), (LocMemCache, DummyCache))
+
+
+def ttl_generacion():
+    """Vida de las generaciones: sin límite en una caché compartida, acotada en una local."""
+    return None if compartida() else int(getattr(settings, "DASHBOARD_CACHE_TTL_LOCAL", 60))
+
+
+def vigencia(timeout=DEFAULT_TIMEOUT):
+    """
+    Vida de una entrada guardada bajo una generación.
+
+    En una caché compartida, ``timeout`` tal cual (``DEFAULT_TIMEOUT`` = el
+    ``TIMEOUT`` del alias). En una local nunca supera ``ttl_generacion()``:
+    un proceso no ve las invalidaciones de los demás y no debe seguir
+    sirviendo lo que otro ya invalidó.
+    """
+    if compartida():
+        return timeout
+    ttl = ttl_generacion()
+    if timeout is None or timeout is DEFAULT_TIMEOUT:
+        return ttl
+    return min(timeout, ttl)
+
+
+def _incr(key, delta=1, timeout=None):
+    almacen = cache()
+    try:
+        return almacen.incr(key, delta)
+    except ValueError:
+        if almacen.add(key, delta, timeout=timeout):
+            return delta
+        return almacen.incr(key, delta)
+
+
+def _inicial() -> int:
+    # Si la clave se perdió (reinicio, desalojo, TTL) arrancamos en un valor
+    # nuevo para no reutilizar entradas de una generación anterior.
+    return int(time.time() * 1000)
+
+
+def generacion(clave: str = GEN_KEY) -> int:
+    """Generación vigente de ``clave`` (por defecto, la de los datos del dashboard)."""
+    almacen = cache()
+    gen = almacen.get(clave)
+    if gen is None:
+        almacen.add(clave, _inicial(), timeout=ttl_generacion())
+        gen = almacen.get(clave)
+    return gen
+
+
+def generaciones(claves) -> dict:
+    """Como ``generacion`` para varias claves, con un solo ``get_many``."""
+    almacen = cache()
+    claves = list(claves)
+    valores = almacen.get_many(claves)
+    faltan = [clave for clave in claves if clave not in valores]
+    if faltan:
+        for clave in faltan:
+            almacen.add(clave, _inicial(), timeout=ttl_generacion())
+        valores.update(almacen.get_many(faltan))
+    return valores
+
+
+def incrementar(clave: str) -> int:
+    """Incrementa la generación de ``clave``; lo guardado bajo la anterior queda obsoleto."""
+    generacion(clave)
+    return _incr(clave, timeout=ttl_generacion())
+
+
+def invalidar() -> None:
+    """Incrementa la generación; las entradas existentes quedan obsoletas."""
+    incrementar(GEN_KEY)
+    cache().set(ESCRITURA_KEY, time.time(), timeout=ttl_generacion())
+
+
+def ultima_escritura():
+    """Datetime (UTC) de la última invalidación registrada, o None si no se conoce."""
+    ts = cache().get(ESCRITURA_KEY)
+    return datetime.fromtimestamp(ts, tz=dt_timezone.utc) if ts is not None else None
+
+
+def generacion_historica() -> int:
+    """Generación de los datos de meses cerrados."""
+    return generacion(GEN_HISTORICA_KEY)
+
+
+def invalidar_historico() -> None:
+    incrementar(GEN_HISTORICA_KEY)
+
+
+def obtener_varios(keys) -> dict:
+    return cache().get_many(keys)
+
+
+def guardar_varios(valores: dict) -> None:
+    cache().set_many(valores, timeout=vigencia())
+
+
+def clave_panel(clave: str, data) -> str:
+    estados = ",".join(sorted(set(data.estados or [])))
+    normalizado = f"{clave}|{data.desde:%Y-%m-%d}|{data.hasta:%Y-%m-%d}|{estados}"
+    digest = hashlib.md5(normalizado.encode("utf-8")).hexdigest()
+    return f"dashboard:{generacion()}:{clave}:{digest}"
+
+
+def panel_cacheado(clave: str, data) -> dict:
+    """Devuelve el payload del panel desde la caché o lo calcula y lo guarda."""
+    almacen = cache()
+    key = clave_panel(clave, data)
+    payload = almacen.get(key)
+    if payload is not None:
+        _incr(HITS_KEY)
+        return payload
+    _incr(MISSES_KEY)
+    payload = panels.PANELES[clave](data)
+    almacen.set(key, payload, timeout=vigencia())
+    return payload
+
+
+def estadisticas() -> dict:
+    almacen = cache()
+    hits = almacen.get(HITS_KEY) or 0
+    misses = almacen.get(MISSES_KEY) or 0
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 3) if total else 0.0,
+        "generacion": generacion(),
+    }
@@ -0,0 +1,23 @@
+"""
+Comprobaciones de ``manage.py check`` del dashboard.
+"""
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from . import cache as dashboard_cache
+
+
+@register()
+def cache_compartida(app_configs, **kwargs):
+    """Avisa si el alias ``dashboard`` vive en cada proceso (las invalidaciones no se propagan)."""
+    if settings.DEBUG or dashboard_cache.compartida():
+        return []
+    ttl = getattr(settings, "DASHBOARD_CACHE_TTL_LOCAL", 60)
+    return [
+        Warning(
+            "La caché 'dashboard' es local a cada proceso: con varios workers o comandos de gestión "
+            f"los paneles, los ETag y la configuración de puntos pueden quedar desfasados hasta {ttl} s.",
+            hint="Configure DASHBOARD_CACHE_BACKEND/DASHBOARD_CACHE_LOCATION con Redis, Memcached o DatabaseCache.",
+            id="dashboard.W001",
+        )
+    ]
@@ -0,0 +1,170 @@
+"""
+Motor de cohortes de retención para el dashboard.
+
+La cohorte de un cliente es el mes de su primera cita (histórica, no solo
+dentro de la ventana), obtenido con un único ``Min`` agrupado por cliente.
+La matriz cohorte × desplazamiento cuenta clientes distintos con al menos
+una cita en el mes ``m0 + k`` y se arma con ``numpy.bincount``.
+
+Una fila está *terminada* cuando todos sus meses (``m0 .. m0 + max_offset``)
+ya cerraron: esas filas se guardan en la caché del dashboard y solo se
+vuelven a calcular si se escribe una cita en un mes cerrado. Las filas que
+todavía incluyen el mes en curso se recalculan en cada consulta.
+"""
+from __future__ import annotations
+
+import hashlib
+from datetime import date, datetime
+from typing import Optional, Sequence
+
+from django.conf import settings
+from django.db.models import Min
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from citas.models import Cita
+
+from . import cache as dashboard_cache
+
+MAX_OFFSET_DEFECTO = 5
+
+
+def _mes_idx(valor) -> int:
+    """Índice absoluto de mes (año * 12 + mes - 1) para date/datetime."""
+    if isinstance(valor, datetime) and timezone.is_aware(valor):
+        valor = timezone.localtime(valor)
+    return valor.year * 12 + valor.month - 1
+
+
+def _mes_label(idx: int) -> str:
+    return f"{idx // 12:04d}-{idx % 12 + 1:02d}"
+
+
+def _inicio_mes(idx: int) -> datetime:
+    return timezone.make_aware(datetime(idx // 12, idx % 12 + 1, 1))
+
+
+def _citas(estados: Sequence[str]):
+    qs = Cita.objects.all()
+    if estados:
+        qs = qs.filter(estado__in=estados)
+    return qs
+
+
+def _clave_fila(m0: int, max_offset: int, estados_key: str, gen: int) -> str:
+    digest = hashlib.md5(estados_key.encode("utf-8")).hexdigest()
+    return f"dashboard:cohorte:{gen}:{m0}:{max_offset}:{digest}"
+
+
+def _calcular_filas(m_desde: int, m_hasta: int, max_offset: int, estados: Sequence[str]) -> dict:
+    """
+    Filas {m0: [tamaño, activos_k0, ..., activos_kN]} para las cohortes con
+    m0 en [m_desde, m_hasta]. Dos consultas agrupadas, sin recorrer citas.
+    """
+    import numpy as np
+
+    m_actual = _mes_idx(timezone.localdate())
+    primeras = (
+        _citas(estados)
+        .values("cliente_id")
+        .annotate(primera=Min("fecha_inicio"))
+        .filter(primera__gte=_inicio_mes(m_desde), primera__lt=_inicio_mes(m_hasta + 1))
+        .order_by()
+    )
+    pares = list(primeras.values_list("cliente_id", "primera"))
+    if not pares:
+        return {}
+
+    clientes = np.fromiter((p[0] for p in pares), dtype=np.int64, count=len(pares))
+    cohorte = np.fromiter((_mes_idx(p[1]) for p in pares), dtype=np.int64, count=len(pares))
+    orden = np.argsort(clientes)
+    clientes, cohorte = clientes[orden], cohorte[orden]
+
+    actividad = (
+        _citas(estados)
+        .filter(
+            cliente_id__in=primeras.values("cliente_id"),
+            fecha_inicio__lt=_inicio_mes(min(m_hasta + max_offset, m_actual) + 1),
+        )
+        .annotate(m=TruncMonth("fecha_inicio"))
+        .values_list("cliente_id", "m")
+        .distinct()
+        .order_by()
+    )
+    filas_act = list(actividad)
+    act_cliente = np.fromiter((r[0] for r in filas_act), dtype=np.int64, count=len(filas_act))
+    act_mes = np.fromiter((_mes_idx(r[1]) for r in filas_act), dtype=np.int64, count=len(filas_act))
+
+    # Cohorte de cada fila de actividad vía búsqueda binaria sobre los clientes ordenados.
+    pos = np.searchsorted(clientes, act_cliente)
+    m0_act = cohorte[np.clip(pos, 0, len(clientes) - 1)]
+    offset = act_mes - m0_act
+    validos = (pos < len(clientes)) & (offset >= 0) & (offset <= max_offset)
+
+    n_filas = m_hasta - m_desde + 1
+    ancho = max_offset + 1
+    tamanos = np.bincount(cohorte - m_desde, minlength=n_filas)
+    activos = np.bincount(
+        (m0_act[validos] - m_desde) * ancho + offset[validos],
+        minlength=n_filas * ancho,
+    ).reshape(n_filas, ancho)
+
+    return {
+        m_desde + i: [int(tamanos[i])] + activos[i].tolist()
+        for i in range(n_filas)
+        if tamanos[i]
+    }
+
+
+def calcular_cohortes(
+    desde: date,
+    hasta: date,
+    estados: Optional[Sequence[str]] = None,
+    max_offset: Optional[int] = None,
+) -> dict:
+    """Payload del panel de cohortes para las cohortes con primer mes en [desde, hasta]."""
+    max_offset = int(max_offset if max_offset is not None else getattr(settings, "DASHBOARD_COHORTES_OFFSETS", MAX_OFFSET_DEFECTO))
+    estados = sorted(set(estados or []))
+    estados_key = ",".join(estados)
+    m_desde, m_hasta = _mes_idx(desde), _mes_idx(hasta)
+    m_actual = _mes_idx(timezone.localdate())
+
+    # Filas terminadas: se leen de la caché.
+    gen = dashboard_cache.generacion_historica()
+    terminadas = [m0 for m0 in range(m_desde, m_hasta + 1) if m0 + max_offset < m_actual]
+    claves = {m0: _clave_fila(m0, max_offset, estados_key, gen) for m0 in terminadas}
+    en_cache = dashboard_cache.obtener_varios(list(claves.values()))
+    filas = {m0: en_cache[k] for m0, k in claves.items() if k in en_cache}
+
+    # Lo que falte (filas no cacheadas + filas abiertas) se calcula en un solo rango contiguo.
+    pendientes = [m0 for m0 in range(m_desde, m_hasta + 1) if m0 not in filas]
+    if pendientes:
+        calculadas = _calcular_filas(min(pendientes), max(pendientes), max_offset, estados)
+        nuevas = {}
+        for m0 in pendientes:
+            fila = calculadas.get(m0, [])
+            filas[m0] = fila
+            if m0 in claves:
+                nuevas[claves[m0]] = fila
+        dashboard_cache.guardar_varios(nuevas)
+
+    labels_rows, retention, tamanos = [], [], []
+    for m0 in range(m_desde, m_hasta + 1):
+        fila = filas.get(m0)
+        if not fila:
+            continue
+        tamano = fila[0]
+        ret = []
+        for k, activos in enumerate(fila[1:]):
+            # Meses posteriores a la ventana o aún no transcurridos quedan vacíos.
+            ret.append(round(activos / tamano, 3) if m0 + k <= min(m_hasta, m_actual) else None)
+        labels_rows.append(_mes_label(m0))
+        retention.append(ret)
+        tamanos.append(tamano)
+
+    return {
+        "labels_rows": labels_rows,
+        "labels_cols": [f"M+{i}" for i in range(0, max_offset + 1)],
+        "retention": retention,
+        "tamanos": tamanos,
+    }
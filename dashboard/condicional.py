@@ -0,0 +1,98 @@
+"""
+GET condicional (ETag / Last-Modified) para las APIs JSON.
+
+``condicional(validador)`` envuelve una vista con ``django.views.decorators.http.condition``:
+antes de ejecutarla calcula un validador barato de los datos que la alimentan
+y, si coincide con el ``If-None-Match`` / ``If-Modified-Since`` del navegador,
+responde ``304 Not Modified`` sin construir el payload.
+
+Un validador recibe los argumentos de la vista y devuelve
+``(partes, ultima_modificacion)``: ``partes`` entra en el ETag junto con la
+ruta y el querystring normalizado; ``ultima_modificacion`` (datetime o None)
+se envía como Last-Modified. Hay dos validadores listos:
+
+- ``validador_dashboard``: generación de la caché de paneles
+  (``dashboard.cache``), que cambia con cada escritura en las tablas del
+  dashboard, más la fecha del día (los filtros por defecto son relativos a hoy).
+- ``marca_tablas(*querysets)``: número de filas y máximo ``actualizado`` de
+  cada queryset; el conteo detecta los borrados que el máximo no ve.
+
+Las respuestas llevan ``Cache-Control: private, no-cache``: el navegador guarda
+la copia pero la revalida en cada uso.
+
+``python manage.py benchmark_validadores`` compara el costo del validador con
+el de la vista completa.
+"""
+from __future__ import annotations
+
+import hashlib
+from datetime import date
+from functools import wraps
+from typing import Callable, Iterable, Optional, Tuple
+
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import cache as dashboard_cache
+
+Validador = Callable[..., Tuple[Iterable, Optional[object]]]
+
+_ATRIBUTO = "_validador_condicional"
+
+
+def _consulta_normalizada(request) -> str:
+    return "&".join(f"{k}={v}" for k, valores in sorted(request.GET.lists()) for v in sorted(valores))
+
+
+def etag_de(*partes) -> str:
+    return hashlib.md5("|".join(str(p) for p in partes).encode("utf-8")).hexdigest()
+
+
+def condicional(validador: Validador):
+    """Decorador: ETag/Last-Modified desde ``validador`` y 304 si el cliente ya tiene la respuesta."""
+
+    def _evaluar(request, *args, **kwargs):
+        # condition() pide ETag y Last-Modified por separado: el validador corre una vez
+        if not hasattr(request, _ATRIBUTO):
+            partes, ultima = validador(request, *args, **kwargs)
+            etag = etag_de(request.path, _consulta_normalizada(request), *partes)
+            setattr(request, _ATRIBUTO, (etag, ultima))
+        return getattr(request, _ATRIBUTO)
+
+    def decorador(vista):
+        condicionada = condition(
+            etag_func=lambda request, *a, **kw: _evaluar(request, *a, **kw)[0],
+            last_modified_func=lambda request, *a, **kw: _evaluar(request, *a, **kw)[1],
+        )(vista)
+
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            response = condicionada(request, *args, **kwargs)
+            if response.status_code >= 400:
+                # Un error no es una representación reutilizable
+                for cabecera in ("ETag", "Last-Modified"):
+                    if response.has_header(cabecera):
+                        del response[cabecera]
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return envoltura
+
+    return decorador
+
+
+def validador_dashboard(request, *args, **kwargs):
+    partes = (dashboard_cache.generacion(), dashboard_cache.generacion_historica(), date.today())
+    return partes, dashboard_cache.ultima_escritura()
+
+
+def marca_tablas(*querysets):
+    """Conteo y último ``actualizado`` de cada queryset (cada uno es un agregado sobre un índice)."""
+    partes, ultima = [], None
+    for qs in querysets:
+        r = qs.order_by().aggregate(n=Count("pk"), ultima=Max("actualizado"))
+        partes.append(f"{qs.model._meta.label_lower}:{r['n']}:{r['ultima'] and r['ultima'].isoformat()}")
+        if r["ultima"] and (ultima is None or r["ultima"] > ultima):
+            ultima = r["ultima"]
+    return partes, ultima
@@ -0,0 +1,211 @@
+"""
+Exportaciones CSV y XLSX sin cargar el resultado en memoria.
+
+Las vistas arman su queryset con los mismos filtros de siempre y pasan las
+columnas que necesitan: las filas se leen con ``values_list`` +
+``iterator(chunk_size=...)``.
+
+CSV: se escribe a un ``StreamingHttpResponse`` por lotes, así que la memoria
+no crece con el número de filas y la descarga empieza con el primer lote. El
+archivo lleva BOM UTF-8 para que Excel respete las tildes.
+
+XLSX: openpyxl en modo ``write_only`` (una hoja por ``Hoja``) escribe a un
+archivo temporal en disco que luego se envía con ``FileResponse``. Cada hoja
+tiene un límite de filas (por defecto ``DASHBOARD_XLSX_MAX_FILAS`` o el máximo
+de Excel); si se alcanza, la última fila lo indica.
+
+Los escritores aceptan un callback ``progreso(filas)`` que se llama cada
+``FILAS_POR_LOTE`` filas: lo usa el worker de exportaciones en segundo plano
+(``dashboard.trabajos``) para informar avance y ETA.
+"""
+from __future__ import annotations
+
+import csv
+import tempfile
+from datetime import datetime
+from typing import Callable, Iterable, NamedTuple, Optional, Sequence
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+BOM = "\ufeff"
+CHUNK_SIZE = 2000
+FILAS_POR_LOTE = 500
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# Filas de datos que caben en una hoja de Excel (1.048.576 menos el encabezado)
+MAX_FILAS_EXCEL = 1_048_575
+# Por debajo de este tamaño el archivo temporal se queda en memoria
+XLSX_SPOOL_BYTES = 1024 * 1024
+
+
+class ExportacionError(Exception):
+    """La exportación no puede generarse (p. ej. falta una dependencia)."""
+
+
+class _Eco:
+    """Pseudo-archivo para ``csv.writer``: devuelve la línea en vez de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+def formato_fecha(formato: str = "%Y-%m-%d %H:%M") -> Callable:
+    """
+    Función que pasa datetimes a texto en hora local ("" si es None). La zona
+    horaria se resuelve una sola vez y no en cada fila.
+    """
+    tz = timezone.get_current_timezone()
+
+    def formatear(valor) -> str:
+        if valor is None:
+            return ""
+        if timezone.is_aware(valor):
+            valor = valor.astimezone(tz)
+        return valor.strftime(formato)
+
+    return formatear
+
+
+def filas_queryset(qs, campos: Sequence[str], chunk_size: int = CHUNK_SIZE) -> Iterable[tuple]:
+    """Tuplas de ``campos`` leídas por bloques, sin instanciar modelos."""
+    return qs.values_list(*campos).iterator(chunk_size=chunk_size)
+
+
+Progreso = Callable[[int], None]
+
+
+class Hoja(NamedTuple):
+    """
+    Una tabla a exportar: columnas ``campos`` de ``qs`` bajo ``encabezados``.
+    En XLSX cada ``Hoja`` es una pestaña titulada ``titulo``.
+    """
+
+    titulo: str
+    encabezados: Sequence[str]
+    qs: object
+    campos: Sequence[str]
+    formatear: Optional[Callable[[tuple], Sequence]] = None
+    limite: Optional[int] = None
+
+
+def lineas_csv(
+    encabezados: Sequence[str],
+    filas: Iterable[Sequence],
+    formatear: Optional[Callable[[tuple], Sequence]] = None,
+    bom: bool = True,
+    progreso: Optional[Progreso] = None,
+) -> Iterable[str]:
+    """Genera el CSV por lotes de ``FILAS_POR_LOTE`` líneas."""
+    writer = csv.writer(_Eco())
+    yield (BOM if bom else "") + writer.writerow(encabezados)
+    lote = []
+    n = 0
+    for fila in filas:
+        lote.append(writer.writerow(formatear(fila) if formatear else fila))
+        if len(lote) >= FILAS_POR_LOTE:
+            yield "".join(lote)
+            n += len(lote)
+            lote = []
+            if progreso:
+                progreso(n)
+    if lote:
+        yield "".join(lote)
+        n += len(lote)
+        if progreso:
+            progreso(n)
+
+
+def respuesta_csv(nombre_archivo: str, hoja: Hoja, chunk_size: int = CHUNK_SIZE) -> StreamingHttpResponse:
+    """``StreamingHttpResponse`` con el CSV de la hoja."""
+    response = StreamingHttpResponse(
+        lineas_csv(hoja.encabezados, filas_queryset(hoja.qs, hoja.campos, chunk_size), hoja.formatear),
+        content_type="text/csv; charset=utf-8",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{nombre_archivo}"'
+    return response
+
+
+def escribir_csv(hoja: Hoja, destino, chunk_size: int = CHUNK_SIZE, progreso: Optional[Progreso] = None) -> int:
+    """Escribe el CSV de la hoja en ``destino`` (archivo de texto) y devuelve las filas escritas."""
+    escritas = 0
+
+    def contar(n):
+        nonlocal escritas
+        escritas = n
+        if progreso:
+            progreso(n)
+
+    for bloque in lineas_csv(
+        hoja.encabezados, filas_queryset(hoja.qs, hoja.campos, chunk_size), hoja.formatear, progreso=contar
+    ):
+        destino.write(bloque)
+    return escritas
+
+
+def _limite_filas(hoja: Hoja) -> int:
+    limite = hoja.limite or getattr(settings, "DASHBOARD_XLSX_MAX_FILAS", MAX_FILAS_EXCEL)
+    return min(int(limite), MAX_FILAS_EXCEL)
+
+
+def filas_xlsx(hoja: Hoja) -> int:
+    """Filas de datos que tendrá la hoja en XLSX (con el límite aplicado)."""
+    return min(hoja.qs.count(), _limite_filas(hoja))
+
+
+def escribir_xlsx(
+    hojas: Sequence[Hoja],
+    destino,
+    chunk_size: int = CHUNK_SIZE,
+    progreso: Optional[Progreso] = None,
+) -> dict:
+    """
+    Escribe el libro en ``destino`` (ruta o archivo binario) y devuelve
+    {titulo: filas escritas}. Los datetimes se guardan en hora local (Excel no
+    admite zonas horarias). ``progreso`` recibe el acumulado de todas las hojas.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError as exc:
+        raise ExportacionError("La exportación a Excel requiere openpyxl (pip install openpyxl).") from exc
+
+    tz = timezone.get_current_timezone()
+    wb = Workbook(write_only=True)
+    escritas = {}
+    acumulado = 0
+    for hoja in hojas:
+        ws = wb.create_sheet(title=hoja.titulo[:31])
+        ws.append(list(hoja.encabezados))
+        limite = _limite_filas(hoja)
+        n = 0
+        for fila in filas_queryset(hoja.qs[: limite + 1], hoja.campos, chunk_size):
+            if n == limite:
+                ws.append([f"Exportación truncada a {limite} filas."])
+                break
+            valores = hoja.formatear(fila) if hoja.formatear else fila
+            ws.append([
+                v.astimezone(tz).replace(tzinfo=None) if isinstance(v, datetime) and timezone.is_aware(v) else v
+                for v in valores
+            ])
+            n += 1
+            if progreso and n % FILAS_POR_LOTE == 0:
+                progreso(acumulado + n)
+        acumulado += n
+        escritas[hoja.titulo] = n
+        if progreso:
+            progreso(acumulado)
+    wb.save(destino)
+    return escritas
+
+
+def respuesta_xlsx(nombre_archivo: str, hojas: Sequence[Hoja]) -> FileResponse:
+    """``FileResponse`` con el libro generado en un archivo temporal."""
+    archivo = tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_BYTES)
+    try:
+        escribir_xlsx(hojas, archivo)
+    except Exception:
+        archivo.close()
+        raise
+    archivo.seek(0)
+    return FileResponse(archivo, as_attachment=True, filename=nombre_archivo, content_type=XLSX_CONTENT_TYPE)
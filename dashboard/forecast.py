@@ -0,0 +1,133 @@
+"""
+Pronóstico de ingresos mensuales para el dashboard.
+
+Los modelos están escritos con NumPy (sin scikit-learn) y el resultado se
+persiste en ``PronosticoIngresos`` identificado por una firma de la serie de
+entrada: el ajuste se hace una vez por cada cambio en los datos y las
+siguientes consultas solo leen la fila guardada. NumPy se importa únicamente
+al ajustar, nunca al servir un pronóstico existente.
+
+Configuración (settings):
+    DASHBOARD_PRONOSTICO_METODO     "holt" (defecto), "ses" o "estacional_naive"
+    DASHBOARD_PRONOSTICO_HORIZONTE  meses a pronosticar (defecto 3)
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Optional, Sequence
+
+from django.conf import settings
+
+from .models import PronosticoIngresos
+
+HORIZONTE_DEFECTO = 3
+TEMPORADA = 12
+# Rejilla de parámetros evaluada de una vez (vectorizada) al ajustar.
+_GRID = tuple(round(0.05 * i, 2) for i in range(1, 20))
+
+
+def _siguientes_meses(ultimo: str, horizonte: int) -> list[str]:
+    anio, mes = (int(p) for p in ultimo.split("-"))
+    labels = []
+    for _ in range(horizonte):
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+        labels.append(f"{anio:04d}-{mes:02d}")
+    return labels
+
+
+def _suavizado(y, alphas, betas):
+    """
+    Holt (tendencia aditiva) evaluado para todas las combinaciones alpha/beta
+    a la vez. Devuelve nivel y tendencia finales y el SSE a un paso.
+    """
+    import numpy as np
+
+    nivel = np.full(alphas.shape, y[0])
+    tendencia = np.full(alphas.shape, y[1] - y[0] if len(y) > 1 else 0.0) * (betas > 0)
+    sse = np.zeros(alphas.shape)
+    for obs in y[1:]:
+        prediccion = nivel + tendencia
+        sse += (obs - prediccion) ** 2
+        nuevo_nivel = alphas * obs + (1 - alphas) * prediccion
+        tendencia = betas * (nuevo_nivel - nivel) + (1 - betas) * tendencia
+        nivel = nuevo_nivel
+    return nivel, tendencia, sse
+
+
+def ajustar(valores: Sequence[float], horizonte: int, metodo: str) -> dict:
+    """Ajusta el modelo pedido y devuelve parámetros, predicciones y SSE."""
+    import numpy as np
+
+    y = np.asarray(valores, dtype=float)
+    if metodo == PronosticoIngresos.Metodo.ESTACIONAL_NAIVE and len(y) >= TEMPORADA:
+        ultimos = y[-TEMPORADA:]
+        pred = np.array([ultimos[h % TEMPORADA] for h in range(horizonte)])
+        sse = float(((y[TEMPORADA:] - y[:-TEMPORADA]) ** 2).sum()) if len(y) > TEMPORADA else None
+        return {"parametros": {"temporada": TEMPORADA}, "valores": pred, "sse": sse}
+
+    if metodo == PronosticoIngresos.Metodo.HOLT and len(y) >= 3:
+        alphas, betas = (g.ravel() for g in np.meshgrid(_GRID, _GRID))
+    else:
+        # SES, o series demasiado cortas para estimar tendencia/temporada.
+        alphas = np.asarray(_GRID)
+        betas = np.zeros_like(alphas)
+    nivel, tendencia, sse = _suavizado(y, alphas, betas)
+    mejor = int(np.argmin(sse))
+    pasos = np.arange(1, horizonte + 1)
+    pred = nivel[mejor] + pasos * tendencia[mejor]
+    return {
+        "parametros": {
+            "alpha": float(alphas[mejor]),
+            "beta": float(betas[mejor]),
+            "nivel": float(nivel[mejor]),
+            "tendencia": float(tendencia[mejor]),
+        },
+        "valores": pred,
+        "sse": float(sse[mejor]),
+    }
+
+
+def firma(labels: Sequence[str], valores: Sequence[float], metodo: str, horizonte: int) -> str:
+    contenido = json.dumps([list(labels), [round(float(v), 2) for v in valores], metodo, horizonte])
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+def pronostico(
+    labels: Sequence[str],
+    valores: Sequence[float],
+    horizonte: Optional[int] = None,
+    metodo: Optional[str] = None,
+    ambito: str = "",
+) -> tuple[list[str], list[float]]:
+    """
+    Pronóstico para la serie mensual ``labels``/``valores`` (AAAA-MM).
+    Reutiliza el ajuste persistido para ``ambito`` si la serie no cambió; si
+    cambió, lo reajusta y reemplaza esa fila.
+    """
+    if not labels:
+        return [], []
+    horizonte = int(horizonte or getattr(settings, "DASHBOARD_PRONOSTICO_HORIZONTE", HORIZONTE_DEFECTO))
+    metodo = metodo or getattr(settings, "DASHBOARD_PRONOSTICO_METODO", PronosticoIngresos.Metodo.HOLT)
+    clave = firma(labels, valores, metodo, horizonte)
+
+    fila = {"metodo": metodo, "horizonte": horizonte, "ambito": ambito}
+    guardado = PronosticoIngresos.objects.filter(**fila).values("firma", "labels", "valores").first()
+    if guardado and guardado["firma"] == clave:
+        return guardado["labels"], guardado["valores"]
+
+    resultado = ajustar(valores, horizonte, metodo)
+    pred_labels = _siguientes_meses(labels[-1], horizonte)
+    pred_valores = [round(max(float(v), 0.0), 2) for v in resultado["valores"]]
+    PronosticoIngresos.objects.update_or_create(
+        **fila,
+        defaults={
+            "firma": clave,
+            "ultimo_mes": labels[-1],
+            "parametros": resultado["parametros"],
+            "labels": pred_labels,
+            "valores": pred_valores,
+            "sse": resultado["sse"],
+        },
+    )
+    return pred_labels, pred_valores
@@ -0,0 +1,183 @@
+"""
+Métricas de inventario para el dashboard, sin instanciar un ``Repuesto`` por SKU.
+
+Los totales y las estadísticas por categoría (valor, unidades, SKU bajo
+stock) se resuelven como agregados SQL. Cobertura, riesgo y consumo solo
+existen para los SKU con salidas en la ventana: esas filas llegan en una
+consulta agrupada con ``values_list`` y se procesan como arreglos NumPy.
+El nombre de los repuestos se consulta solo para los candidatos a críticos.
+
+``python manage.py benchmark_inventario`` mide el cálculo sobre un catálogo
+sintético (100k SKU por defecto).
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.utils import timezone
+
+from inventario.models import CategoriaRepuesto, MovimientoInventario, Repuesto
+
+# Ventana de consumo y umbral mínimo de cobertura (días) para marcar riesgo
+VENTANA_CONSUMO_DIAS = 90
+COBERTURA_MINIMA_DIAS = 15
+TOP_CRITICOS = 5
+
+_MONTO = DecimalField(max_digits=20, decimal_places=2)
+# Misma regla que ``Repuesto.bajo_stock``: stock <= max(seguridad, mínimo) y umbral > 0
+BAJO_STOCK = Q(stock_seguridad__gt=0, stock__lte=F("stock_seguridad")) | Q(stock_minimo__gt=0, stock__lte=F("stock_minimo"))
+
+
+def vacio() -> dict:
+    return {
+        "rotacion": 0.0,
+        "cobertura_dias": 0.0,
+        "sku_bajos": 0,
+        "valor_stock": 0.0,
+        "margen_potencial": 0.0,
+        "consumo_mensual_estimado": 0.0,
+        "riesgo_sin_stock": 0,
+        "sin_movimientos": 0,
+        "criticos": [],
+        "categorias": [],
+    }
+
+
+def _inicio_dia(dia: date) -> datetime:
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def _agregados_stock():
+    return dict(
+        skus=Count("id"),
+        unidades=Sum("stock"),
+        valor=Sum(ExpressionWrapper(F("costo_unitario") * F("stock"), output_field=_MONTO)),
+        potencial=Sum(ExpressionWrapper(F("precio_venta") * F("stock"), output_field=_MONTO)),
+        bajos=Count("id", filter=BAJO_STOCK),
+    )
+
+
+def _criticos(ids, cobertura, consumo_diario, stock, reposicion, riesgo) -> list[dict]:
+    """Top de SKU con menor cobertura; los empates se ordenan por nombre."""
+    import numpy as np
+
+    if not len(ids):
+        return []
+    cobertura_r = np.round(cobertura, 1)
+    k = min(TOP_CRITICOS, len(ids)) - 1
+    # Todos los SKU con cobertura <= la k-ésima menor (incluye empates) en O(n)
+    candidatos = np.flatnonzero(cobertura_r <= np.partition(cobertura_r, k)[k])
+    info = {
+        pk: (nombre, categoria)
+        for pk, nombre, categoria in Repuesto.objects.filter(pk__in=ids[candidatos].tolist()).values_list(
+            "id", "nombre", "categoria"
+        )
+    }
+    etiquetas = dict(CategoriaRepuesto.choices)
+    orden = sorted(candidatos.tolist(), key=lambda i: (cobertura_r[i], info[int(ids[i])][0]))
+    return [
+        {
+            "id": int(ids[i]),
+            "nombre": info[int(ids[i])][0],
+            "categoria": etiquetas.get(info[int(ids[i])][1], info[int(ids[i])][1]),
+            "stock": int(stock[i]),
+            "cobertura_dias": float(cobertura_r[i]),
+            "tiempo_reposicion": int(reposicion[i]),
+            "consumo_diario": round(float(consumo_diario[i]), 2),
+            "riesgo": bool(riesgo[i]),
+        }
+        for i in orden[:TOP_CRITICOS]
+    ]
+
+
+def calcular(desde: Optional[date] = None, hasta: Optional[date] = None) -> dict:
+    """
+    Rotación, cobertura, riesgo, estadísticas por categoría y SKU críticos.
+    El consumo se mide en los últimos ``VENTANA_CONSUMO_DIAS`` días hasta ``hasta``
+    (sin salir de [desde, hasta]).
+    """
+    import numpy as np
+
+    hasta = hasta or date.today()
+    desde = desde or (hasta - timedelta(days=180))
+    inicio = max(hasta - timedelta(days=VENTANA_CONSUMO_DIAS), desde)
+    dias = max((hasta - inicio).days, 1)
+
+    # Una sola pasada por el catálogo: agregados por categoría; los totales se suman aquí.
+    por_categoria = {
+        r["categoria"]: r
+        for r in Repuesto.objects.order_by().values("categoria").annotate(**_agregados_stock())
+    }
+    if not por_categoria:
+        return vacio()
+    totales = {
+        campo: sum((r[campo] or 0) for r in por_categoria.values())
+        for campo in ("skus", "unidades", "valor", "potencial", "bajos")
+    }
+
+    # Solo SKU con salidas en la ventana: (id, salidas, stock, reposición, categoría)
+    filas = list(
+        MovimientoInventario.objects.filter(
+            tipo=MovimientoInventario.Tipo.SALIDA,
+            # Rango de datetimes locales en vez de ``fecha__date``: evita convertir cada fila
+            fecha__gte=_inicio_dia(inicio),
+            fecha__lt=_inicio_dia(hasta + timedelta(days=1)),
+        )
+        .order_by()
+        .values("repuesto_id", "repuesto__stock", "repuesto__tiempo_reposicion_dias", "repuesto__categoria")
+        .annotate(total=Sum("cantidad"))
+        .values_list("repuesto_id", "total", "repuesto__stock", "repuesto__tiempo_reposicion_dias", "repuesto__categoria")
+    )
+    n = len(filas)
+    columnas = list(zip(*filas)) or [()] * 5
+    ids = np.array(columnas[0], dtype=np.int64)
+    salidas = np.array(columnas[1], dtype=np.float64)
+    stock = np.array(columnas[2], dtype=np.float64)
+    reposicion = np.array(columnas[3], dtype=np.int64)
+    claves_cat = sorted(set(por_categoria) | set(columnas[4]), key=lambda c: c or "")
+    cat_idx = {c: i for i, c in enumerate(claves_cat)}
+    categoria = np.array([cat_idx[c] for c in columnas[4]], dtype=np.int64)
+
+    consumo_diario = salidas / dias
+    cobertura = stock / consumo_diario
+    riesgo = cobertura <= np.maximum(reposicion, COBERTURA_MINIMA_DIAS)
+    consumo_cat = np.bincount(categoria, weights=salidas, minlength=len(claves_cat))
+
+    stock_total = float(totales["unidades"] or 0)
+    consumo_total = float(salidas.sum())
+    consumo_diario_prom = consumo_total / dias
+    rotacion = consumo_diario_prom * 30.0 / max(stock_total, 1.0) if stock_total > 0 and consumo_total > 0 else 0.0
+    cobertura_global = stock_total / consumo_diario_prom if consumo_diario_prom > 0 else 0.0
+
+    etiquetas = dict(CategoriaRepuesto.choices)
+    categorias = []
+    for clave in claves_cat:
+        stats = por_categoria.get(clave)
+        if not stats:
+            continue
+        unidades = float(stats["unidades"] or 0)
+        consumo = float(consumo_cat[cat_idx[clave]])
+        rot_cat = (consumo / dias) * 30.0 / max(unidades, 1.0) if unidades > 0 and consumo > 0 else 0.0
+        clave_txt = clave or "otros"
+        categorias.append({
+            "nombre": etiquetas.get(clave_txt, clave_txt.title()),
+            "valor": round(float(stats["valor"] or 0), 2),
+            "rotacion": round(rot_cat, 2),
+            "criticos": int(stats["bajos"]),
+        })
+
+    valor_stock = float(totales["valor"] or 0)
+    return {
+        "rotacion": round(rotacion, 2),
+        "cobertura_dias": round(cobertura_global, 1) if cobertura_global else 0.0,
+        "sku_bajos": int(totales["bajos"]),
+        "valor_stock": round(valor_stock, 2),
+        "margen_potencial": round(float(totales["potencial"] or 0) - valor_stock, 2),
+        "consumo_mensual_estimado": round(consumo_diario_prom * 30.0, 1),
+        "riesgo_sin_stock": int(riesgo.sum()),
+        "sin_movimientos": int(totales["skus"] - n),
+        "criticos": _criticos(ids, cobertura, consumo_diario, stock, reposicion, riesgo),
+        "categorias": categorias,
+    }
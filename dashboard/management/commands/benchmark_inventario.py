@@ -0,0 +1,96 @@
+"""
+Mide las métricas de inventario del dashboard sobre un catálogo sintético.
+
+Los repuestos y movimientos se crean dentro de una transacción que se
+revierte al terminar: la base de datos queda como estaba.
+
+Uso:
+    python manage.py benchmark_inventario
+    python manage.py benchmark_inventario --skus 200000 --repeticiones 5 --max-segundos 1
+"""
+from __future__ import annotations
+
+import random
+from datetime import timedelta
+from decimal import Decimal
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard import inventario_metricas
+from inventario.models import CategoriaRepuesto, MovimientoInventario, Repuesto
+
+
+class Command(BaseCommand):
+    help = "Benchmark de dashboard.inventario_metricas con un catálogo sintético (se revierte al terminar)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--skus", type=int, default=100_000)
+        parser.add_argument("--con-salidas", type=float, default=0.6, help="Fracción de SKU con salidas en la ventana.")
+        parser.add_argument("--repeticiones", type=int, default=3)
+        parser.add_argument("--max-segundos", type=float, help="Falla si la mejor medición supera este tiempo.")
+        parser.add_argument("--seed", type=int, default=7)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options["seed"])
+        mejor = None
+        with transaction.atomic():
+            inicio = perf_counter()
+            self._poblar(rnd, options["skus"], options["con_salidas"], options["batch_size"])
+            self.stdout.write(f"Catálogo sintético: {options['skus']} SKU en {perf_counter() - inicio:.2f}s.")
+
+            hasta = timezone.localdate()
+            for i in range(options["repeticiones"]):
+                inicio = perf_counter()
+                resultado = inventario_metricas.calcular(hasta - timedelta(days=180), hasta)
+                duracion = perf_counter() - inicio
+                mejor = duracion if mejor is None else min(mejor, duracion)
+                self.stdout.write(f"  corrida {i + 1}: {duracion * 1000:.0f} ms")
+            self.stdout.write(
+                f"SKU bajo stock: {resultado['sku_bajos']} · en riesgo: {resultado['riesgo_sin_stock']} · "
+                f"sin movimientos: {resultado['sin_movimientos']}"
+            )
+            transaction.set_rollback(True)
+
+        if mejor is None:
+            return
+        if options["max_segundos"] is not None and mejor > options["max_segundos"]:
+            raise CommandError(f"Mejor tiempo {mejor:.3f}s supera el límite de {options['max_segundos']}s.")
+        self.stdout.write(self.style.SUCCESS(f"Mejor tiempo: {mejor * 1000:.0f} ms"))
+
+    def _poblar(self, rnd, skus, con_salidas, batch_size):
+        categorias = [c for c, _ in CategoriaRepuesto.choices]
+        Repuesto.objects.bulk_create(
+            (
+                Repuesto(
+                    codigo=f"BENCH-{i:07d}",
+                    nombre=f"Repuesto sintético {i}",
+                    categoria=rnd.choice(categorias),
+                    stock=rnd.randint(0, 200),
+                    stock_seguridad=rnd.randint(0, 20),
+                    stock_minimo=rnd.randint(0, 20),
+                    costo_unitario=Decimal(rnd.randint(100, 50_000)) / 100,
+                    precio_venta=Decimal(rnd.randint(150, 80_000)) / 100,
+                    tiempo_reposicion_dias=rnd.randint(0, 30),
+                )
+                for i in range(skus)
+            ),
+            batch_size=batch_size,
+        )
+        # bulk_create no pasa por MovimientoInventario.save(): el stock no se altera.
+        ids = Repuesto.objects.filter(codigo__startswith="BENCH-").values_list("id", flat=True)
+        MovimientoInventario.objects.bulk_create(
+            (
+                MovimientoInventario(
+                    repuesto_id=pk,
+                    tipo=MovimientoInventario.Tipo.SALIDA,
+                    cantidad=rnd.randint(1, 40),
+                )
+                for pk in ids.iterator()
+                for _ in range(rnd.randint(1, 3) if rnd.random() < con_salidas else 0)
+            ),
+            batch_size=batch_size,
+        )
@@ -0,0 +1,111 @@
+"""
+Compara el GET condicional (validador + 304) con la respuesta completa de las
+APIs JSON del dashboard y del calendario, sobre los datos actuales.
+
+Columnas (mejor de N corridas, en ms):
+  paneles    cálculo de los paneles sin caché (solo APIs del dashboard)
+  completa   vista completa sin If-None-Match (con la caché de paneles caliente)
+  validador  cálculo del ETag/Last-Modified
+  304        petición con el ETag vigente (validador + 304, sin ejecutar la vista)
+
+Uso:
+    python manage.py benchmark_validadores
+    python manage.py benchmark_validadores --repeticiones 10 --desde 2024-01-01 --hasta 2024-12-31
+"""
+from __future__ import annotations
+
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from citas import views as citas_views
+from dashboard import condicional, panels
+from dashboard import views as dashboard_views
+
+# URL -> panel(es) que calcula (None: no es un panel del dashboard)
+RUTAS = {
+    "citas:calendar_json": None,
+    "dashboard:api_kpis": ["kpis"],
+    "dashboard:api_timeseries": ["timeseries"],
+    "dashboard:api_top_servicios": ["top_servicios"],
+    "dashboard:api_estado_pastel": ["estado_pastel"],
+    "dashboard:api_heatmap_dia_hora": ["heatmap_dia_hora"],
+    "dashboard:api_cohortes": ["cohortes"],
+    "dashboard:api_ltv": ["ltv"],
+    "dashboard:api_repeat_rate": ["repeat_rate"],
+    "dashboard:api_inventario_metricas": ["inventario_metricas"],
+    "dashboard:api_margen_servicios": ["margen_servicios"],
+    "dashboard:api_funnel_citas": ["funnel_citas"],
+    "dashboard:api_bundle": list(panels.PANELES),
+}
+
+
+def _mejor(fn, repeticiones):
+    mejor, resultado = None, None
+    for _ in range(repeticiones):
+        inicio = perf_counter()
+        resultado = fn()
+        duracion = (perf_counter() - inicio) * 1000
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor, resultado
+
+
+class Command(BaseCommand):
+    help = "Benchmark del GET condicional (ETag/Last-Modified) frente a la respuesta completa."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeticiones", type=int, default=5)
+        parser.add_argument("--desde", help="Filtro desde (AAAA-MM-DD) para las APIs del dashboard.")
+        parser.add_argument("--hasta", help="Filtro hasta (AAAA-MM-DD) para las APIs del dashboard.")
+
+    def handle(self, *args, **options):
+        repeticiones = max(options["repeticiones"], 1)
+        factory = RequestFactory()
+        # Usuario sin guardar: basta para pasar login_required
+        usuario = get_user_model()(username="benchmark", is_staff=True)
+        params = {k: options[k] for k in ("desde", "hasta") if options[k]}
+
+        def peticion(ruta, consulta, **headers):
+            request = factory.get(ruta, consulta, **headers)
+            request.user = usuario
+            return request
+
+        self.stdout.write(f"{'endpoint':<36}{'paneles':>10}{'completa':>10}{'validador':>11}{'304':>8}{'ahorro':>8}")
+        for nombre, claves in RUTAS.items():
+            ruta = reverse(nombre)
+            vista = resolve(ruta).func
+            consulta = params if claves else {}
+
+            t_completa, response = _mejor(lambda: vista(peticion(ruta, consulta)), repeticiones)
+            etag = response.get("ETag")
+            if response.status_code != 200 or not etag:
+                self.stderr.write(f"{nombre}: respuesta {response.status_code} sin ETag, se omite.")
+                continue
+
+            validador = (
+                citas_views._validador_calendario if claves is None else condicional.validador_dashboard
+            )
+            t_validador, _ = _mejor(lambda: validador(peticion(ruta, consulta)), repeticiones)
+            t_304, response = _mejor(lambda: vista(peticion(ruta, consulta, HTTP_IF_NONE_MATCH=etag)), repeticiones)
+            if response.status_code != 304:
+                self.stderr.write(f"{nombre}: se esperaba 304 y llegó {response.status_code}.")
+                continue
+
+            t_paneles = None
+            if claves:
+                def calcular():
+                    data = dashboard_views._dashboard_data(peticion(ruta, consulta))
+                    return [panels.PANELES[c](data) for c in claves]
+
+                t_paneles, _ = _mejor(calcular, repeticiones)
+
+            referencia = max(t_completa, t_paneles or 0)
+            self.stdout.write(
+                f"{nombre.split(':')[1]:<36}"
+                f"{(f'{t_paneles:.1f}' if t_paneles is not None else '—'):>10}"
+                f"{t_completa:>10.1f}{t_validador:>11.2f}{t_304:>8.2f}"
+                f"{referencia / t_304 if t_304 else 0:>7.0f}x"
+            )
@@ -0,0 +1,60 @@
+"""
+Reconstruye el rollup diario de citas, el cubo de rentabilidad por servicio/mes
+y las métricas por cliente del dashboard.
+
+Uso:
+    python manage.py rebuild_rollups
+    python manage.py rebuild_rollups --desde 2025-01-01 --hasta 2025-06-30
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import metricas_clientes, rentabilidad, rollups
+
+
+def _fecha(valor):
+    try:
+        return datetime.strptime(valor, "%Y-%m-%d").date()
+    except ValueError as exc:
+        raise CommandError(f"Fecha inválida '{valor}', use AAAA-MM-DD.") from exc
+
+
+class Command(BaseCommand):
+    help = "Recalcula CitaDiaAgg, ServicioMesAgg y ClienteMetricas del dashboard (backfill o reparación)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", type=_fecha, help="Fecha local inicial (AAAA-MM-DD).")
+        parser.add_argument("--hasta", type=_fecha, help="Fecha local final (AAAA-MM-DD).")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        inicio = perf_counter()
+        filas = rollups.rebuild(
+            desde=options["desde"],
+            hasta=options["hasta"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Rollup reconstruido: {filas} filas en {perf_counter() - inicio:.2f}s.")
+        )
+
+        inicio = perf_counter()
+        celdas = rentabilidad.rebuild(
+            desde=options["desde"],
+            hasta=options["hasta"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Cubo de rentabilidad: {celdas} celdas en {perf_counter() - inicio:.2f}s.")
+        )
+
+        # Las métricas por cliente son acumuladas (no dependen del rango): siempre completas.
+        inicio = perf_counter()
+        clientes = metricas_clientes.recalcular(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Métricas de clientes: {clientes} filas en {perf_counter() - inicio:.2f}s.")
+        )
@@ -0,0 +1,56 @@
+"""
+Reconstruye las tablas FTS5 de la búsqueda (``dashboard.busqueda``): tras
+cargas masivas sin señales, restauraciones o si la migración no pudo crearlas.
+Con ``--probar`` mide además una búsqueda en cada índice.
+
+Uso:
+    python manage.py reindexar_busqueda
+    python manage.py reindexar_busqueda --modelo clientes.cliente --probar "juan"
+"""
+from __future__ import annotations
+
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+
+from dashboard import busqueda
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda de texto completo (SQLite FTS5)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--modelo",
+            action="append",
+            choices=sorted(busqueda.INDICES),
+            help="Índice a reconstruir (repetible; por defecto todos).",
+        )
+        parser.add_argument("--probar", metavar="TEXTO", help="Texto para medir una búsqueda en cada índice.")
+
+    def handle(self, *args, **options):
+        indices = [busqueda.INDICES[m] for m in options["modelo"] or busqueda.INDICES]
+        for indice in indices:
+            modelo = indice.model()
+            using = router.db_for_write(modelo)
+            if not busqueda.fts5_disponible(connections[using]):
+                raise CommandError(
+                    f"La base '{using}' no es SQLite con FTS5; la búsqueda usa el backend de la base o icontains."
+                )
+            inicio = perf_counter()
+            with transaction.atomic(using=using):
+                filas = busqueda.reconstruir(indice, using=using)
+            self.stdout.write(
+                self.style.SUCCESS(f"{indice.tabla}: {filas} filas en {perf_counter() - inicio:.2f}s.")
+            )
+
+            if options["probar"]:
+                inicio = perf_counter()
+                qs = busqueda.por_relevancia(busqueda.filtrar(modelo._default_manager.all(), options["probar"]), "pk")
+                total = qs.count()
+                primeros = list(qs.values_list("pk", flat=True)[:20])
+                self.stdout.write(
+                    f"  '{options['probar']}': {total} resultados, primeros {len(primeros)} "
+                    f"en {(perf_counter() - inicio) * 1000:.1f} ms"
+                )
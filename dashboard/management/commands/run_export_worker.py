@@ -0,0 +1,73 @@
+"""
+Procesa la cola de exportaciones (``ExportJob``) en un proceso aparte.
+
+Se pueden lanzar varios workers a la vez; cada trabajo lo toma uno solo.
+
+Uso:
+    python manage.py run_export_worker
+    python manage.py run_export_worker --once          # vacía la cola y termina
+    python manage.py run_export_worker --max-jobs 50 --intervalo 5
+"""
+from __future__ import annotations
+
+import os
+import socket
+from time import monotonic, sleep
+
+from django.core.management.base import BaseCommand
+
+from dashboard import trabajos
+from dashboard.models import ExportJob
+
+# Segundos entre dos purgas de trabajos antiguos
+INTERVALO_PURGA = 3600
+
+
+class Command(BaseCommand):
+    help = "Worker de exportaciones en segundo plano: genera los archivos de los ExportJob pendientes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Termina cuando la cola queda vacía.")
+        parser.add_argument("--intervalo", type=float, default=2.0, help="Segundos de espera con la cola vacía.")
+        parser.add_argument("--max-jobs", type=int, help="Termina tras procesar este número de trabajos.")
+        parser.add_argument("--nombre", help="Identificador del worker (por defecto host:pid).")
+
+    def handle(self, *args, **options):
+        nombre = options["nombre"] or f"{socket.gethostname()}:{os.getpid()}"
+        procesados = 0
+        ultima_purga = None
+        self.stdout.write(f"Worker {nombre} esperando exportaciones…")
+        try:
+            while True:
+                reencolados = trabajos.reencolar_vencidos()
+                if reencolados:
+                    self.stdout.write(self.style.WARNING(f"{reencolados} trabajo(s) sin latido devueltos a la cola."))
+
+                job = trabajos.reclamar(nombre)
+                if job is None:
+                    if ultima_purga is None or monotonic() - ultima_purga > INTERVALO_PURGA:
+                        borrados = trabajos.purgar()
+                        ultima_purga = monotonic()
+                        if borrados:
+                            self.stdout.write(f"{borrados} exportación(es) antigua(s) eliminada(s).")
+                    if options["once"]:
+                        break
+                    sleep(options["intervalo"])
+                    continue
+
+                inicio = monotonic()
+                job = trabajos.procesar(job)
+                procesados += 1
+                duracion = monotonic() - inicio
+                if job.estado == ExportJob.Estado.COMPLETADO:
+                    self.stdout.write(
+                        self.style.SUCCESS(f"#{job.pk} {job.tipo}: {job.filas_escritas} filas en {duracion:.1f}s")
+                    )
+                else:
+                    self.stderr.write(f"#{job.pk} {job.tipo}: {job.get_estado_display()} · {job.error}")
+
+                if options["max_jobs"] and procesados >= options["max_jobs"]:
+                    break
+        except KeyboardInterrupt:
+            self.stdout.write("Worker detenido.")
+        self.stdout.write(f"Trabajos procesados: {procesados}")
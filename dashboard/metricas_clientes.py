@@ -0,0 +1,103 @@
+"""
+Mantenimiento de ``ClienteMetricas`` (ingresos, visitas y ticket por cliente).
+
+Al crear una transacción se aplica un delta sobre la fila del cliente
+bloqueada con ``select_for_update``; los cambios de monto en una misma
+transacción también se aplican como delta. Los casos menos frecuentes
+(borrado, cambio de cita, cambio de fecha/cliente de una cita facturada)
+recalculan solo a los clientes afectados con una consulta agrupada.
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+
+from .models import ClienteMetricas
+
+_CENTAVOS = Decimal("0.01")
+
+
+def _ticket(ingresos: Decimal, visitas: int) -> Decimal:
+    if not visitas:
+        return Decimal("0.00")
+    return (Decimal(ingresos) / visitas).quantize(_CENTAVOS)
+
+
+@transaction.atomic
+def registrar_transaccion(transaccion) -> None:
+    """Suma una transacción recién creada a las métricas de su cliente."""
+    from transacciones.models import Transaccion
+
+    cita = transaccion.cita
+    nueva_visita = not Transaccion.objects.filter(cita_id=cita.pk).exclude(pk=transaccion.pk).exists()
+
+    metricas, _ = ClienteMetricas.objects.select_for_update().get_or_create(cliente_id=cita.cliente_id)
+    metricas.ingresos_total += Decimal(transaccion.monto or 0)
+    metricas.transacciones += 1
+    if nueva_visita:
+        metricas.visitas += 1
+        if metricas.primera_visita is None or cita.fecha_inicio < metricas.primera_visita:
+            metricas.primera_visita = cita.fecha_inicio
+        if metricas.ultima_visita is None or cita.fecha_inicio > metricas.ultima_visita:
+            metricas.ultima_visita = cita.fecha_inicio
+    metricas.ticket_promedio = _ticket(metricas.ingresos_total, metricas.visitas)
+    metricas.save()
+
+
+@transaction.atomic
+def ajustar_monto(cliente_id: int, delta: Decimal) -> None:
+    """Aplica un cambio de monto de una transacción ya registrada."""
+    if not delta:
+        return
+    metricas = ClienteMetricas.objects.select_for_update().filter(cliente_id=cliente_id).first()
+    if metricas is None:
+        recalcular([cliente_id])
+        return
+    metricas.ingresos_total += delta
+    metricas.ticket_promedio = _ticket(metricas.ingresos_total, metricas.visitas)
+    metricas.save(update_fields=["ingresos_total", "ticket_promedio", "actualizado"])
+
+
+def recalcular(cliente_ids: Optional[Iterable[int]] = None, batch_size: int = 1000) -> int:
+    """Recalcula las métricas de los clientes indicados (todos si es None)."""
+    from transacciones.models import Transaccion
+
+    transacciones = Transaccion.objects.all()
+    metricas = ClienteMetricas.objects.all()
+    if cliente_ids is not None:
+        cliente_ids = {cid for cid in cliente_ids if cid}
+        if not cliente_ids:
+            return 0
+        transacciones = transacciones.filter(cita__cliente_id__in=cliente_ids)
+        metricas = metricas.filter(cliente_id__in=cliente_ids)
+
+    filas = (
+        transacciones.values("cita__cliente_id")
+        .annotate(
+            ingresos=Sum("monto"),
+            n=Count("id"),
+            visitas=Count("cita_id", distinct=True),
+            primera=Min("cita__fecha_inicio"),
+            ultima=Max("cita__fecha_inicio"),
+        )
+        .order_by()
+    )
+    nuevas = [
+        ClienteMetricas(
+            cliente_id=f["cita__cliente_id"],
+            ingresos_total=f["ingresos"] or Decimal("0.00"),
+            transacciones=f["n"],
+            visitas=f["visitas"],
+            primera_visita=f["primera"],
+            ultima_visita=f["ultima"],
+            ticket_promedio=_ticket(f["ingresos"] or 0, f["visitas"]),
+        )
+        for f in filas.iterator()
+    ]
+    with transaction.atomic():
+        metricas.delete()
+        ClienteMetricas.objects.bulk_create(nuevas, batch_size=batch_size)
+    return len(nuevas)
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.24 on 2026-10-16 23:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('servicios', '0002_servicio_costo_alter_servicio_duracion_minutos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CitaDiaAgg',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('estado', models.CharField(max_length=20)),
+                ('hora', models.PositiveSmallIntegerField()),
+                ('dia_semana', models.PositiveSmallIntegerField(help_text='1=Domingo ... 7=Sábado (igual que ExtractWeekDay)')),
+                ('citas', models.PositiveIntegerField(default=0)),
+                ('servicio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups_diarios', to='servicios.servicio')),
+            ],
+            options={
+                'verbose_name': 'rollup diario de citas',
+                'verbose_name_plural': 'rollups diarios de citas',
+                'indexes': [models.Index(fields=['fecha', 'estado'], name='citadiaagg_fecha_estado_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='citadiaagg',
+            constraint=models.UniqueConstraint(fields=('fecha', 'servicio', 'estado', 'hora'), name='citadiaagg_bucket_unico'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.24 on 2026-10-16 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PronosticoIngresos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('firma', models.CharField(max_length=64, unique=True)),
+                ('metodo', models.CharField(choices=[('holt', 'Suavizado exponencial con tendencia (Holt)'), ('ses', 'Suavizado exponencial simple'), ('estacional_naive', 'Estacional ingenuo (mismo mes del año anterior)')], max_length=20)),
+                ('horizonte', models.PositiveSmallIntegerField()),
+                ('ultimo_mes', models.CharField(help_text='Último mes observado (AAAA-MM)', max_length=7)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('labels', models.JSONField(default=list)),
+                ('valores', models.JSONField(default=list)),
+                ('sse', models.FloatField(blank=True, null=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'pronóstico de ingresos',
+                'verbose_name_plural': 'pronósticos de ingresos',
+                'ordering': ['-creado'],
+            },
+        ),
+    ]
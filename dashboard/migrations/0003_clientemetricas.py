@@ -0,0 +1,33 @@
+# Generated by Django 4.2.24 on 2026-10-16 23:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0005_rename_clientes_clie_puntos_8a2c2d_idx_clientes_cl_puntos__71196f_idx_and_more'),
+        ('dashboard', '0002_pronosticoingresos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClienteMetricas',
+            fields=[
+                ('cliente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metricas', serialize=False, to='clientes.cliente')),
+                ('ingresos_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('transacciones', models.PositiveIntegerField(default=0)),
+                ('visitas', models.PositiveIntegerField(default=0)),
+                ('primera_visita', models.DateTimeField(blank=True, null=True)),
+                ('ultima_visita', models.DateTimeField(blank=True, null=True)),
+                ('ticket_promedio', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'métricas de cliente',
+                'verbose_name_plural': 'métricas de clientes',
+                'indexes': [models.Index(fields=['-ingresos_total'], name='clientemetricas_ingresos_idx'), models.Index(fields=['visitas'], name='clientemetricas_visitas_idx'), models.Index(fields=['ultima_visita'], name='clientemetricas_ultima_idx')],
+            },
+        ),
+    ]
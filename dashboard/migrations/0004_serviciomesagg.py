@@ -0,0 +1,37 @@
+# Generated by Django 4.2.24 on 2026-10-17 00:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicios', '0002_servicio_costo_alter_servicio_duracion_minutos'),
+        ('dashboard', '0003_clientemetricas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServicioMesAgg',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primer día del mes (hora local)')),
+                ('estado', models.CharField(max_length=20)),
+                ('citas', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('costo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('margen', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('servicio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rentabilidad_mensual', to='servicios.servicio')),
+            ],
+            options={
+                'verbose_name': 'rentabilidad mensual de servicio',
+                'verbose_name_plural': 'rentabilidad mensual de servicios',
+                'indexes': [models.Index(fields=['mes', 'estado'], name='serviciomesagg_mes_estado_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='serviciomesagg',
+            constraint=models.UniqueConstraint(fields=('servicio', 'mes', 'estado'), name='serviciomesagg_celda_unica'),
+        ),
+    ]
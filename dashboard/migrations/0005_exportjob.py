@@ -0,0 +1,42 @@
+# Generated by Django 4.2.24 on 2026-10-17 00:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('dashboard', '0004_serviciomesagg'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('dashboard_citas_csv', 'Dashboard · citas (CSV)'), ('dashboard_citas_xlsx', 'Dashboard · citas, transacciones y clientes (Excel)'), ('citas_csv', 'Agenda de citas (CSV)'), ('clientes_csv', 'Clientes (CSV)')], max_length=30)),
+                ('consulta', models.TextField(blank=True, help_text='Querystring con los filtros de la vista de origen')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En proceso'), ('completado', 'Completado'), ('fallido', 'Fallido')], default='pendiente', max_length=20)),
+                ('worker', models.CharField(blank=True, max_length=120)),
+                ('filas_total', models.PositiveIntegerField(blank=True, null=True)),
+                ('filas_escritas', models.PositiveIntegerField(default=0)),
+                ('archivo', models.FileField(blank=True, upload_to='exports/%Y/%m/')),
+                ('error', models.TextField(blank=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('iniciado', models.DateTimeField(blank=True, null=True)),
+                ('terminado', models.DateTimeField(blank=True, null=True)),
+                ('actualizado', models.DateTimeField(default=django.utils.timezone.now, help_text='Último latido del worker')),
+                ('solicitado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='exportaciones', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'trabajo de exportación',
+                'verbose_name_plural': 'trabajos de exportación',
+                'ordering': ['-creado'],
+                'indexes': [models.Index(fields=['estado', 'creado'], name='exportjob_estado_creado_idx')],
+            },
+        ),
+    ]
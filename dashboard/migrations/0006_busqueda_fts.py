@@ -0,0 +1,78 @@
+# Generated by Django 4.2.24 on 2026-10-17 00:00
+
+from django.db import migrations
+
+# Tablas FTS5 de la búsqueda (ver dashboard.busqueda) y su carga inicial.
+# Solo en SQLite con FTS5; en otras bases no hace nada.
+
+TOKENIZADOR = "unicode61 remove_diacritics 2"
+
+# tabla, columnas, SELECT que la llena (rowid primero)
+TABLAS = [
+    (
+        "busqueda_clientes_cliente",
+        ("nombre", "documento", "telefono", "email"),
+        "SELECT id, nombre, documento, telefono, email FROM clientes_cliente",
+    ),
+    (
+        "busqueda_vehiculos_vehiculo",
+        ("placa", "marca", "modelo", "cliente_nombre"),
+        "SELECT v.id, v.placa, v.marca, v.modelo, c.nombre FROM vehiculos_vehiculo v "
+        "LEFT JOIN clientes_cliente c ON c.id = v.cliente_id",
+    ),
+    (
+        "busqueda_citas_cita",
+        ("cliente_nombre", "vehiculo_placa", "servicio_nombre", "descripcion"),
+        "SELECT ci.id, c.nombre, v.placa, s.nombre, ci.descripcion FROM citas_cita ci "
+        "LEFT JOIN clientes_cliente c ON c.id = ci.cliente_id "
+        "LEFT JOIN vehiculos_vehiculo v ON v.id = ci.vehiculo_id "
+        "LEFT JOIN servicios_servicio s ON s.id = ci.servicio_id",
+    ),
+    (
+        "busqueda_inventario_repuesto",
+        ("nombre", "codigo", "descripcion", "proveedor"),
+        "SELECT id, nombre, codigo, descripcion, proveedor FROM inventario_repuesto",
+    ),
+]
+
+
+def crear(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp._busqueda_prueba USING fts5(x)")
+            cursor.execute("DROP TABLE temp._busqueda_prueba")
+        except Exception:
+            # SQLite sin FTS5: la búsqueda sigue con icontains
+            return
+        for tabla, columnas, select in TABLAS:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {tabla} USING fts5({', '.join(columnas)}, tokenize='{TOKENIZADOR}')"
+            )
+            cursor.execute(f"INSERT INTO {tabla} (rowid, {', '.join(columnas)}) {select}")
+
+
+def eliminar(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for tabla, _, _ in TABLAS:
+            cursor.execute(f"DROP TABLE IF EXISTS {tabla}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0005_exportjob"),
+        ("clientes", "0005_rename_clientes_clie_puntos_8a2c2d_idx_clientes_cl_puntos__71196f_idx_and_more"),
+        ("vehiculos", "0001_initial"),
+        ("servicios", "0002_servicio_costo_alter_servicio_duracion_minutos"),
+        ("citas", "0005_recurso_cita_recurso"),
+        ("inventario", "0004_movimiento_tipo_fecha_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(crear, eliminar),
+    ]
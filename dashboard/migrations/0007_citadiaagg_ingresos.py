@@ -0,0 +1,56 @@
+# Generated by Django 4.2.24 on 2026-10-17 01:43
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, ExtractHour, ExtractWeekDay, TruncDate
+
+
+def reconstruir_rollup(apps, schema_editor):
+    """Vuelve a armar el rollup con los ingresos (precio congelado de cada cita)."""
+    Cita = apps.get_model("citas", "Cita")
+    CitaDiaAgg = apps.get_model("dashboard", "CitaDiaAgg")
+    filas = (
+        Cita.objects.annotate(
+            dia=TruncDate("fecha_inicio"),
+            hh=ExtractHour("fecha_inicio"),
+            dow=ExtractWeekDay("fecha_inicio"),
+        )
+        .values("dia", "servicio_id", "estado", "hh", "dow")
+        .annotate(n=Count("id"), ing=Coalesce(Sum(Coalesce("precio_servicio", "servicio__precio")), Decimal("0.00")))
+        .order_by()
+    )
+    CitaDiaAgg.objects.all().delete()
+    CitaDiaAgg.objects.bulk_create(
+        (
+            CitaDiaAgg(
+                fecha=f["dia"],
+                servicio_id=f["servicio_id"],
+                estado=f["estado"] or "",
+                hora=f["hh"],
+                dia_semana=f["dow"],
+                citas=f["n"],
+                ingresos=f["ing"],
+            )
+            for f in filas.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citas', '0003_cita_precio_costo_servicio'),
+        ('dashboard', '0006_busqueda_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='citadiaagg',
+            name='ingresos',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.RunPython(reconstruir_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.24 on 2026-10-17 01:56
+
+from django.db import migrations, models
+
+
+def vaciar(apps, schema_editor):
+    """Las filas viejas son solo caché (una por firma): se reajustan al pedirlas."""
+    apps.get_model("dashboard", "PronosticoIngresos").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_citadiaagg_ingresos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pronosticoingresos',
+            name='ambito',
+            field=models.CharField(blank=True, default='', help_text='Estados filtrados, separados por coma', max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='pronosticoingresos',
+            name='firma',
+            field=models.CharField(max_length=64),
+        ),
+        migrations.RunPython(vaciar, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='pronosticoingresos',
+            constraint=models.UniqueConstraint(fields=('metodo', 'horizonte', 'ambito'), name='pronostico_unico_por_ambito'),
+        ),
+    ]
@@ -0,0 +1,224 @@
+"""
+Tablas de soporte para las analíticas del dashboard.
+"""
+from __future__ import annotations
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class CitaDiaAgg(models.Model):
+    """
+    Rollup diario de citas por (fecha local, servicio, estado, hora).
+
+    Se mantiene con las señales de ``Cita`` (ver ``dashboard.signals``) y se
+    reconstruye con ``python manage.py rebuild_rollups``. ``ingresos`` suma el
+    precio congelado de cada cita (``Cita.precio_servicio``; el del servicio
+    solo en citas anteriores a congelarlo), así que editar un servicio no
+    reescribe días pasados.
+    """
+
+    fecha = models.DateField()
+    servicio = models.ForeignKey("servicios.Servicio", on_delete=models.CASCADE, related_name="rollups_diarios")
+    estado = models.CharField(max_length=20)
+    hora = models.PositiveSmallIntegerField()
+    dia_semana = models.PositiveSmallIntegerField(help_text="1=Domingo ... 7=Sábado (igual que ExtractWeekDay)")
+    citas = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "rollup diario de citas"
+        verbose_name_plural = "rollups diarios de citas"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["fecha", "servicio", "estado", "hora"],
+                name="citadiaagg_bucket_unico",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["fecha", "estado"], name="citadiaagg_fecha_estado_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.fecha:%Y-%m-%d} {self.hora:02d}h · {self.estado} · {self.citas}"
+
+
+class PronosticoIngresos(models.Model):
+    """
+    Pronóstico de ingresos mensuales ya ajustado (ver ``dashboard.forecast``).
+
+    ``firma`` resume la serie de entrada, el método y el horizonte: mientras
+    los datos no cambien, el dashboard reutiliza la fila en lugar de volver a
+    ajustar el modelo en cada request. Hay una sola fila por método, horizonte
+    y ``ambito`` (los estados filtrados): cuando la serie cambia se reemplaza,
+    así la tabla no crece con cada escritura.
+    """
+
+    class Metodo(models.TextChoices):
+        HOLT = "holt", "Suavizado exponencial con tendencia (Holt)"
+        SES = "ses", "Suavizado exponencial simple"
+        ESTACIONAL_NAIVE = "estacional_naive", "Estacional ingenuo (mismo mes del año anterior)"
+
+    firma = models.CharField(max_length=64)
+    metodo = models.CharField(max_length=20, choices=Metodo.choices)
+    horizonte = models.PositiveSmallIntegerField()
+    ambito = models.CharField(max_length=200, blank=True, default="", help_text="Estados filtrados, separados por coma")
+    ultimo_mes = models.CharField(max_length=7, help_text="Último mes observado (AAAA-MM)")
+    parametros = models.JSONField(default=dict, blank=True)
+    labels = models.JSONField(default=list)
+    valores = models.JSONField(default=list)
+    sse = models.FloatField(null=True, blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "pronóstico de ingresos"
+        verbose_name_plural = "pronósticos de ingresos"
+        ordering = ["-creado"]
+        constraints = [
+            models.UniqueConstraint(fields=["metodo", "horizonte", "ambito"], name="pronostico_unico_por_ambito"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.get_metodo_display()} desde {self.ultimo_mes} (+{self.horizonte})"
+
+
+class ClienteMetricas(models.Model):
+    """
+    Métricas acumuladas de facturación por cliente (a partir de ``Transaccion.monto``).
+
+    Se actualiza en la misma transacción en que se crea/modifica cada
+    ``Transaccion`` (ver ``dashboard.metricas_clientes``). Una visita es una
+    cita con al menos una transacción.
+    """
+
+    cliente = models.OneToOneField(
+        "clientes.Cliente", on_delete=models.CASCADE, primary_key=True, related_name="metricas"
+    )
+    ingresos_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    transacciones = models.PositiveIntegerField(default=0)
+    visitas = models.PositiveIntegerField(default=0)
+    primera_visita = models.DateTimeField(null=True, blank=True)
+    ultima_visita = models.DateTimeField(null=True, blank=True)
+    ticket_promedio = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "métricas de cliente"
+        verbose_name_plural = "métricas de clientes"
+        indexes = [
+            models.Index(fields=["-ingresos_total"], name="clientemetricas_ingresos_idx"),
+            models.Index(fields=["visitas"], name="clientemetricas_visitas_idx"),
+            models.Index(fields=["ultima_visita"], name="clientemetricas_ultima_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.cliente} · {self.visitas} visitas · {self.ingresos_total}"
+
+
+class ServicioMesAgg(models.Model):
+    """
+    Cubo de rentabilidad por (servicio, mes local, estado).
+
+    Ingresos y costos salen del precio/costo congelados en cada cita
+    (``Cita.precio_servicio`` / ``Cita.costo_servicio``), de modo que editar un
+    servicio no reescribe meses anteriores. Se mantiene con las señales de
+    ``Cita`` (ver ``dashboard.rentabilidad``) y se reconstruye con
+    ``python manage.py rebuild_rollups``.
+    """
+
+    servicio = models.ForeignKey("servicios.Servicio", on_delete=models.CASCADE, related_name="rentabilidad_mensual")
+    mes = models.DateField(help_text="Primer día del mes (hora local)")
+    estado = models.CharField(max_length=20)
+    citas = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    costo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    margen = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "rentabilidad mensual de servicio"
+        verbose_name_plural = "rentabilidad mensual de servicios"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["servicio", "mes", "estado"],
+                name="serviciomesagg_celda_unica",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["mes", "estado"], name="serviciomesagg_mes_estado_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.servicio_id} · {self.mes:%Y-%m} · {self.estado} · {self.margen}"
+
+
+class ExportJob(models.Model):
+    """
+    Exportación pedida desde la interfaz y generada fuera del request.
+
+    ``python manage.py run_export_worker`` toma los trabajos pendientes (varios
+    workers pueden correr a la vez), escribe el archivo bajo ``MEDIA_ROOT`` y
+    va guardando el avance; la interfaz consulta el estado y descarga el
+    resultado (ver ``dashboard.trabajos``).
+    """
+
+    class Tipo(models.TextChoices):
+        DASHBOARD_CITAS_CSV = "dashboard_citas_csv", "Dashboard · citas (CSV)"
+        DASHBOARD_CITAS_XLSX = "dashboard_citas_xlsx", "Dashboard · citas, transacciones y clientes (Excel)"
+        CITAS_CSV = "citas_csv", "Agenda de citas (CSV)"
+        CLIENTES_CSV = "clientes_csv", "Clientes (CSV)"
+
+    class Estado(models.TextChoices):
+        PENDIENTE = "pendiente", "Pendiente"
+        EN_PROCESO = "en_proceso", "En proceso"
+        COMPLETADO = "completado", "Completado"
+        FALLIDO = "fallido", "Fallido"
+
+    tipo = models.CharField(max_length=30, choices=Tipo.choices)
+    consulta = models.TextField(blank=True, help_text="Querystring con los filtros de la vista de origen")
+    estado = models.CharField(max_length=20, choices=Estado.choices, default=Estado.PENDIENTE)
+    solicitado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="exportaciones"
+    )
+    worker = models.CharField(max_length=120, blank=True)
+    filas_total = models.PositiveIntegerField(null=True, blank=True)
+    filas_escritas = models.PositiveIntegerField(default=0)
+    archivo = models.FileField(upload_to="exports/%Y/%m/", blank=True)
+    error = models.TextField(blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    iniciado = models.DateTimeField(null=True, blank=True)
+    terminado = models.DateTimeField(null=True, blank=True)
+    actualizado = models.DateTimeField(default=timezone.now, help_text="Último latido del worker")
+
+    class Meta:
+        verbose_name = "trabajo de exportación"
+        verbose_name_plural = "trabajos de exportación"
+        ordering = ["-creado"]
+        indexes = [
+            models.Index(fields=["estado", "creado"], name="exportjob_estado_creado_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.get_tipo_display()} #{self.pk} · {self.get_estado_display()}"
+
+    @property
+    def progreso(self):
+        """Fracción escrita (0-1) o None si aún no se conoce el total."""
+        if self.estado == self.Estado.COMPLETADO:
+            return 1.0
+        if not self.filas_total:
+            return None
+        return min(self.filas_escritas / self.filas_total, 1.0)
+
+    @property
+    def eta_segundos(self):
+        """Segundos restantes estimados con el ritmo medio desde que empezó."""
+        if self.estado != self.Estado.EN_PROCESO or not self.iniciado or not self.filas_total:
+            return None
+        if not self.filas_escritas:
+            return None
+        transcurrido = (self.actualizado - self.iniciado).total_seconds()
+        if transcurrido <= 0:
+            return None
+        restantes = max(self.filas_total - self.filas_escritas, 0)
+        return round(restantes * transcurrido / self.filas_escritas, 1)
@@ -0,0 +1,261 @@
+"""
+Paginación por cursor (keyset) para las listas grandes.
+
+En vez de ``OFFSET`` (que recorre y descarta todas las filas anteriores) cada
+página se pide "después de" la última fila de la anterior: el orden del
+queryset (el ``o`` de la vista o el de ``Meta.ordering``) más la pk como
+desempate forma una clave única y la página siguiente es
+``WHERE (k1, k2, ..., pk) > (v1, v2, ..., pk0) ORDER BY k1, k2, ..., pk LIMIT n+1``.
+Con un índice sobre el orden, la página 500 cuesta lo mismo que la primera.
+
+El cursor (``?cursor=``) es opaco: va firmado (``django.core.signing``) y lleva
+los valores de la fila frontera, la dirección y el número de página. Un cursor
+inválido o de otro orden vuelve a la primera página.
+
+Los NULL van primero en orden ascendente y al final en descendente (lo que
+SQLite hace por defecto), también en PostgreSQL.
+
+El total (``paginator.count``) es aproximado: ``COUNT(*)`` del queryset
+filtrado guardado en caché ``PAGINACION_CONTEO_SEGUNDOS`` (60 por defecto)
+bajo la consulta, con el mismo alias que ``dashboard.cache``.
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.db.models import F, Q
+from django.db.models.expressions import OrderBy
+
+PARAMETRO = "cursor"
+_SAL = "dashboard.paginacion"
+
+# (nombre, descendente, admite_nulos)
+Clave = Tuple[str, bool, bool]
+
+
+# ---------- Orden ----------
+def _admite_nulos(queryset, nombre: str) -> bool:
+    if nombre == "pk":
+        return False
+    if nombre in queryset.query.annotations:
+        return True
+    opts = queryset.model._meta
+    nulo = False
+    for parte in nombre.split("__"):
+        try:
+            campo = opts.get_field(parte)
+        except FieldDoesNotExist:
+            return True
+        nulo = nulo or campo.null
+        if campo.is_relation:
+            opts = campo.related_model._meta
+    return nulo
+
+
+def claves(queryset) -> List[Clave]:
+    """Claves de orden del queryset con la pk al final como desempate."""
+    orden = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+    resultado = []
+    for item in orden:
+        if isinstance(item, OrderBy) and isinstance(item.expression, F):
+            nombre, desc = item.expression.name, item.descending
+        elif isinstance(item, str) and item not in ("?", ""):
+            nombre, desc = item.lstrip("-"), item.startswith("-")
+        else:
+            raise ValueError(f"Orden no soportado por la paginación por cursor: {item!r}")
+        if nombre in ("pk", queryset.model._meta.pk.name):
+            break
+        resultado.append((nombre, desc, _admite_nulos(queryset, nombre)))
+    ultimo_desc = resultado[-1][1] if resultado else False
+    resultado.append(("pk", ultimo_desc, False))
+    return resultado
+
+
+def _orden(clave: Clave, invertir: bool):
+    nombre, desc, nulos = clave
+    desc = desc != invertir
+    if not nulos:
+        return f"-{nombre}" if desc else nombre
+    return F(nombre).desc(nulls_last=True) if desc else F(nombre).asc(nulls_first=True)
+
+
+def _despues(claves_: List[Clave], valores: list, invertir: bool) -> Q:
+    """Filas estrictamente posteriores a ``valores`` en el orden (o anteriores si ``invertir``)."""
+    condicion = Q(pk__in=[])
+    iguales = Q()
+    for (nombre, desc, nulos), valor in zip(claves_, valores):
+        desc = desc != invertir
+        if valor is None:
+            # NULL va primero en ascendente: después solo vienen los no nulos
+            mayor = Q() if desc else Q(**{f"{nombre}__isnull": False})
+            igual = Q(**{f"{nombre}__isnull": True})
+        else:
+            mayor = Q(**{f"{nombre}__{'lt' if desc else 'gt'}": valor})
+            if nulos and desc:
+                mayor |= Q(**{f"{nombre}__isnull": True})
+            igual = Q(**{nombre: valor})
+        if not (valor is None and desc):
+            condicion |= iguales & mayor
+        iguales &= igual
+    nombre, desc, nulos = claves_[0]
+    if not nulos and valores[0] is not None:
+        # Rango redundante sobre la primera clave para que la base use su índice
+        condicion &= Q(**{f"{nombre}__{'lte' if desc != invertir else 'gte'}": valores[0]})
+    return condicion
+
+
+def _valor(obj, nombre: str):
+    for parte in nombre.split("__"):
+        if obj is None:
+            return None
+        obj = getattr(obj, parte)
+    return obj
+
+
+# ---------- Cursor ----------
+def _serializar(valor):
+    if isinstance(valor, datetime):
+        return ["t", valor.isoformat()]
+    if isinstance(valor, date):
+        return ["d", valor.isoformat()]
+    if isinstance(valor, Decimal):
+        return ["n", str(valor)]
+    return valor
+
+
+def _deserializar(valor):
+    if isinstance(valor, list):
+        tipo, texto = valor
+        return {"t": datetime.fromisoformat, "d": date.fromisoformat, "n": Decimal}[tipo](texto)
+    return valor
+
+
+def _huella(claves_: List[Clave]) -> str:
+    texto = ",".join(f"{'-' if desc else ''}{nombre}" for nombre, desc, _ in claves_)
+    return hashlib.md5(texto.encode()).hexdigest()[:8]
+
+
+class Pagina:
+    """Página con la interfaz que usan las plantillas (``has_next``, ``number``...) más los cursores."""
+
+    def __init__(self, object_list, paginator, number, anterior=None, siguiente=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.number = number
+        self.previous_cursor = anterior
+        self.next_cursor = siguiente
+
+    def __repr__(self):
+        return f"<Página {self.number} de ~{self.paginator.num_pages}>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Pagina ``queryset`` por cursor; ``page(cursor)`` devuelve una ``Pagina``."""
+
+    def __init__(self, queryset, per_page: int):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.claves = claves(queryset)
+        self._huella = _huella(self.claves)
+        self._count: Optional[int] = None
+
+    def _cursor(self, obj, direccion: str, numero: int) -> str:
+        valores = [_serializar(_valor(obj, nombre)) for nombre, _, _ in self.claves]
+        return signing.dumps({"h": self._huella, "v": valores, "d": direccion, "n": numero}, salt=_SAL, compress=True)
+
+    def _leer(self, cursor: Optional[str]):
+        if not cursor:
+            return None
+        try:
+            datos = signing.loads(cursor, salt=_SAL)
+            if datos["h"] != self._huella or len(datos["v"]) != len(self.claves):
+                return None
+            return [_deserializar(v) for v in datos["v"]], datos["d"] == "p", max(int(datos["n"]), 1)
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            return None
+
+    def page(self, cursor: Optional[str] = None) -> Pagina:
+        leido = self._leer(cursor)
+        invertir = bool(leido and leido[1])
+        qs = self.queryset.order_by(*(_orden(clave, invertir) for clave in self.claves))
+        numero = 1
+        if leido:
+            valores, _, numero = leido
+            qs = qs.filter(_despues(self.claves, valores, invertir))
+        filas = list(qs[: self.per_page + 1])
+        hay_mas = len(filas) > self.per_page
+        filas = filas[: self.per_page]
+        if invertir:
+            if not hay_mas:
+                # Se llegó al principio (p. ej. se borraron filas): la primera página completa
+                return self.page(None)
+            filas.reverse()
+            # Volviendo atrás la página siguiente existe (de ella venimos)
+            hay_anterior, hay_siguiente = numero > 1, True
+        else:
+            hay_anterior, hay_siguiente = leido is not None and numero > 1, hay_mas
+        if not filas:
+            return Pagina(filas, self, numero)
+        if leido is None and not hay_mas:
+            self._count = len(filas)
+        anterior = self._cursor(filas[0], "p", numero - 1) if hay_anterior else None
+        siguiente = self._cursor(filas[-1], "n", numero + 1) if hay_siguiente else None
+        return Pagina(filas, self, numero, anterior, siguiente)
+
+    @property
+    def count(self) -> int:
+        """Total aproximado: ``COUNT(*)`` cacheado por consulta."""
+        if self._count is None:
+            qs = self.queryset.order_by()
+            try:
+                sql, params = qs.query.get_compiler(using=qs.db).as_sql()
+            except EmptyResultSet:
+                self._count = 0
+                return 0
+            clave = "paginacion:conteo:" + hashlib.md5(f"{qs.db}|{sql}|{params!r}".encode()).hexdigest()
+            from . import cache as dashboard_cache
+
+            almacen = dashboard_cache.cache()
+            self._count = almacen.get(clave)
+            if self._count is None:
+                self._count = qs.count()
+                almacen.set(clave, self._count, timeout=getattr(settings, "PAGINACION_CONTEO_SEGUNDOS", 60))
+        return self._count
+
+    @property
+    def num_pages(self) -> int:
+        return max(math.ceil(self.count / self.per_page), 1) if self.per_page else 1
+
+
+class PaginacionKeysetMixin:
+    """Para ``ListView``: pagina con ``KeysetPaginator`` leyendo ``?cursor=`` en vez de ``?page=``."""
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size)
+        page = paginator.page(self.request.GET.get(PARAMETRO))
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+Constructores de los paneles del dashboard.
+
+Cada panel recibe un ``DashboardData`` con los filtros ya normalizados y
+devuelve un dict serializable a JSON. Los agregados base (por mes, servicio,
+estado y día/hora) se calculan de forma perezosa y una sola vez por instancia,
+de modo que el endpoint ``api/bundle/`` puede armar todos los paneles con un
+solo recorrido por agregado en lugar de repetir la consulta en cada API.
+
+Los agregados por mes, servicio, estado y día/hora leen el rollup diario
+``CitaDiaAgg``: su costo depende del número de días de la ventana, no del
+número de citas. LTV y repetición leen ``ClienteMetricas`` (facturación
+acumulada por cliente) y el margen por servicio lee el cubo mensual
+``ServicioMesAgg``.
+"""
+
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils.functional import cached_property
+
+from clientes.models import Cliente
+from servicios.models import Servicio
+
+from . import cohortes, forecast, inventario_metricas, rentabilidad
+from .models import CitaDiaAgg, ClienteMetricas
+
+
+class DashboardData:
+    """Agregados base compartidos por los paneles para un mismo filtro."""
+
+    def __init__(self, qs, desde, hasta, estados):
+        self.qs = qs
+        self.desde = desde
+        self.hasta = hasta
+        self.estados = estados
+
+    @cached_property
+    def rollup(self):
+        """Rollup diario (``CitaDiaAgg``) con los mismos filtros que ``qs``."""
+        qs = CitaDiaAgg.objects.filter(fecha__range=(self.desde, self.hasta))
+        if self.estados:
+            qs = qs.filter(estado__in=self.estados)
+        return qs
+
+    @cached_property
+    def por_mes(self):
+        rows = (
+            self.rollup.annotate(mes=TruncMonth("fecha"))
+              .values("mes")
+              .annotate(n=Sum("citas"), ingresos=Sum("ingresos"))
+              .order_by("mes")
+        )
+        return list(rows)
+
+    @cached_property
+    def por_servicio(self):
+        rows = (
+            self.rollup.values("servicio_id", "servicio__nombre", "servicio__costo")
+              .annotate(ingresos=Sum("ingresos"), n=Sum("citas"))
+              .order_by("-ingresos")
+        )
+        return list(rows)
+
+    @cached_property
+    def por_estado(self):
+        rows = self.rollup.values("estado").annotate(n=Sum("citas")).order_by("-n")
+        return list(rows)
+
+    @cached_property
+    def rentabilidad_por_servicio(self):
+        return list(
+            rentabilidad.agrupar(rentabilidad.consulta(self.desde, self.hasta, self.estados), "servicio")
+        )
+
+    @cached_property
+    def clientes_activos(self):
+        """Métricas de los clientes con visitas facturadas que tocan la ventana (aprox. por primera/última)."""
+        return ClienteMetricas.objects.filter(
+            visitas__gt=0,
+            ultima_visita__date__gte=self.desde,
+            primera_visita__date__lte=self.hasta,
+        )
+
+    @cached_property
+    def por_dia_hora(self):
+        rows = (
+            self.rollup.values("dia_semana", "hora")
+              .annotate(n=Sum("citas"))
+              .order_by("dia_semana", "hora")
+        )
+        return list(rows)
+
+
+# ---------- Paneles base ----------
+def panel_kpis(data):
+    return {
+        "clientes": Cliente.objects.count(),
+        "servicios": Servicio.objects.count(),
+        "citas": sum(r["n"] for r in data.por_estado),
+        "ingresos": float(sum(r["ingresos"] or 0 for r in data.por_servicio)),
+    }
+
+
+def panel_timeseries(data):
+    labels, series_citas, series_ingresos = [], [], []
+    for row in data.por_mes:
+        labels.append(row["mes"].strftime("%Y-%m"))
+        series_citas.append(row["n"])
+        series_ingresos.append(float(row["ingresos"] or 0.0))
+
+    # Pronóstico persistido: solo se reajusta cuando cambia la serie
+    forecast_labels, forecast_ingresos = forecast.pronostico(
+        labels, series_ingresos, ambito=",".join(sorted(set(data.estados or [])))
+    )
+
+    return {
+        "labels": labels,
+        "citas": series_citas,
+        "ingresos": series_ingresos,
+        "forecast_labels": forecast_labels,
+        "forecast_ingresos": forecast_ingresos,
+    }
+
+
+def panel_top_servicios(data):
+    top = data.por_servicio[:10]
+    labels = [r["servicio__nombre"] or "—" for r in top]
+    ingresos = [float(r["ingresos"] or 0.0) for r in top]
+    cantidad = [int(r["n"]) for r in top]
+    return {"labels": labels, "ingresos": ingresos, "cantidad": cantidad}
+
+
+def panel_estado_pastel(data):
+    labels = [r["estado"] or "—" for r in data.por_estado]
+    valores = [r["n"] for r in data.por_estado]
+    return {"labels": labels, "values": valores}
+
+
+# ---------- Paneles BI avanzados ----------
+def panel_heatmap_dia_hora(data):
+    """
+    Heatmap de volumen por día de la semana (ExtractWeekDay: 1=Dom, 7=Sáb)
+    y por hora (0-23) usando fecha_inicio.
+    """
+    heat = [[0]*24 for _ in range(7)]
+    for r in data.por_dia_hora:
+        dow = (r["dia_semana"] or 1) - 1  # 0..6
+        hh = r["hora"] or 0
+        if 0 <= dow <= 6 and 0 <= hh <= 23:
+            heat[dow][hh] = r["n"]
+    return {"matrix": heat, "labels_dow": ["Dom","Lun","Mar","Mié","Jue","Vie","Sáb"], "labels_hh": list(range(24))}
+
+
+def panel_cohortes(data):
+    """
+    Cohortes mensuales por mes de la primera cita del cliente: qué fracción de
+    cada cohorte vuelve a tener citas X meses después (ver ``dashboard.cohortes``).
+    """
+    return cohortes.calcular_cohortes(data.desde, data.hasta, data.estados)
+
+
+def panel_ltv(data):
+    """
+    LTV: ingresos facturados (Transaccion.monto) acumulados por cliente, promediados
+    entre los clientes con visitas en la ventana. También devolvemos top clientes por valor.
+    """
+    activos = data.clientes_activos
+    ltv_prom = activos.aggregate(v=Avg("ingresos_total"))["v"] or 0
+    top = activos.order_by("-ingresos_total").values("cliente_id", "cliente__nombre", "ingresos_total")[:10]
+    return {
+        "ltv_promedio": round(float(ltv_prom), 2),
+        "labels": [r["cliente__nombre"] or f"ID {r['cliente_id']}" for r in top],
+        "valores": [float(r["ingresos_total"] or 0.0) for r in top],
+    }
+
+
+def panel_repeat_rate(data):
+    """
+    Repetición: % de clientes con 2+ visitas facturadas entre los activos en la ventana.
+    """
+    agg = data.clientes_activos.aggregate(total=Count("pk"), repetidores=Count("pk", filter=Q(visitas__gte=2)))
+    total = agg["total"] or 1
+    repetidores = agg["repetidores"] or 0
+    return {"repeat_rate": round(repetidores / total, 3), "total": total, "repetidores": repetidores}
+
+
+def panel_inventario_metricas(data):
+    """
+    Métricas de inventario enriquecidas con rotación, cobertura, alertas y pronósticos
+    basados en los movimientos reales del módulo de inventario (ver ``dashboard.inventario_metricas``).
+    """
+    return inventario_metricas.calcular(data.desde, data.hasta)
+
+
+def panel_margen_servicios(data):
+    """
+    Margen por servicio (top 10 por ingresos) desde el cubo de rentabilidad: precio y
+    costo vigentes en cada cita. La ventana se amplía a meses completos.
+    """
+    labels, ids, ingresos, costos, margen = [], [], [], [], []
+    for r in data.rentabilidad_por_servicio[:10]:
+        labels.append(r["servicio__nombre"] or "—")
+        ids.append(r["servicio_id"])
+        ingresos.append(float(r["ingresos_total"] or 0.0))
+        costos.append(float(r["costo_total"] or 0.0))
+        margen.append(float(r["margen_total"] or 0.0))
+    return {"labels": labels, "servicio_ids": ids, "ingresos": ingresos, "costos": costos, "margen": margen}
+
+
+def panel_funnel_citas(data):
+    """
+    Embudo simple por estado (Pendiente -> En proceso -> Completada), Cancelada aparte.
+    """
+    conteos = {r["estado"]: r["n"] for r in data.por_estado}
+    return {
+        "pendiente": conteos.get("pendiente", 0),
+        "en_proceso": conteos.get("en_proceso", 0),
+        "completada": conteos.get("completada", 0),
+        "cancelada": conteos.get("cancelada", 0),
+    }
+
+
+# Registro de paneles (clave -> constructor) usado por las APIs, el bundle y la caché
+PANELES = {
+    "kpis": panel_kpis,
+    "timeseries": panel_timeseries,
+    "top_servicios": panel_top_servicios,
+    "estado_pastel": panel_estado_pastel,
+    "heatmap_dia_hora": panel_heatmap_dia_hora,
+    "cohortes": panel_cohortes,
+    "ltv": panel_ltv,
+    "repeat_rate": panel_repeat_rate,
+    "inventario_metricas": panel_inventario_metricas,
+    "margen_servicios": panel_margen_servicios,
+    "funnel_citas": panel_funnel_citas,
+}
+
@@ -0,0 +1,164 @@
+"""
+Cubo de rentabilidad por servicio y mes (``ServicioMesAgg``).
+
+Cada cita aporta una celda (servicio, mes local, estado) con su precio y
+costo congelados. Las señales de ``Cita`` restan la contribución anterior y
+suman la nueva; ``rebuild`` recalcula un rango de meses con una sola consulta
+agrupada. ``consulta``/``agrupar`` sirven los cortes por servicio, por mes o
+ambos al dashboard, al detalle del servicio y a la exportación CSV.
+"""
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .models import ServicioMesAgg
+
+_CERO = Decimal("0.00")
+
+# (servicio_id, mes, estado)
+Celda = Tuple[int, date, str]
+
+
+class Aporte(NamedTuple):
+    citas: int
+    ingresos: Decimal
+    costo: Decimal
+
+
+def inicio_mes(fecha: date) -> date:
+    return fecha.replace(day=1)
+
+
+def celda_para(fecha_inicio, servicio_id, estado) -> Optional[Celda]:
+    """Celda del cubo para una cita (mes de su fecha local)."""
+    if fecha_inicio is None or servicio_id is None:
+        return None
+    local = timezone.localtime(fecha_inicio) if timezone.is_aware(fecha_inicio) else fecha_inicio
+    return (servicio_id, inicio_mes(local.date()), estado or "")
+
+
+def aporte_de(precio, costo) -> Aporte:
+    """Contribución de una cita al cubo."""
+    return Aporte(1, Decimal(precio or 0), Decimal(costo or 0))
+
+
+def aplicar(celda: Optional[Celda], aporte: Aporte, signo: int = 1) -> None:
+    """Suma (signo=1) o resta (signo=-1) el aporte de una cita a su celda."""
+    if celda is None:
+        return
+    servicio_id, mes, estado = celda
+    filtros = {"servicio_id": servicio_id, "mes": mes, "estado": estado}
+    citas, ingresos, costo = signo * aporte.citas, signo * aporte.ingresos, signo * aporte.costo
+    cambios = {
+        "citas": F("citas") + citas,
+        "ingresos": F("ingresos") + ingresos,
+        "costo": F("costo") + costo,
+        "margen": F("margen") + (ingresos - costo),
+    }
+    with transaction.atomic():
+        if signo < 0:
+            ServicioMesAgg.objects.filter(citas__gte=-citas, **filtros).update(**cambios)
+            ServicioMesAgg.objects.filter(citas=0, **filtros).delete()
+            return
+        if ServicioMesAgg.objects.filter(**filtros).update(**cambios):
+            return
+        try:
+            with transaction.atomic():
+                ServicioMesAgg.objects.create(
+                    citas=citas, ingresos=ingresos, costo=costo, margen=ingresos - costo, **filtros
+                )
+        except IntegrityError:
+            # Otro proceso creó la celda entre el update y el insert.
+            ServicioMesAgg.objects.filter(**filtros).update(**cambios)
+
+
+def rebuild(desde: Optional[date] = None, hasta: Optional[date] = None, batch_size: int = 1000) -> int:
+    """Recalcula el cubo para los meses que tocan [desde, hasta] (todo si no se indica)."""
+    from citas.models import Cita
+
+    citas = Cita.objects.annotate(m=TruncMonth("fecha_inicio", output_field=DateField()))
+    celdas = ServicioMesAgg.objects.all()
+    if desde:
+        citas = citas.filter(m__gte=inicio_mes(desde))
+        celdas = celdas.filter(mes__gte=inicio_mes(desde))
+    if hasta:
+        citas = citas.filter(m__lte=inicio_mes(hasta))
+        celdas = celdas.filter(mes__lte=inicio_mes(hasta))
+
+    filas = (
+        citas.values("servicio_id", "m", "estado")
+        .annotate(
+            n=Count("id"),
+            ing=Coalesce(Sum("precio_servicio"), _CERO),
+            cst=Coalesce(Sum("costo_servicio"), _CERO),
+        )
+        .order_by()
+    )
+    nuevas = [
+        ServicioMesAgg(
+            servicio_id=f["servicio_id"],
+            mes=f["m"],
+            estado=f["estado"] or "",
+            citas=f["n"],
+            ingresos=f["ing"],
+            costo=f["cst"],
+            margen=f["ing"] - f["cst"],
+        )
+        for f in filas.iterator()
+    ]
+    with transaction.atomic():
+        celdas.delete()
+        ServicioMesAgg.objects.bulk_create(nuevas, batch_size=batch_size)
+    return len(nuevas)
+
+
+def consulta(
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    estados: Optional[Sequence[str]] = None,
+    servicio_id: Optional[int] = None,
+    mes: Optional[date] = None,
+):
+    """Celdas del cubo filtradas; el rango se amplía a meses completos."""
+    qs = ServicioMesAgg.objects.all()
+    if desde:
+        qs = qs.filter(mes__gte=inicio_mes(desde))
+    if hasta:
+        qs = qs.filter(mes__lte=inicio_mes(hasta))
+    if estados:
+        qs = qs.filter(estado__in=estados)
+    if servicio_id:
+        qs = qs.filter(servicio_id=servicio_id)
+    if mes:
+        qs = qs.filter(mes=inicio_mes(mes))
+    return qs
+
+
+# Dimensiones de corte -> columnas agrupadas y orden por defecto
+CORTES = {
+    "servicio": (("servicio_id", "servicio__nombre"), ("-ingresos_total",)),
+    "mes": (("mes",), ("mes",)),
+    "servicio_mes": (("mes", "servicio_id", "servicio__nombre"), ("mes", "-ingresos_total")),
+}
+
+
+def agrupar(qs, por: str = "servicio"):
+    """Suma las celdas por ``servicio``, ``mes`` o ``servicio_mes``."""
+    columnas, orden = CORTES[por]
+    return (
+        qs.values(*columnas)
+        .annotate(
+            n=Sum("citas"),
+            ingresos_total=Sum("ingresos"),
+            costo_total=Sum("costo"),
+            margen_total=Sum("margen"),
+        )
+        .order_by(*orden)
+    )
@@ -0,0 +1,111 @@
+"""
+Mantenimiento del rollup diario de citas (``CitaDiaAgg``).
+
+Las señales de ``Cita`` aplican deltas de +1/-1 (y de su precio) sobre el
+bucket afectado; ``rebuild`` recalcula un rango completo con una sola consulta
+agrupada y se usa para el backfill inicial o para reparar desvíos (p. ej. tras
+un ``QuerySet.update`` masivo, que no dispara señales).
+
+Los ingresos de cada bucket suman el precio congelado en cada cita
+(``Cita.precio_servicio``); solo las citas anteriores a congelarlo usan el
+precio vigente del servicio (``INGRESO_CITA``).
+"""
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+from typing import Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce, ExtractHour, ExtractWeekDay, TruncDate
+from django.utils import timezone
+
+from .models import CitaDiaAgg
+
+_CERO = Decimal("0.00")
+
+# (fecha, servicio_id, estado, hora, dia_semana)
+Bucket = Tuple[date, int, str, int, int]
+
+# Ingreso de una cita en consultas sobre Cita
+INGRESO_CITA = Coalesce("precio_servicio", "servicio__precio")
+
+
+def bucket_para(fecha_inicio, servicio_id, estado) -> Optional[Bucket]:
+    """Bucket del rollup para una cita; usa la fecha/hora local como las APIs."""
+    if fecha_inicio is None or servicio_id is None:
+        return None
+    local = timezone.localtime(fecha_inicio) if timezone.is_aware(fecha_inicio) else fecha_inicio
+    dia_semana = local.isoweekday() % 7 + 1  # 1=Dom ... 7=Sáb
+    return (local.date(), servicio_id, estado or "", local.hour, dia_semana)
+
+
+def ingreso_de(cita) -> Decimal:
+    """Precio congelado de la cita (el vigente del servicio si es anterior a congelarlo)."""
+    if cita.precio_servicio is not None:
+        return cita.precio_servicio
+    return cita.servicio.precio if cita.servicio_id else _CERO
+
+
+def aplicar_delta(bucket: Optional[Bucket], delta: int, ingresos: Decimal = _CERO) -> None:
+    """Suma ``delta`` citas e ``ingresos`` al bucket, creándolo o eliminándolo si hace falta."""
+    if bucket is None or (delta == 0 and not ingresos):
+        return
+    fecha, servicio_id, estado, hora, dia_semana = bucket
+    filtros = {"fecha": fecha, "servicio_id": servicio_id, "estado": estado, "hora": hora}
+    cambios = {"citas": F("citas") + delta, "ingresos": F("ingresos") + ingresos}
+    with transaction.atomic():
+        if delta <= 0:
+            CitaDiaAgg.objects.filter(citas__gte=-delta, **filtros).update(**cambios)
+            CitaDiaAgg.objects.filter(citas=0, **filtros).delete()
+            return
+        if CitaDiaAgg.objects.filter(**filtros).update(**cambios):
+            return
+        try:
+            with transaction.atomic():
+                CitaDiaAgg.objects.create(dia_semana=dia_semana, citas=delta, ingresos=ingresos, **filtros)
+        except IntegrityError:
+            # Otro proceso creó el bucket entre el update y el insert.
+            CitaDiaAgg.objects.filter(**filtros).update(**cambios)
+
+
+def rebuild(desde: Optional[date] = None, hasta: Optional[date] = None, batch_size: int = 1000) -> int:
+    """Recalcula el rollup en el rango de fechas locales [desde, hasta] (todo si no se indica)."""
+    from citas.models import Cita
+
+    citas = Cita.objects.all()
+    rollups = CitaDiaAgg.objects.all()
+    if desde:
+        citas = citas.filter(fecha_inicio__date__gte=desde)
+        rollups = rollups.filter(fecha__gte=desde)
+    if hasta:
+        citas = citas.filter(fecha_inicio__date__lte=hasta)
+        rollups = rollups.filter(fecha__lte=hasta)
+
+    filas = (
+        citas.annotate(
+            dia=TruncDate("fecha_inicio"),
+            hh=ExtractHour("fecha_inicio"),
+            dow=ExtractWeekDay("fecha_inicio"),
+        )
+        .values("dia", "servicio_id", "estado", "hh", "dow")
+        .annotate(n=Count("id"), ing=Coalesce(Sum(INGRESO_CITA), _CERO))
+        .order_by()
+    )
+    nuevos = [
+        CitaDiaAgg(
+            fecha=f["dia"],
+            servicio_id=f["servicio_id"],
+            estado=f["estado"] or "",
+            hora=f["hh"],
+            dia_semana=f["dow"],
+            citas=f["n"],
+            ingresos=f["ing"],
+        )
+        for f in filas.iterator()
+    ]
+    with transaction.atomic():
+        rollups.delete()
+        CitaDiaAgg.objects.bulk_create(nuevos, batch_size=batch_size)
+    return len(nuevos)
@@ -0,0 +1,246 @@
+"""
+Señales que mantienen al día las tablas de analítica del dashboard.
+"""
+from __future__ import annotations
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from citas.models import Cita
+from clientes.models import Cliente
+from inventario.models import MovimientoInventario, Repuesto
+from servicios.models import Servicio
+from transacciones.models import Transaccion
+from vehiculos.models import Vehiculo
+
+from . import busqueda
+from . import cache as dashboard_cache
+from . import metricas_clientes, rentabilidad, rollups
+
+# Tablas que alimentan los paneles: cualquier escritura invalida la caché.
+MODELOS_DASHBOARD = (Cita, Servicio, Cliente, Transaccion, MovimientoInventario, Repuesto)
+# Modelos indexados para la búsqueda o cuyos campos copian otros índices.
+MODELOS_BUSQUEDA = (Cliente, Vehiculo, Cita, Repuesto, Servicio)
+# Otros modelos de los que dependen sugerencias cacheadas (``busqueda.sugerencias(depende_de=...)``).
+MODELOS_SUGERENCIAS = (Transaccion,)
+
+
+@receiver(pre_save, sender=Cita, dispatch_uid="dashboard_cita_rollup_pre_save")
+def _recordar_bucket_previo(sender, instance, raw=False, **kwargs):
+    instance._rollup_previo = None
+    instance._cita_previa = None
+    if raw or not instance.pk:
+        return
+    previo = (
+        Cita.objects.filter(pk=instance.pk)
+        .values(
+            "fecha_inicio", "servicio_id", "estado", "cliente_id", "precio_servicio", "costo_servicio",
+            ingreso=rollups.INGRESO_CITA,
+        )
+        .first()
+    )
+    if previo:
+        instance._cita_previa = previo
+        instance._rollup_previo = rollups.bucket_para(
+            previo["fecha_inicio"], previo["servicio_id"], previo["estado"]
+        )
+
+
+@receiver(post_save, sender=Cita, dispatch_uid="dashboard_cita_rollup_post_save")
+def _actualizar_rollup(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previo = getattr(instance, "_rollup_previo", None)
+    previa = getattr(instance, "_cita_previa", None)
+    ingreso_previo = previa["ingreso"] if previa else None
+    actual = rollups.bucket_para(instance.fecha_inicio, instance.servicio_id, instance.estado)
+    ingreso = rollups.ingreso_de(instance)
+    if previo == actual:
+        # Mismo bucket: solo puede haber cambiado el precio congelado
+        if previo and ingreso_previo != ingreso:
+            rollups.aplicar_delta(actual, 0, ingreso - ingreso_previo)
+        return
+    rollups.aplicar_delta(previo, -1, -(ingreso_previo or 0))
+    rollups.aplicar_delta(actual, +1, ingreso)
+
+
+@receiver(post_delete, sender=Cita, dispatch_uid="dashboard_cita_rollup_post_delete")
+def _descontar_rollup(sender, instance, **kwargs):
+    rollups.aplicar_delta(
+        rollups.bucket_para(instance.fecha_inicio, instance.servicio_id, instance.estado),
+        -1,
+        -rollups.ingreso_de(instance),
+    )
+
+
+def _toca_mes_cerrado(*buckets) -> bool:
+    hoy = timezone.localdate()
+    return any(b and (b[0].year, b[0].month) < (hoy.year, hoy.month) for b in buckets)
+
+
+@receiver(post_save, sender=Cita, dispatch_uid="dashboard_cita_historico_post_save")
+def _invalidar_cohortes_guardado(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    actual = rollups.bucket_para(instance.fecha_inicio, instance.servicio_id, instance.estado)
+    if _toca_mes_cerrado(getattr(instance, "_rollup_previo", None), actual):
+        transaction.on_commit(dashboard_cache.invalidar_historico)
+
+
+@receiver(post_delete, sender=Cita, dispatch_uid="dashboard_cita_historico_post_delete")
+def _invalidar_cohortes_borrado(sender, instance, **kwargs):
+    if _toca_mes_cerrado(rollups.bucket_para(instance.fecha_inicio, instance.servicio_id, instance.estado)):
+        transaction.on_commit(dashboard_cache.invalidar_historico)
+
+
+@receiver(post_save, sender=Cita, dispatch_uid="dashboard_cita_rentabilidad_post_save")
+def _actualizar_rentabilidad(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previa = getattr(instance, "_cita_previa", None)
+    actual = (
+        rentabilidad.celda_para(instance.fecha_inicio, instance.servicio_id, instance.estado),
+        rentabilidad.aporte_de(instance.precio_servicio, instance.costo_servicio),
+    )
+    anterior = None
+    if previa:
+        anterior = (
+            rentabilidad.celda_para(previa["fecha_inicio"], previa["servicio_id"], previa["estado"]),
+            rentabilidad.aporte_de(previa["precio_servicio"], previa["costo_servicio"]),
+        )
+    if anterior == actual:
+        return
+    if anterior:
+        rentabilidad.aplicar(*anterior, signo=-1)
+    rentabilidad.aplicar(*actual)
+
+
+@receiver(post_delete, sender=Cita, dispatch_uid="dashboard_cita_rentabilidad_post_delete")
+def _descontar_rentabilidad(sender, instance, **kwargs):
+    rentabilidad.aplicar(
+        rentabilidad.celda_para(instance.fecha_inicio, instance.servicio_id, instance.estado),
+        rentabilidad.aporte_de(instance.precio_servicio, instance.costo_servicio),
+        signo=-1,
+    )
+
+
+@receiver(post_save, sender=Cita, dispatch_uid="dashboard_cita_metricas_post_save")
+def _revisar_metricas_cita(sender, instance, raw=False, **kwargs):
+    previa = getattr(instance, "_cita_previa", None)
+    if raw or not previa:
+        return
+    if previa["cliente_id"] == instance.cliente_id and previa["fecha_inicio"] == instance.fecha_inicio:
+        return
+    if Transaccion.objects.filter(cita_id=instance.pk).exists():
+        metricas_clientes.recalcular({previa["cliente_id"], instance.cliente_id})
+
+
+@receiver(pre_save, sender=Transaccion, dispatch_uid="dashboard_transaccion_pre_save")
+def _recordar_transaccion_previa(sender, instance, raw=False, **kwargs):
+    instance._transaccion_previa = None
+    if raw or not instance.pk:
+        return
+    instance._transaccion_previa = (
+        Transaccion.objects.filter(pk=instance.pk)
+        .values("monto", "cita_id", "cita__cliente_id")
+        .first()
+    )
+
+
+@receiver(post_save, sender=Transaccion, dispatch_uid="dashboard_transaccion_metricas_post_save")
+def _actualizar_metricas_cliente(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        metricas_clientes.registrar_transaccion(instance)
+        return
+    previa = getattr(instance, "_transaccion_previa", None)
+    if previa is None:
+        return
+    if previa["cita_id"] != instance.cita_id:
+        metricas_clientes.recalcular({previa["cita__cliente_id"], instance.cita.cliente_id})
+    elif previa["monto"] != instance.monto:
+        metricas_clientes.ajustar_monto(previa["cita__cliente_id"], instance.monto - previa["monto"])
+
+
+@receiver(post_delete, sender=Transaccion, dispatch_uid="dashboard_transaccion_metricas_post_delete")
+def _descontar_metricas_cliente(sender, instance, **kwargs):
+    cliente_id = Cita.objects.filter(pk=instance.cita_id).values_list("cliente_id", flat=True).first()
+    if cliente_id:
+        metricas_clientes.recalcular([cliente_id])
+
+
+def _invalidar_cache(sender, raw=False, **kwargs):
+    if raw:
+        return
+    # Tras el commit: así ningún lector cachea datos previos bajo la nueva generación.
+    transaction.on_commit(dashboard_cache.invalidar)
+
+
+for _modelo in MODELOS_DASHBOARD:
+    post_save.connect(_invalidar_cache, sender=_modelo, dispatch_uid=f"dashboard_cache_save_{_modelo._meta.label_lower}")
+    post_delete.connect(_invalidar_cache, sender=_modelo, dispatch_uid=f"dashboard_cache_delete_{_modelo._meta.label_lower}")
+
+
+def _toca_busqueda(sender, update_fields) -> bool:
+    """False si un ``save(update_fields=...)`` no cambia nada que indexe o copie la búsqueda."""
+    return update_fields is None or not busqueda.campos_relevantes(sender).isdisjoint(update_fields)
+
+
+def _recordar_campos_copiados(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._busqueda_previa = None
+    if raw or not instance.pk or not _toca_busqueda(sender, update_fields):
+        return
+    campos = {campo for dependencia in busqueda.dependencias(sender) for campo in dependencia.campos}
+    instance._busqueda_previa = sender._default_manager.filter(pk=instance.pk).values(*campos).first()
+
+
+def _indexar_busqueda(sender, instance, created=False, raw=False, using=None, update_fields=None, **kwargs):
+    if raw or not _toca_busqueda(sender, update_fields):
+        return
+    # En la misma transacción que la escritura: un rollback también deshace el índice
+    indice = busqueda.indice_de(sender)
+    if indice and busqueda.backend(indice) == "fts5":
+        busqueda.indexar(indice, sender._default_manager.using(using).filter(pk=instance.pk))
+    transaction.on_commit(partial(busqueda.invalidar_sugerencias, sender), using=using)
+    if created:
+        return
+    previa = getattr(instance, "_busqueda_previa", None)
+    for dependencia in busqueda.dependencias(sender):
+        if previa is not None and all(previa[c] == getattr(instance, c) for c in dependencia.campos):
+            continue
+        transaction.on_commit(partial(busqueda.invalidar_sugerencias, dependencia.indice.model()), using=using)
+        if busqueda.backend(dependencia.indice) == "fts5":
+            relacionados = dependencia.indice.model()._default_manager.using(using)
+            busqueda.indexar(dependencia.indice, relacionados.filter(**{dependencia.fk: instance.pk}))
+
+
+def _desindexar_busqueda(sender, instance, using=None, **kwargs):
+    indice = busqueda.indice_de(sender)
+    if indice and busqueda.backend(indice) == "fts5":
+        busqueda.desindexar(indice, [instance.pk], using)
+    transaction.on_commit(partial(busqueda.invalidar_sugerencias, sender), using=using)
+
+
+for _modelo in MODELOS_BUSQUEDA:
+    _etiqueta = _modelo._meta.label_lower
+    if busqueda.dependencias(_modelo):
+        pre_save.connect(_recordar_campos_copiados, sender=_modelo, dispatch_uid=f"dashboard_busqueda_pre_save_{_etiqueta}")
+    post_save.connect(_indexar_busqueda, sender=_modelo, dispatch_uid=f"dashboard_busqueda_save_{_etiqueta}")
+    post_delete.connect(_desindexar_busqueda, sender=_modelo, dispatch_uid=f"dashboard_busqueda_delete_{_etiqueta}")
+
+
+def _invalidar_sugerencias(sender, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(partial(busqueda.invalidar_sugerencias, sender), using=using)
+
+
+for _modelo in MODELOS_SUGERENCIAS:
+    _etiqueta = _modelo._meta.label_lower
+    post_save.connect(_invalidar_sugerencias, sender=_modelo, dispatch_uid=f"dashboard_sugerencias_save_{_etiqueta}")
+    post_delete.connect(_invalidar_sugerencias, sender=_modelo, dispatch_uid=f"dashboard_sugerencias_delete_{_etiqueta}")
@@ -0,0 +1,237 @@
+"""
+Exportaciones en segundo plano (``ExportJob``).
+
+La interfaz encola un trabajo con el tipo de exportación y el querystring de
+la vista de origen; ``python manage.py run_export_worker`` lo procesa en otro
+proceso con los mismos filtros que la descarga directa (cada tipo reconstruye
+las ``exportar.Hoja`` de su vista), guarda el archivo bajo ``MEDIA_ROOT`` y
+actualiza filas escritas y latido para que la interfaz muestre avance y ETA.
+
+Varios workers pueden drenar la cola a la vez: ``reclamar`` bloquea la fila
+con ``select_for_update(skip_locked=True)`` y la toma con un UPDATE
+condicional sobre el estado, que es lo que decide en SQLite (donde no hay
+bloqueo de filas). Un trabajo ``en_proceso`` sin latido durante
+``EXPORT_JOBS_TIMEOUT_SEGUNDOS`` vuelve a la cola.
+"""
+from __future__ import annotations
+
+import io
+import tempfile
+from datetime import timedelta
+from time import monotonic
+from typing import Callable, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.files import File
+from django.db import transaction
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+
+from . import exportar
+from .models import ExportJob
+
+# Segundos mínimos entre dos actualizaciones de avance de un mismo trabajo
+INTERVALO_LATIDO = 1.0
+INTENTOS_RECLAMO = 3
+
+
+class Definicion(NamedTuple):
+    archivo: str
+    formato: str  # "csv" | "xlsx"
+    hojas: Callable[[HttpRequest], List[exportar.Hoja]]
+
+
+def _citas_dashboard(request):
+    from .views import hoja_citas_csv
+
+    return [hoja_citas_csv(request)]
+
+
+def _citas_dashboard_xlsx(request):
+    from .views import hojas_citas_xlsx
+
+    return hojas_citas_xlsx(request)
+
+
+def _citas_agenda(request):
+    from citas.views import hoja_export_citas
+
+    return [hoja_export_citas(request)]
+
+
+def _clientes(request):
+    from clientes.views import ClienteExportCSVView
+
+    vista = ClienteExportCSVView()
+    vista.setup(request)
+    return [vista.hoja()]
+
+
+DEFINICIONES = {
+    ExportJob.Tipo.DASHBOARD_CITAS_CSV: Definicion("citas.csv", "csv", _citas_dashboard),
+    ExportJob.Tipo.DASHBOARD_CITAS_XLSX: Definicion("citas.xlsx", "xlsx", _citas_dashboard_xlsx),
+    ExportJob.Tipo.CITAS_CSV: Definicion("citas.csv", "csv", _citas_agenda),
+    ExportJob.Tipo.CLIENTES_CSV: Definicion("clientes.csv", "csv", _clientes),
+}
+
+
+def timeout_segundos() -> int:
+    return int(getattr(settings, "EXPORT_JOBS_TIMEOUT_SEGUNDOS", 600))
+
+
+def retencion_dias() -> int:
+    return int(getattr(settings, "EXPORT_JOBS_RETENCION_DIAS", 7))
+
+
+def request_para(consulta: str, usuario=None) -> HttpRequest:
+    """Request GET mínimo con los filtros de la vista de origen."""
+    request = HttpRequest()
+    request.method = "GET"
+    request.GET = QueryDict(consulta or "")
+    request.user = usuario or AnonymousUser()
+    return request
+
+
+def hojas_de(tipo: str, consulta: str, usuario=None) -> List[exportar.Hoja]:
+    """Hojas del tipo pedido; ``ValueError`` si el tipo o los filtros no son válidos."""
+    if tipo not in DEFINICIONES:
+        raise ValueError(f"Tipo de exportación desconocido: {tipo!r}")
+    return DEFINICIONES[tipo].hojas(request_para(consulta, usuario))
+
+
+def encolar(tipo: str, consulta: str = "", usuario=None) -> ExportJob:
+    """Crea el trabajo pendiente tras validar tipo y filtros (sin consultar datos)."""
+    hojas_de(tipo, consulta, usuario)
+    return ExportJob.objects.create(
+        tipo=tipo,
+        consulta=consulta or "",
+        solicitado_por=usuario if getattr(usuario, "is_authenticated", False) else None,
+    )
+
+
+def reclamar(worker: str) -> Optional[ExportJob]:
+    """Toma el trabajo pendiente más antiguo para ``worker`` (None si la cola está vacía)."""
+    for _ in range(INTENTOS_RECLAMO):
+        with transaction.atomic():
+            pk = (
+                ExportJob.objects.select_for_update(skip_locked=True)
+                .filter(estado=ExportJob.Estado.PENDIENTE)
+                .order_by("creado", "pk")
+                .values_list("pk", flat=True)
+                .first()
+            )
+            if pk is None:
+                return None
+            ahora = timezone.now()
+            # Sin bloqueo de filas (SQLite) dos workers pueden ver el mismo pk: solo uno actualiza
+            tomado = ExportJob.objects.filter(pk=pk, estado=ExportJob.Estado.PENDIENTE).update(
+                estado=ExportJob.Estado.EN_PROCESO,
+                worker=worker,
+                iniciado=ahora,
+                actualizado=ahora,
+                filas_escritas=0,
+                error="",
+            )
+        if tomado:
+            return ExportJob.objects.get(pk=pk)
+    return None
+
+
+class _Latido:
+    """Callback de progreso: guarda filas escritas y latido como mucho una vez por intervalo."""
+
+    def __init__(self, job: ExportJob, intervalo: float = INTERVALO_LATIDO):
+        self.job = job
+        self.intervalo = intervalo
+        self._ultimo = monotonic()
+
+    def __call__(self, filas: int) -> None:
+        ahora = monotonic()
+        if ahora - self._ultimo < self.intervalo:
+            return
+        self._ultimo = ahora
+        _del_worker(self.job).update(filas_escritas=filas, actualizado=timezone.now())
+
+
+def _del_worker(job: ExportJob):
+    """El trabajo, solo mientras siga siendo de este worker (no fue re-encolado)."""
+    return ExportJob.objects.filter(pk=job.pk, worker=job.worker, estado=ExportJob.Estado.EN_PROCESO)
+
+
+def procesar(job: ExportJob) -> ExportJob:
+    """Genera el archivo del trabajo reclamado y lo marca completado o fallido."""
+    definicion = DEFINICIONES.get(job.tipo)
+    try:
+        if definicion is None:
+            raise ValueError(f"Tipo de exportación desconocido: {job.tipo!r}")
+        hojas = definicion.hojas(request_para(job.consulta, job.solicitado_por))
+        if definicion.formato == "xlsx":
+            total = sum(exportar.filas_xlsx(h) for h in hojas)
+        else:
+            total = sum(h.qs.count() for h in hojas)
+        _del_worker(job).update(filas_total=total, actualizado=timezone.now())
+
+        latido = _Latido(job)
+        with tempfile.TemporaryFile() as tmp:
+            if definicion.formato == "xlsx":
+                escritas = sum(exportar.escribir_xlsx(hojas, tmp, progreso=latido).values())
+            else:
+                texto = io.TextIOWrapper(tmp, encoding="utf-8", newline="")
+                escritas = exportar.escribir_csv(hojas[0], texto, progreso=latido)
+                texto.flush()
+                texto.detach()
+            tmp.seek(0)
+            job.archivo.save(f"{job.pk}-{definicion.archivo}", File(tmp), save=False)
+    except Exception as exc:
+        ahora = timezone.now()
+        _del_worker(job).update(
+            estado=ExportJob.Estado.FALLIDO,
+            error=f"{exc.__class__.__name__}: {exc}",
+            terminado=ahora,
+            actualizado=ahora,
+        )
+        job.refresh_from_db()
+        return job
+
+    ahora = timezone.now()
+    terminado = _del_worker(job).update(
+        estado=ExportJob.Estado.COMPLETADO,
+        archivo=job.archivo.name,
+        filas_total=escritas,
+        filas_escritas=escritas,
+        terminado=ahora,
+        actualizado=ahora,
+    )
+    if not terminado:
+        # Se re-encoló mientras tanto (latido vencido): el archivo lo generará otro worker.
+        job.archivo.delete(save=False)
+    job.refresh_from_db()
+    return job
+
+
+def reencolar_vencidos(segundos: Optional[int] = None) -> int:
+    """Devuelve a la cola los trabajos en proceso cuyo worker dejó de dar latido."""
+    limite = timezone.now() - timedelta(seconds=segundos if segundos is not None else timeout_segundos())
+    return ExportJob.objects.filter(estado=ExportJob.Estado.EN_PROCESO, actualizado__lt=limite).update(
+        estado=ExportJob.Estado.PENDIENTE,
+        worker="",
+        filas_escritas=0,
+        iniciado=None,
+    )
+
+
+def purgar(dias: Optional[int] = None) -> int:
+    """Borra trabajos terminados (y sus archivos) más antiguos que la retención."""
+    limite = timezone.now() - timedelta(days=dias if dias is not None else retencion_dias())
+    viejos = ExportJob.objects.filter(
+        estado__in=[ExportJob.Estado.COMPLETADO, ExportJob.Estado.FALLIDO],
+        terminado__lt=limite,
+    )
+    n = 0
+    for job in viejos.iterator():
+        if job.archivo:
+            job.archivo.delete(save=False)
+        job.delete()
+        n += 1
+    return n
@@ -19,8 +19,19 @@ urlpatterns = [
     path("api/inventario-metricas/", views.api_inventario_metricas, name="api_inventario_metricas"),
     path("api/margen-servicios/", views.api_margen_servicios, name="api_margen_servicios"),
     path("api/funnel-citas/", views.api_funnel_citas, name="api_funnel_citas"),
+    path("api/rentabilidad/", views.api_rentabilidad, name="api_rentabilidad"),
+
+    # Todos los paneles en una sola llamada
+    path("api/bundle/", views.api_bundle, name="api_bundle"),
+    path("api/cache-stats/", views.api_cache_stats, name="api_cache_stats"),
 
     # Export
     path("export/citas.csv", views.export_citas_csv, name="export_citas_csv"),
     path("export/citas.xlsx", views.export_citas_xlsx, name="export_citas_xlsx"),
+    path("export/rentabilidad.csv", views.export_rentabilidad_csv, name="export_rentabilidad_csv"),
+
+    # Exportaciones en segundo plano (run_export_worker)
+    path("api/exports/", views.api_exportaciones, name="api_exportaciones"),
+    path("api/exports/<int:pk>/", views.api_exportacion_estado, name="api_exportacion_estado"),
+    path("exports/<int:pk>/descargar/", views.exportacion_descargar, name="exportacion_descargar"),
 ]
@@ -1,20 +1,23 @@
 # -*- coding: utf-8 -*-
-from datetime import date, datetime, timedelta
-from io import BytesIO
+from datetime import date, datetime, time, timedelta
 import csv
-from collections import defaultdict
-from decimal import Decimal
 
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Sum, F, Q
-from django.db.models.functions import TruncMonth, ExtractWeekDay, ExtractHour
-from django.http import JsonResponse, HttpResponse
-from django.shortcuts import render
+from django.http import FileResponse, Http404, JsonResponse, HttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import require_POST
 
 # MODELOS
-from clientes.models import Cliente
-from servicios.models import Servicio
 from citas.models import Cita
+from clientes.models import Cliente
+from transacciones.models import Transaccion
+
+from . import cache as dashboard_cache
+from . import exportar, panels, rentabilidad, rollups, trabajos
+from .condicional import condicional, validador_dashboard
+from .models import ExportJob
 
 # ---------- Helpers ----------
 def _parse_date(s, default=None):
@@ -32,8 +35,10 @@ def _filtered_citas(request):
     desde = _parse_date(request.GET.get("desde"), default=hoy.replace(day=1) - timedelta(days=180))
     hasta = _parse_date(request.GET.get("hasta"), default=hoy)
     estados = request.GET.getlist("estado")
+    # Días locales como rango de datetimes (equivale a fecha_inicio__date__range sin convertir cada fila)
     qs = Cita.objects.select_related("servicio", "cliente").filter(
-        fecha_inicio__date__range=(desde, hasta)
+        fecha_inicio__gte=timezone.make_aware(datetime.combine(desde, time.min)),
+        fecha_inicio__lt=timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min)),
     )
     if estados:
         qs = qs.filter(estado__in=estados)
@@ -53,455 +58,270 @@ def overview(request):
     })
 
 # ---------- APIs base ----------
+def _dashboard_data(request):
+    qs, desde, hasta, estados = _filtered_citas(request)
+    return panels.DashboardData(qs, desde, hasta, estados)
+
+def _panel_response(request, clave):
+    return JsonResponse(dashboard_cache.panel_cacheado(clave, _dashboard_data(request)))
+
 @login_required
+@condicional(validador_dashboard)
 def api_kpis(request):
-    qs, _, _, _ = _filtered_citas(request)
-    agg = qs.aggregate(
-        total_citas=Count("id"),
-        ingresos=Sum(F("servicio__precio")),  # AJUSTA SI tienes Cita.total
-    )
-    data = {
-        "clientes": Cliente.objects.count(),
-        "servicios": Servicio.objects.count(),
-        "citas": agg["total_citas"] or 0,
-        "ingresos": float(agg["ingresos"] or 0.0),
-    }
-    return JsonResponse(data)
+    return _panel_response(request, "kpis")
 
 @login_required
+@condicional(validador_dashboard)
 def api_timeseries(request):
-    qs, _, _, _ = _filtered_citas(request)
-    base = (
-        qs.annotate(mes=TruncMonth("fecha_inicio"))
-          .values("mes")
-          .annotate(
-              citas=Count("id"),
-              ingresos=Sum(F("servicio__precio")),  # AJUSTA SI tienes Cita.total
-          )
-          .order_by("mes")
-    )
-    labels, series_citas, series_ingresos = [], [], []
-    for row in base:
-        labels.append(row["mes"].strftime("%Y-%m"))
-        series_citas.append(row["citas"])
-        series_ingresos.append(float(row["ingresos"] or 0.0))
-
-    # Pronóstico 3 meses (sklearn si está, sino naive)
-    forecast_labels, forecast_ingresos = [], []
-    try:
-        from sklearn.linear_model import LinearRegression
-        import numpy as np
-        if labels:
-            months_index = np.arange(len(labels)).reshape(-1, 1)
-            # característica simple estacional: mes (1-12)
-            seasonal = np.array([int(l[-2:]) for l in labels]).reshape(-1,1)
-            X = np.hstack([months_index, seasonal])
-            y = np.array(series_ingresos, dtype=float)
-
-            model = LinearRegression()
-            model.fit(X, y)
-
-            base_dt = datetime.strptime(labels[-1] + "-01", "%Y-%m-%d")
-            for i in range(1, 4):
-                pred_month = (base_dt.replace(day=1) + timedelta(days=32*i)).replace(day=1)
-                label = pred_month.strftime("%Y-%m")
-                x_next = [[len(labels)+i-1, pred_month.month]]
-                yhat = float(model.predict(x_next)[0])
-                forecast_labels.append(label)
-                forecast_ingresos.append(round(max(yhat, 0.0), 2))
-    except Exception:
-        if series_ingresos:
-            last = series_ingresos[-1]
-            base_dt = datetime.strptime(labels[-1] + "-01", "%Y-%m-%d") if labels else datetime.today()
-            for i in range(1, 4):
-                pred_month = (base_dt.replace(day=1) + timedelta(days=32*i)).replace(day=1)
-                forecast_labels.append(pred_month.strftime("%Y-%m"))
-                forecast_ingresos.append(float(last))
-
-    return JsonResponse({
-        "labels": labels,
-        "citas": series_citas,
-        "ingresos": series_ingresos,
-        "forecast_labels": forecast_labels,
-        "forecast_ingresos": forecast_ingresos,
-    })
+    return _panel_response(request, "timeseries")
 
 @login_required
+@condicional(validador_dashboard)
 def api_top_servicios(request):
-    qs, _, _, _ = _filtered_citas(request)
-    top = (
-        qs.values("servicio__nombre")
-          .annotate(ingresos=Sum(F("servicio__precio")), cantidad=Count("id"))
-          .order_by("-ingresos")[:10]
-    )
-    labels = [r["servicio__nombre"] or "—" for r in top]
-    ingresos = [float(r["ingresos"] or 0.0) for r in top]
-    cantidad = [int(r["cantidad"]) for r in top]
-    return JsonResponse({"labels": labels, "ingresos": ingresos, "cantidad": cantidad})
+    return _panel_response(request, "top_servicios")
 
 @login_required
+@condicional(validador_dashboard)
 def api_estado_pastel(request):
-    qs, _, _, _ = _filtered_citas(request)
-    estado = (qs.values("estado").annotate(n=Count("id")).order_by("-n"))
-    labels = [r["estado"] or "—" for r in estado]
-    valores = [r["n"] for r in estado]
-    return JsonResponse({"labels": labels, "values": valores})
+    return _panel_response(request, "estado_pastel")
 
 # ---------- APIs BI avanzadas ----------
 @login_required
+@condicional(validador_dashboard)
 def api_heatmap_dia_hora(request):
-    """
-    Heatmap de volumen por día de la semana (1=Domingo con ExtractWeekDay en SQLite? En Django: 1=Dom, 7=Sáb)
-    y por hora (0-23) usando fecha_inicio.
-    """
-    qs, _, _, _ = _filtered_citas(request)
-    rows = (
-        qs.annotate(dow=ExtractWeekDay("fecha_inicio"), hh=ExtractHour("fecha_inicio"))
-          .values("dow", "hh")
-          .annotate(n=Count("id"))
-          .order_by("dow", "hh")
-    )
-    # Mapa 7x24
-    heat = [[0]*24 for _ in range(7)]
-    for r in rows:
-        dow = (r["dow"] or 1) - 1  # 0..6
-        hh = r["hh"] or 0
-        if 0 <= dow <= 6 and 0 <= hh <= 23:
-            heat[dow][hh] = r["n"]
-    return JsonResponse({"matrix": heat, "labels_dow": ["Dom","Lun","Mar","Mié","Jue","Vie","Sáb"], "labels_hh": list(range(24))})
+    return _panel_response(request, "heatmap_dia_hora")
 
 @login_required
+@condicional(validador_dashboard)
 def api_cohortes(request):
-    """
-    Cohortes mensuales por mes-de-alta del cliente: cuántos vuelven X meses después a tener citas.
-    Heurística: mes de la primera cita del cliente como "mes de alta".
-    """
-    qs, _, _, _ = _filtered_citas(request)
-
-    # primera cita por cliente (en rango)
-    first_by_client = (qs.values("cliente_id")
-                         .annotate(m0=TruncMonth(F("fecha_inicio")))
-                         .values("cliente_id", "m0"))
-
-    # Para facilitar, traemos todas las citas del rango por cliente/mes:
-    citas_mes = (qs.annotate(m=TruncMonth("fecha_inicio"))
-                   .values("cliente_id", "m")
-                   .annotate(n=Count("id")))
-
-    # Normalizamos en dict {cliente: mes0}
-    alta = {}
-    for r in first_by_client:
-        alta[r["cliente_id"]] = r["m0"]
-
-    # Cohortes: {mes0: {offset: count}}
-    cohorts = defaultdict(lambda: defaultdict(int))
-    base_counts = defaultdict(int)  # tamaño cohorte
-
-    for r in citas_mes:
-        cid = r["cliente_id"]
-        m = r["m"]
-        m0 = alta.get(cid)
-        if not m0: 
-            continue
-        base_counts[m0] += 0  # asegura clave
-        offset = (m.year - m0.year) * 12 + (m.month - m0.month)
-        if offset >= 0:
-            cohorts[m0][offset] += r["n"]
-            if offset == 0:
-                base_counts[m0] += r["n"]
-
-    # construimos tabla: filas=cohortes (mes0), columnas=offset 0..5
-    labels_rows = sorted(cohorts.keys())
-    max_off = 5
-    matrix = []
-    for m0 in labels_rows:
-        row = []
-        for off in range(0, max_off+1):
-            row.append(cohorts[m0].get(off, 0))
-        matrix.append(row)
-
-    # tasas de retención (normaliza por base de la cohorte)
-    retention = []
-    for i, m0 in enumerate(labels_rows):
-        base = max(base_counts.get(m0) or 1, 1)
-        retention.append([round(c / base, 3) for c in matrix[i]])
-
-    labels_rows = [m0.strftime("%Y-%m") for m0 in labels_rows]
-    labels_cols = [f"M+{i}" for i in range(0, max_off+1)]
-    return JsonResponse({"labels_rows": labels_rows, "labels_cols": labels_cols, "retention": retention})
+    return _panel_response(request, "cohortes")
 
 @login_required
+@condicional(validador_dashboard)
 def api_ltv(request):
-    """
-    LTV aproximado: suma de ingresos por cliente en la ventana filtrada / número de clientes activos.
-    También devolvemos top clientes por valor.
-    """
-    qs, _, _, _ = _filtered_citas(request)
-    por_cliente = (qs.values("cliente_id", "cliente__nombre")
-                     .annotate(ingresos=Sum(F("servicio__precio")), n=Count("id"))
-                     .order_by("-ingresos"))
-    total_clientes = por_cliente.count() or 1
-    total_ingresos = float(sum(float(r["ingresos"] or 0.0) for r in por_cliente))
-    ltv_prom = total_ingresos / total_clientes if total_clientes else 0.0
-    top = list(por_cliente[:10])
-    # serializa
-    labels = [r["cliente__nombre"] or f"ID {r['cliente_id']}" for r in top]
-    valores = [float(r["ingresos"] or 0.0) for r in top]
-    return JsonResponse({
-        "ltv_promedio": round(ltv_prom, 2),
-        "labels": labels,
-        "valores": valores
-    })
+    return _panel_response(request, "ltv")
 
 @login_required
+@condicional(validador_dashboard)
 def api_repeat_rate(request):
-    """
-    Repetición: % de clientes con 2+ citas en la ventana.
-    """
-    qs, _, _, _ = _filtered_citas(request)
-    por_cliente = (qs.values("cliente_id").annotate(n=Count("id")))
-    total = por_cliente.count() or 1
-    repetidores = sum(1 for r in por_cliente if r["n"] >= 2)
-    repeat_rate = repetidores / total if total else 0.0
-    return JsonResponse({"repeat_rate": round(repeat_rate, 3), "total": total, "repetidores": repetidores})
+    return _panel_response(request, "repeat_rate")
 
 @login_required
+@condicional(validador_dashboard)
 def api_inventario_metricas(request):
-    """
-    Métricas de inventario enriquecidas con rotación, cobertura, alertas y pronósticos
-    basados en los movimientos reales del módulo de inventario.
-    """
-    try:
-        from inventario.models import Repuesto, MovimientoInventario, CategoriaRepuesto
-    except Exception:
-        return JsonResponse({
-            "rotacion": 0.0,
-            "cobertura_dias": 0.0,
-            "sku_bajos": 0,
-            "valor_stock": 0.0,
-            "margen_potencial": 0.0,
-            "consumo_mensual_estimado": 0.0,
-            "riesgo_sin_stock": 0,
-            "sin_movimientos": 0,
-            "criticos": [],
-            "categorias": [],
-        })
-
-    _, desde, hasta, _ = _filtered_citas(request)
-    hasta = hasta or date.today()
-    desde = desde or (hasta - timedelta(days=180))
-    ventana_dias = max((hasta - desde).days, 1)
-    ventana_mov_inicio = max(hasta - timedelta(days=90), desde)
-    ventana_mov_dias = max((hasta - ventana_mov_inicio).days, 1)
-
-    salidas_qs = (
-        MovimientoInventario.objects.filter(
-            tipo=MovimientoInventario.Tipo.SALIDA,
-            fecha__date__range=(ventana_mov_inicio, hasta),
-        )
-        .values("repuesto_id")
-        .annotate(total=Sum("cantidad"))
-    )
-    salidas_map = {row["repuesto_id"]: float(row["total"] or 0.0) for row in salidas_qs}
-
-    repuestos = list(Repuesto.objects.all())
-    stock_total = sum(int(getattr(rep, "stock", 0) or 0) for rep in repuestos)
-    sku_bajos = sum(1 for rep in repuestos if getattr(rep, "bajo_stock", False))
-    valor_stock = sum((rep.valor_inventario or Decimal("0")) for rep in repuestos)
-    valor_potencial = sum((rep.valor_potencial or Decimal("0")) for rep in repuestos)
-    margen_potencial = valor_potencial - valor_stock
-
-    consumo_total = sum(salidas_map.get(rep.id, 0.0) for rep in repuestos)
-    consumo_diario_prom = consumo_total / ventana_mov_dias if ventana_mov_dias else 0.0
-    consumo_mensual_estimado = consumo_diario_prom * 30.0
+    return _panel_response(request, "inventario_metricas")
 
-    rotacion = 0.0
-    if stock_total > 0 and consumo_total > 0:
-        rotacion = (consumo_total / ventana_mov_dias) * 30.0 / max(float(stock_total), 1.0)
+@login_required
+@condicional(validador_dashboard)
+def api_margen_servicios(request):
+    return _panel_response(request, "margen_servicios")
 
-    cobertura_global = 0.0
-    if consumo_diario_prom > 0:
-        cobertura_global = float(stock_total) / consumo_diario_prom
+@login_required
+@condicional(validador_dashboard)
+def api_funnel_citas(request):
+    return _panel_response(request, "funnel_citas")
 
-    categoria_choices = {}
-    try:
-        categoria_choices = dict(Repuesto._meta.get_field("categoria").choices)
-    except Exception:
+# ---------- Rentabilidad (drill-down) ----------
+def _corte_rentabilidad(request):
+    """
+    Celdas del cubo agrupadas según el drill-down pedido:
+    ?servicio=<id> -> meses de ese servicio; ?mes=AAAA-MM -> servicios de ese mes;
+    ambos -> una sola celda; ninguno -> servicio x mes.
+    """
+    _, desde, hasta, estados = _filtered_citas(request)
+    servicio_id = request.GET.get("servicio") or None
+    mes = request.GET.get("mes") or None
+    if servicio_id and not servicio_id.isdigit():
+        raise ValueError(f"Servicio inválido '{servicio_id}'.")
+    if mes:
         try:
-            categoria_choices = dict(CategoriaRepuesto.choices)
-        except Exception:
-            categoria_choices = {}
-
-    categorias_stats = {}
-    criticos_candidates = []
-    sin_movimientos = 0
-    riesgo_sin_stock = 0
-
-    for rep in repuestos:
-        total_salidas_rep = salidas_map.get(rep.id, 0.0)
-        consumo_diario = total_salidas_rep / ventana_mov_dias if ventana_mov_dias else 0.0
-        cobertura = rep.stock / consumo_diario if consumo_diario > 0 else None
-        cobertura_val = round(cobertura, 1) if cobertura is not None else None
-        tiempo_reposicion = int(getattr(rep, "tiempo_reposicion_dias", 0) or 0)
-        riesgo = False
-        if cobertura is not None:
-            riesgo = cobertura <= max(tiempo_reposicion, 15)
-            if riesgo:
-                riesgo_sin_stock += 1
-            criticos_candidates.append({
-                "id": rep.id,
-                "nombre": rep.nombre,
-                "categoria": rep.get_categoria_display() if hasattr(rep, "get_categoria_display") else rep.categoria,
-                "stock": int(rep.stock or 0),
-                "cobertura_dias": cobertura_val,
-                "tiempo_reposicion": tiempo_reposicion,
-                "consumo_diario": round(consumo_diario, 2),
-                "riesgo": riesgo,
-            })
-        else:
-            sin_movimientos += 1
-
-        cat_key = rep.categoria or "otros"
-        cat_entry = categorias_stats.setdefault(
-            cat_key,
-            {
-                "nombre": categoria_choices.get(cat_key, cat_key.title()),
-                "valor": 0.0,
-                "consumo": 0.0,
-                "unidades": 0,
-                "criticos": 0,
-            },
-        )
-        cat_entry["valor"] += float(rep.valor_inventario or 0.0)
-        cat_entry["consumo"] += total_salidas_rep
-        cat_entry["unidades"] += int(rep.stock or 0)
-        if getattr(rep, "bajo_stock", False):
-            cat_entry["criticos"] += 1
-
-    criticos = sorted(
-        criticos_candidates,
-        key=lambda item: item["cobertura_dias"] if item["cobertura_dias"] is not None else float("inf"),
-    )[:5]
-
-    categorias = []
-    for data in categorias_stats.values():
-        rot_cat = 0.0
-        if data["unidades"] > 0 and data["consumo"] > 0:
-            rot_cat = (data["consumo"] / ventana_mov_dias) * 30.0 / max(float(data["unidades"]), 1.0)
-        categorias.append({
-            "nombre": data["nombre"],
-            "valor": round(data["valor"], 2),
-            "rotacion": round(rot_cat, 2),
-            "criticos": data["criticos"],
-        })
-
-    return JsonResponse({
-        "rotacion": round(rotacion, 2),
-        "cobertura_dias": round(cobertura_global, 1) if cobertura_global else 0.0,
-        "sku_bajos": int(sku_bajos),
-        "valor_stock": round(float(valor_stock), 2),
-        "margen_potencial": round(float(margen_potencial), 2),
-        "consumo_mensual_estimado": round(consumo_mensual_estimado, 1),
-        "riesgo_sin_stock": int(riesgo_sin_stock),
-        "sin_movimientos": int(sin_movimientos),
-        "criticos": criticos,
-        "categorias": categorias,
-    })
+            mes = datetime.strptime(mes, "%Y-%m").date()
+        except ValueError:
+            raise ValueError(f"Mes inválido '{mes}', use AAAA-MM.") from None
+    qs = rentabilidad.consulta(desde, hasta, estados, servicio_id=servicio_id, mes=mes)
+    por = "servicio_mes" if servicio_id and mes else "mes" if servicio_id else "servicio" if mes else "servicio_mes"
+    return por, rentabilidad.agrupar(qs, por)
+
+def _fila_rentabilidad(r):
+    return {
+        "mes": r["mes"].strftime("%Y-%m") if "mes" in r else None,
+        "servicio_id": r.get("servicio_id"),
+        "servicio": r.get("servicio__nombre"),
+        "citas": r["n"] or 0,
+        "ingresos": float(r["ingresos_total"] or 0.0),
+        "costo": float(r["costo_total"] or 0.0),
+        "margen": float(r["margen_total"] or 0.0),
+    }
 
 @login_required
-def api_margen_servicios(request):
-    """
-    Margen por servicio: ingreso - costo. Si no hay costo, margen = ingreso.
-    Intenta usar Servicio.costo (o costo_estandar). AJUSTA segun tu modelo real.
-    """
+@condicional(validador_dashboard)
+def api_rentabilidad(request):
     try:
-        costo_field = "costo"
-        Servicio._meta.get_field(costo_field)
-    except Exception:
-        costo_field = None
-
-    qs, _, _, _ = _filtered_citas(request)
-    base = (qs.values("servicio__nombre")
-              .annotate(ingresos=Sum(F("servicio__precio")), n=Count("id"))
-              .order_by("-ingresos"))
-    labels, ingresos, costos, margen = [], [], [], []
-    for r in base[:10]:
-        nombre = r["servicio__nombre"] or "—"
-        ing = float(r["ingresos"] or 0.0)
-        if costo_field:
-            # costo por servicio * cantidad
-            try:
-                s = Servicio.objects.get(nombre=nombre)
-                c_unit = float(getattr(s, costo_field) or 0.0)
-                c = c_unit * float(r["n"])
-            except Exception:
-                c = 0.0
-        else:
-            c = 0.0
-        labels.append(nombre)
-        ingresos.append(ing)
-        costos.append(round(c, 2))
-        margen.append(round(ing - c, 2))
-    return JsonResponse({"labels": labels, "ingresos": ingresos, "costos": costos, "margen": margen})
+        por, filas = _corte_rentabilidad(request)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse({"por": por, "filas": [_fila_rentabilidad(r) for r in filas]})
 
+# ---------- Bundle ----------
 @login_required
-def api_funnel_citas(request):
+@condicional(validador_dashboard)
+def api_bundle(request):
     """
-    Embudo simple por estado (Pendiente -> En proceso -> Completada), Cancelada aparte.
+    Todos los paneles en una sola respuesta, calculados sobre los mismos agregados base.
+    Acepta los filtros habituales y, opcionalmente, ?panel=kpis&panel=ltv (o panel=kpis,ltv)
+    para pedir solo algunos.
     """
-    qs, _, _, _ = _filtered_citas(request)
-    def c(state):
-        return qs.filter(estado=state).count()
-    data = {
-        "pendiente": c("pendiente"),
-        "en_proceso": c("en_proceso"),
-        "completada": c("completada"),
-        "cancelada": c("cancelada"),
-    }
-    return JsonResponse(data)
+    pedidos = []
+    for valor in request.GET.getlist("panel"):
+        pedidos.extend(p.strip() for p in valor.split(",") if p.strip())
+    desconocidos = [p for p in pedidos if p not in panels.PANELES]
+    if desconocidos:
+        return JsonResponse(
+            {"error": f"Paneles desconocidos: {', '.join(desconocidos)}", "disponibles": list(panels.PANELES)},
+            status=400,
+        )
+    data = _dashboard_data(request)
+    return JsonResponse({clave: dashboard_cache.panel_cacheado(clave, data) for clave in pedidos or panels.PANELES})
+
+@login_required
+def api_cache_stats(request):
+    """Contadores de aciertos/fallos de la caché de paneles (para dimensionarla)."""
+    return JsonResponse(dashboard_cache.estadisticas())
 
 # ---------- Export ----------
+def hoja_citas_csv(request):
+    """Citas filtradas del dashboard para el CSV (vista directa y exportación en segundo plano)."""
+    qs, _, _, _ = _filtered_citas(request)
+    fecha = exportar.formato_fecha()
+    return exportar.Hoja(
+        "Citas",
+        ["Fecha", "Cliente", "Servicio", "Estado", "IngresoEstimado"],
+        qs.annotate(ingreso=rollups.INGRESO_CITA).order_by("-fecha_inicio"),
+        ["fecha_inicio", "cliente__nombre", "servicio__nombre", "estado", "ingreso"],
+        formatear=lambda f: (fecha(f[0]), f[1] or "", f[2] or "", f[3], f[4] or 0),
+    )
+
 @login_required
 def export_citas_csv(request):
-    qs, _, _, _ = _filtered_citas(request)
+    return exportar.respuesta_csv("citas.csv", hoja_citas_csv(request))
+
+@login_required
+def export_rentabilidad_csv(request):
+    try:
+        _, filas = _corte_rentabilidad(request)
+    except ValueError as exc:
+        return HttpResponse(str(exc), status=400, content_type="text/plain; charset=utf-8")
     response = HttpResponse(content_type="text/csv; charset=utf-8")
-    response["Content-Disposition"] = "attachment; filename=citas.csv"
+    response["Content-Disposition"] = "attachment; filename=rentabilidad_servicios.csv"
     writer = csv.writer(response)
-    writer.writerow(["Fecha", "Cliente", "Servicio", "Estado", "IngresoEstimado"])
-    for c in qs.order_by("-fecha_inicio"):
-        writer.writerow([
-            c.fecha_inicio.strftime("%Y-%m-%d %H:%M"),
-            getattr(c.cliente, "nombre", ""),
-            getattr(c.servicio, "nombre", ""),
-            c.estado,
-            getattr(c.servicio, "precio", 0.0),  # AJUSTA si usas Cita.total
-        ])
+    writer.writerow(["Mes", "Servicio", "Citas", "Ingresos", "Costo", "Margen"])
+    for r in filas:
+        fila = _fila_rentabilidad(r)
+        writer.writerow([fila["mes"] or "", fila["servicio"] or "", fila["citas"], fila["ingresos"], fila["costo"], fila["margen"]])
     return response
 
+HOJAS_XLSX = ("citas", "transacciones", "clientes")
+
+def _hojas_xlsx(qs):
+    """Hojas disponibles para el libro de citas, todas sobre los mismos filtros."""
+    metodos = dict(Transaccion.METODO_CHOICES)
+    origenes = dict(Cliente.Origen.choices)
+    return {
+        "citas": exportar.Hoja(
+            "Citas",
+            ["Fecha", "Cliente", "Servicio", "Estado", "IngresoEstimado"],
+            qs.annotate(ingreso=rollups.INGRESO_CITA).order_by("-fecha_inicio"),
+            ["fecha_inicio", "cliente__nombre", "servicio__nombre", "estado", "ingreso"],
+        ),
+        "transacciones": exportar.Hoja(
+            "Transacciones",
+            ["ID", "Fecha", "Cita", "Cliente", "Subtotal", "DescuentoPuntos", "Monto", "MetodoPago", "PuntosRedimidos"],
+            Transaccion.objects.filter(cita__in=qs.values("pk")).order_by("-fecha"),
+            ["id", "fecha", "cita_id", "cita__cliente__nombre", "subtotal", "descuento_puntos", "monto", "metodo_pago", "puntos_redimidos"],
+            formatear=lambda f: (*f[:7], metodos.get(f[7], f[7]), f[8]),
+        ),
+        "clientes": exportar.Hoja(
+            "Clientes",
+            ["Nombre", "Documento", "Teléfono", "Email", "Origen", "Puntos", "Nivel"],
+            Cliente.objects.filter(pk__in=qs.values("cliente_id")).order_by("nombre"),
+            ["nombre", "documento", "telefono", "email", "origen", "puntos_saldo", "nivel"],
+            formatear=lambda f: (*f[:4], origenes.get(f[4], f[4]), f[5], f[6]),
+        ),
+    }
+
+def hojas_citas_xlsx(request):
+    """
+    Hojas pedidas con ?hojas=citas,clientes (todas por defecto) sobre las citas
+    filtradas. ``ValueError`` si se pide una hoja desconocida.
+    """
+    qs, _, _, _ = _filtered_citas(request)
+    disponibles = _hojas_xlsx(qs)
+    pedidas = []
+    for valor in request.GET.getlist("hojas"):
+        pedidas.extend(h.strip() for h in valor.split(",") if h.strip())
+    desconocidas = [h for h in pedidas if h not in disponibles]
+    if desconocidas:
+        raise ValueError(f"Hojas desconocidas: {', '.join(desconocidas)}")
+    return [disponibles[h] for h in pedidas or disponibles]
+
 @login_required
 def export_citas_xlsx(request):
+    """
+    Libro XLSX con las citas filtradas y, por defecto, sus transacciones y clientes.
+    ?hojas=citas,clientes elige las hojas. Los errores se informan, no se cambia a CSV.
+    """
     try:
-        import pandas as pd
-        qs, _, _, _ = _filtered_citas(request)
-        rows = []
-        for c in qs.order_by("-fecha_inicio"):
-            rows.append({
-                "Fecha": c.fecha_inicio.strftime("%Y-%m-%d %H:%M"),
-                "Cliente": getattr(c.cliente, "nombre", ""),
-                "Servicio": getattr(c.servicio, "nombre", ""),
-                "Estado": c.estado,
-                "IngresoEstimado": float(getattr(c.servicio, "precio", 0.0)),
-            })
-        df = pd.DataFrame(rows)
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="Citas")
-        output.seek(0)
-        resp = HttpResponse(
-            output.read(),
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-        resp["Content-Disposition"] = 'attachment; filename="citas.xlsx"'
-        return resp
-    except Exception:
-        return export_citas_csv(request)
+        hojas = hojas_citas_xlsx(request)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc), "disponibles": list(HOJAS_XLSX)}, status=400)
+    try:
+        return exportar.respuesta_xlsx("citas.xlsx", hojas)
+    except exportar.ExportacionError as exc:
+        return JsonResponse({"error": str(exc)}, status=500)
+
+# ---------- Exportaciones en segundo plano ----------
+def _estado_exportacion(job):
+    completado = job.estado == ExportJob.Estado.COMPLETADO and job.archivo
+    return {
+        "id": job.pk,
+        "tipo": job.tipo,
+        "tipo_display": job.get_tipo_display(),
+        "estado": job.estado,
+        "filas_escritas": job.filas_escritas,
+        "filas_total": job.filas_total,
+        "progreso": job.progreso,
+        "eta_segundos": job.eta_segundos,
+        "error": job.error,
+        "estado_url": reverse("dashboard:api_exportacion_estado", args=[job.pk]),
+        "descarga_url": reverse("dashboard:exportacion_descargar", args=[job.pk]) if completado else None,
+    }
+
+def _exportacion_de(request, pk):
+    """Trabajo del usuario (el staff ve todos)."""
+    qs = ExportJob.objects.all()
+    if not request.user.is_staff:
+        qs = qs.filter(solicitado_por=request.user)
+    return get_object_or_404(qs, pk=pk)
+
+@login_required
+@require_POST
+def api_exportaciones(request):
+    """Encola una exportación: tipo (``ExportJob.Tipo``) y consulta (querystring de la vista)."""
+    try:
+        job = trabajos.encolar(request.POST.get("tipo", ""), request.POST.get("consulta", ""), request.user)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse(_estado_exportacion(job), status=202)
+
+@login_required
+def api_exportacion_estado(request, pk):
+    return JsonResponse(_estado_exportacion(_exportacion_de(request, pk)))
+
+@login_required
+def exportacion_descargar(request, pk):
+    job = _exportacion_de(request, pk)
+    if job.estado != ExportJob.Estado.COMPLETADO or not job.archivo:
+        raise Http404("La exportación aún no está lista.")
+    definicion = trabajos.DEFINICIONES.get(job.tipo)
+    nombre = definicion.archivo if definicion else job.archivo.name.rsplit("/", 1)[-1]
+    return FileResponse(job.archivo.open("rb"), as_attachment=True, filename=nombre)
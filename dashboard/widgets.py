@@ -0,0 +1,59 @@
+"""
+Widgets compartidos por los formularios.
+"""
+from __future__ import annotations
+
+from django import forms
+
+
+class SelectRemoto(forms.Select):
+    """
+    Select para un ``ModelChoiceField`` con muchas filas: solo renderiza la opción
+    elegida y el resto se busca escribiendo, contra ``url`` (JSON
+    ``{"results": [{"id", "text"}]}``, ver ``static/js/select_remoto.js``).
+
+    La validación sigue siendo la del campo: ``queryset.get(pk=<enviado>)``.
+    """
+
+    class Media:
+        js = ("js/select_remoto.js",)
+
+    def __init__(self, url, attrs=None, placeholder="Escribe para buscar…", minimo=1, parametros=None):
+        super().__init__(attrs)
+        self.url = url
+        self.placeholder = placeholder
+        self.minimo = minimo
+        # Otros campos del formulario cuyo valor se envía con la búsqueda: {"param": "id_campo"}
+        self.parametros = parametros or {}
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context["widget"]["attrs"].update(
+            {
+                "data-select-remoto": str(self.url),
+                "data-placeholder": self.placeholder,
+                "data-minimo": self.minimo,
+            }
+        )
+        if self.parametros:
+            context["widget"]["attrs"]["data-parametros"] = ",".join(f"{k}:{v}" for k, v in self.parametros.items())
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        """Solo la opción vacía y las elegidas (no recorre el queryset completo)."""
+        field = self.choices.field
+        elegidos = {str(v) for v in value if v not in (None, "")}
+        opciones = []
+        if not self.allow_multiple_selected:
+            opciones.append(self.create_option(name, "", field.empty_label or "", not elegidos, 0))
+        if elegidos:
+            clave = field.to_field_name or "pk"
+            try:
+                objetos = list(self.choices.queryset.filter(**{f"{clave}__in": elegidos}))
+            except (TypeError, ValueError):
+                objetos = []
+            for indice, obj in enumerate(objetos, start=len(opciones)):
+                opciones.append(
+                    self.create_option(name, field.prepare_value(obj), field.label_from_instance(obj), True, indice)
+                )
+        return [(None, opciones, 0)]
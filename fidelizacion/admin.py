@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ConfigPuntos, HistorialPuntos
+from .models import ConfigPuntos, HistorialPuntos, LotePuntos
 
 
 @admin.register(ConfigPuntos)
@@ -21,3 +21,12 @@ class HistorialPuntosAdmin(admin.ModelAdmin):
     search_fields = ("cliente__nombre", "referencia", "motivo")
     autocomplete_fields = ("cliente", "usuario_admin")
     readonly_fields = ("fecha", "saldo_resultante")
+
+
+@admin.register(LotePuntos)
+class LotePuntosAdmin(admin.ModelAdmin):
+    list_display = ("ganado", "cliente", "puntos", "disponibles", "vence", "vigente")
+    list_filter = ("vigente", "vence")
+    search_fields = ("cliente__nombre", "movimiento__referencia")
+    raw_id_fields = ("cliente", "movimiento")
+    readonly_fields = ("puntos", "ganado")
@@ -5,3 +5,6 @@ class FidelizacionConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "fidelizacion"
     verbose_name = "Fidelización"
+
+    def ready(self):
+        from . import signals  # noqa: F401
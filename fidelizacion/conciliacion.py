@@ -0,0 +1,140 @@
+"""
+Conciliación de ``Cliente.puntos_saldo`` con el historial de puntos.
+
+El saldo guardado es una copia del libro (``HistorialPuntos``): la suma de
+``puntos_ganados - puntos_usados`` de cada cliente. Las funciones de
+``fidelizacion.services`` lo mantienen al día, pero ``revertir_puntos`` lo
+recorta a cero y las escrituras fuera de ellas (consola, SQL, cargas) pueden
+dejarlo desfasado.
+
+``desajustes()`` calcula el saldo de libro de todos los clientes con una sola
+consulta agrupada y lo compara en memoria con los saldos guardados;
+``reparar()`` los iguala por lotes y deja un movimiento AJUSTE por cliente.
+``python manage.py reconciliar_puntos`` y la página
+``fidelizacion:conciliacion`` usan ambas.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from clientes.models import Cliente
+from fidelizacion import services
+from fidelizacion.models import HistorialPuntos, LotePuntos
+
+
+class Desajuste(NamedTuple):
+    cliente_id: int
+    nombre: str
+    saldo: int
+    libro: int
+
+    @property
+    def diferencia(self) -> int:
+        return self.saldo - self.libro
+
+    @property
+    def objetivo(self) -> int:
+        # El saldo no puede ser negativo: un libro bajo cero se corrige con el AJUSTE
+        return max(self.libro, 0)
+
+
+def saldos_libro(cliente_ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+    """Saldo según el historial por cliente (solo los que tienen movimientos)."""
+    movimientos = HistorialPuntos.objects.all()
+    if cliente_ids is not None:
+        movimientos = movimientos.filter(cliente_id__in=list(cliente_ids))
+    filas = movimientos.order_by().values("cliente_id").annotate(libro=Sum(F("puntos_ganados") - F("puntos_usados")))
+    return dict(filas.values_list("cliente_id", "libro"))
+
+
+def desajustes() -> List[Desajuste]:
+    """Clientes cuyo saldo guardado no coincide con su historial."""
+    libro = saldos_libro()
+    resultado = []
+    for pk, nombre, saldo in Cliente.objects.order_by("pk").values_list("pk", "nombre", "puntos_saldo").iterator(
+        chunk_size=5000
+    ):
+        esperado = libro.get(pk, 0)
+        if saldo != esperado:
+            resultado.append(Desajuste(pk, nombre, saldo, esperado))
+    return resultado
+
+
+def reparar(desajustados: Iterable[Desajuste], usuario_admin=None) -> int:
+    """
+    Lleva el saldo de cada cliente al de su libro (un UPDATE por lote) y registra
+    un AJUSTE con los saldos previos. Relee el libro bajo bloqueo, así que un
+    movimiento concurrente no se pisa. Devuelve los clientes corregidos.
+    """
+    ids = sorted({d.cliente_id for d in desajustados})
+    corregidos = 0
+    for trozo in services.trozos(ids):
+        corregidos += _reparar_trozo(trozo, usuario_admin)
+    return corregidos
+
+
+@transaction.atomic
+def _reparar_trozo(ids: List[int], usuario_admin=None) -> int:
+    vigente = services.config_vigente()
+    config, niveles = vigente.config, list(vigente.niveles)
+    clientes = list(Cliente.objects.select_for_update().filter(pk__in=ids).order_by("pk"))
+    libro = saldos_libro(ids)
+    en_lotes = dict(
+        LotePuntos.objects.filter(cliente_id__in=ids, vigente=True)
+        .order_by()
+        .values("cliente_id")
+        .annotate(total=Sum("disponibles"))
+        .values_list("cliente_id", "total")
+    )
+    ahora = timezone.now()
+    movimientos, lotes = [], []
+    for cliente in clientes:
+        desajuste = Desajuste(cliente.pk, cliente.nombre, cliente.puntos_saldo, libro.get(cliente.pk, 0))
+        if desajuste.diferencia == 0:
+            continue
+        cliente.puntos_saldo = desajuste.objetivo
+        services.actualizar_nivel(cliente, config, niveles=niveles)
+        cliente.actualizado = ahora
+        movimiento = HistorialPuntos(
+            cliente=cliente,
+            tipo=HistorialPuntos.Tipo.AJUSTE,
+            fecha=ahora,
+            # Solo mueve puntos si el libro estaba bajo cero: así libro y saldo quedan iguales
+            puntos_ganados=desajuste.objetivo - desajuste.libro,
+            saldo_resultante=cliente.puntos_saldo,
+            referencia=f"conciliacion:{cliente.pk}:{ahora:%Y%m%d%H%M%S}",
+            usuario_admin=usuario_admin,
+            motivo="Conciliación del saldo con el historial",
+            metadata={"saldo_anterior": desajuste.saldo, "saldo_libro": desajuste.libro},
+        )
+        movimientos.append(movimiento)
+        # Los lotes vigentes deben sumar el saldo nuevo
+        faltante = desajuste.objetivo - en_lotes.get(cliente.pk, 0)
+        if faltante > 0:
+            lotes.append((movimiento, faltante))
+        elif faltante < 0:
+            services.consumir_lotes(cliente.pk, -faltante)
+
+    Cliente.objects.bulk_update(
+        [m.cliente for m in movimientos], ["puntos_saldo", "nivel", "actualizado"], batch_size=services.LOTE_TAMANO
+    )
+    HistorialPuntos.objects.bulk_create(movimientos, batch_size=services.LOTE_TAMANO)
+    LotePuntos.objects.bulk_create(
+        [
+            LotePuntos(
+                cliente_id=m.cliente_id,
+                movimiento=m,
+                puntos=puntos,
+                disponibles=puntos,
+                ganado=ahora,
+                vence=services.vencimiento(config, ahora),
+            )
+            for m, puntos in lotes
+        ],
+        batch_size=services.LOTE_TAMANO,
+    )
+    return len(movimientos)
@@ -86,6 +86,8 @@ class ConfigPuntosForm(forms.ModelForm):
 
             "puntos_max_por_factura",
 
+            "dias_vigencia",
+
             "exclusiones_servicios",
 
             "exclusiones_categorias",
@@ -228,3 +230,49 @@ class ConfigPuntosForm(forms.ModelForm):
 
         return normalizado
 
+
+
+
+
+class SimulacionForm(ConfigPuntosForm):
+
+    """Configuración candidata para el simulador: no se guarda."""
+
+
+
+    dias = forms.IntegerField(
+
+        label="Días de historia",
+
+        min_value=1,
+
+        max_value=3650,
+
+        initial=365,
+
+        help_text="Transacciones de los últimos N días que se vuelven a calcular.",
+
+        widget=forms.NumberInput(attrs={"class": "form-control"}),
+
+    )
+
+
+
+    class Meta(ConfigPuntosForm.Meta):
+
+        fields = [
+
+            "puntos_por_monto",
+
+            "monto_base_cop",
+
+            "puntos_equivalencia",
+
+            "valor_redencion_cop",
+
+            "puntos_max_por_factura",
+
+            "niveles_config",
+
+        ]
+
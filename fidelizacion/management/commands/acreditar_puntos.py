@@ -0,0 +1,121 @@
+"""
+Acredita puntos de fidelización a las transacciones de citas completadas que aún
+no los tienen (p. ej. facturas importadas o cargadas antes de activar el
+programa), en lotes con ``fidelizacion.services.otorgar_puntos_lote``.
+
+Es idempotente: una transacción cuyo movimiento ``transaccion:<id>:gana`` ya
+existe se omite, así que se puede volver a ejecutar sin duplicar puntos.
+
+Clientes y transacciones se escriben con ``bulk_update``/``update``, sin las
+señales ``post_save``. De lo que ellas mantienen solo dependen de estas
+columnas (saldo, nivel, ``puntos_otorgados``) la caché de paneles y las
+sugerencias del selector de citas, que se invalidan al confirmar cada lote. Los
+rollups y las métricas de clientes solo cambian con citas, montos y fechas, y
+la búsqueda no indexa esas columnas.
+
+Uso:
+    python manage.py acreditar_puntos
+    python manage.py acreditar_puntos --desde 2026-01-01 --hasta 2026-01-31
+    python manage.py acreditar_puntos --lote 2000 --simular   # calcula y deshace
+"""
+from __future__ import annotations
+
+from datetime import date
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from clientes.models import Cliente
+from dashboard import busqueda
+from dashboard import cache as dashboard_cache
+from fidelizacion import services
+from transacciones.models import Transaccion
+
+
+class _Simulacion(Exception):
+    """Deshace el lote al simular."""
+
+
+def _fecha(texto: str) -> date:
+    try:
+        return date.fromisoformat(texto)
+    except ValueError as exc:
+        raise CommandError(f"Fecha inválida: {texto!r} (formato AAAA-MM-DD).") from exc
+
+
+class Command(BaseCommand):
+    help = (
+        "Otorga en lote los puntos pendientes de las transacciones de citas completadas. Escribe sin "
+        "señales post_save e invalida al confirmar la caché del dashboard y las sugerencias."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", type=_fecha, help="Primera fecha de transacción (AAAA-MM-DD).")
+        parser.add_argument("--hasta", type=_fecha, help="Última fecha de transacción (AAAA-MM-DD).")
+        parser.add_argument("--lote", type=int, default=1000, help="Transacciones por lote (por defecto 1000).")
+        parser.add_argument("--simular", action="store_true", help="Calcula e informa sin guardar nada.")
+
+    def handle(self, *args, **options):
+        if options["lote"] <= 0:
+            raise CommandError("--lote debe ser mayor que cero.")
+        pendientes = Transaccion.objects.filter(cita__estado="completada", puntos_otorgados=False)
+        if options["desde"]:
+            pendientes = pendientes.filter(fecha__date__gte=options["desde"])
+        if options["hasta"]:
+            pendientes = pendientes.filter(fecha__date__lte=options["hasta"])
+        pendientes = pendientes.select_related("cita__servicio").only(
+            "pk", "subtotal", "cita__cliente_id", "cita__servicio__nombre"
+        )
+
+        inicio = perf_counter()
+        total = services.ResultadoLote()
+        ultimo = 0
+        while True:
+            transacciones = list(pendientes.filter(pk__gt=ultimo).order_by("pk")[: options["lote"]])
+            if not transacciones:
+                break
+            ultimo = transacciones[-1].pk
+            resultado = self._acreditar(transacciones, options["simular"])
+            for campo in ("lineas", "duplicadas", "excluidas", "sin_puntos", "sin_cliente", "puntos"):
+                setattr(total, campo, getattr(total, campo) + getattr(resultado, campo))
+            self.stdout.write(
+                f"Lote hasta #{ultimo}: {len(resultado.acreditadas)} acreditada(s), {resultado.puntos} punto(s)"
+            )
+
+        segundos = perf_counter() - inicio
+        ritmo = total.lineas / segundos if segundos else 0
+        self.stdout.write(
+            f"{total.lineas} transacción(es): {total.duplicadas} ya acreditada(s), {total.excluidas} excluida(s), "
+            f"{total.sin_puntos} sin puntos."
+        )
+        resumen = f"{total.puntos} punto(s) otorgados en {segundos:.2f}s ({ritmo:.0f} transacciones/s)."
+        if options["simular"]:
+            resumen = "Simulación (sin cambios): " + resumen
+        self.stdout.write(self.style.SUCCESS(resumen))
+
+    def _acreditar(self, transacciones, simular: bool) -> services.ResultadoLote:
+        lineas = [
+            services.LineaPuntos(
+                cliente_id=t.cita.cliente_id,
+                subtotal_cop=t.subtotal,
+                referencia=f"{t.referencia_fidelizacion}:gana",
+                servicio=t.cita.servicio,
+                motivo=f"Servicio {t.cita.servicio.nombre}" if t.cita.servicio_id else "",
+            )
+            for t in transacciones
+        ]
+        try:
+            with transaction.atomic():
+                resultado = services.otorgar_puntos_lote(lineas)
+                acreditadas = [t.pk for t in transacciones if f"{t.referencia_fidelizacion}:gana" in resultado.acreditadas]
+                Transaccion.objects.filter(pk__in=acreditadas).update(puntos_otorgados=True)
+                if acreditadas:
+                    # Lo que harían las señales de Cliente y Transaccion (ver el docstring del módulo)
+                    transaction.on_commit(dashboard_cache.invalidar)
+                    transaction.on_commit(lambda: busqueda.invalidar_sugerencias(Cliente, Transaccion))
+                if simular:
+                    raise _Simulacion
+        except _Simulacion:
+            pass
+        return resultado
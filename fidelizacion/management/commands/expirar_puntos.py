@@ -0,0 +1,82 @@
+"""
+Vence los lotes de puntos cuya fecha ``vence`` ya pasó (ver ``LotePuntos``).
+
+Trabaja por grupos de clientes tomados de los lotes vencidos más antiguos
+(índice parcial sobre ``vence``); cada grupo va en su propia transacción corta y
+deja un único movimiento REVERSA por cliente con lo que le quedaba en esos
+lotes. Se puede interrumpir y volver a ejecutar: lo ya vencido no se repite.
+
+Uso:
+    python manage.py expirar_puntos
+    python manage.py expirar_puntos --fecha 2026-12-31 --lote 1000
+    python manage.py expirar_puntos --simular     # solo cuenta lo vencido
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, time
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from fidelizacion import services
+from fidelizacion.models import LotePuntos
+
+
+def _fecha(texto: str) -> date:
+    try:
+        return date.fromisoformat(texto)
+    except ValueError as exc:
+        raise CommandError(f"Fecha inválida: {texto!r} (formato AAAA-MM-DD).") from exc
+
+
+class Command(BaseCommand):
+    help = "Descuenta del saldo los puntos de los lotes vencidos, por grupos de clientes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fecha", type=_fecha, help="Vence lo que vencía hasta el final de ese día (por defecto, ahora).")
+        parser.add_argument("--lote", type=int, default=500, help="Lotes vencidos leídos por grupo (por defecto 500).")
+        parser.add_argument("--simular", action="store_true", help="Informa lo que vencería sin escribir.")
+
+    def handle(self, *args, **options):
+        if options["lote"] <= 0:
+            raise CommandError("--lote debe ser mayor que cero.")
+        corte = timezone.now()
+        if options["fecha"]:
+            corte = timezone.make_aware(datetime.combine(options["fecha"], time.max))
+
+        inicio = perf_counter()
+        if options["simular"]:
+            vencidos = LotePuntos.objects.filter(vigente=True, vence__lte=corte).aggregate(
+                lotes=Count("pk"), clientes=Count("cliente_id", distinct=True), puntos=Sum("disponibles")
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Simulación: vencerían {vencidos['lotes']} lote(s) de {vencidos['clientes']} cliente(s), "
+                    f"hasta {vencidos['puntos'] or 0} punto(s) ({perf_counter() - inicio:.2f}s)."
+                )
+            )
+            return
+
+        total = services.ResultadoVencimiento()
+        grupos = 0
+        while True:
+            clientes = services.clientes_con_vencidos(corte, options["lote"])
+            if not clientes:
+                break
+            resultado = services.expirar_lotes(clientes, corte)
+            grupos += 1
+            total.clientes += resultado.clientes
+            total.lotes += resultado.lotes
+            total.puntos += resultado.puntos
+            self.stdout.write(f"Grupo {grupos}: {resultado.lotes} lote(s), {resultado.puntos} punto(s)")
+
+        segundos = perf_counter() - inicio
+        ritmo = total.lotes / segundos if segundos else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{total.lotes} lote(s) vencidos, {total.puntos} punto(s) de {total.clientes} cliente(s) "
+                f"en {segundos:.2f}s ({ritmo:.0f} lotes/s)."
+            )
+        )
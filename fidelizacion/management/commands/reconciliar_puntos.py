@@ -0,0 +1,52 @@
+"""
+Compara ``Cliente.puntos_saldo`` con el saldo que da el historial de puntos
+(``fidelizacion.conciliacion``) y, con ``--reparar``, iguala los desajustados
+dejando un movimiento AJUSTE por cliente.
+
+Uso:
+    python manage.py reconciliar_puntos               # solo informa
+    python manage.py reconciliar_puntos --estricto    # termina con error si hay desajustes
+    python manage.py reconciliar_puntos --reparar
+"""
+from __future__ import annotations
+
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fidelizacion import conciliacion
+
+MOSTRAR = 20
+
+
+class Command(BaseCommand):
+    help = "Verifica (y opcionalmente corrige) el saldo de puntos de cada cliente contra su historial."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reparar", action="store_true", help="Corrige los saldos desajustados.")
+        parser.add_argument("--estricto", action="store_true", help="Sin --reparar, termina con error si hay desajustes.")
+
+    def handle(self, *args, **options):
+        inicio = perf_counter()
+        desajustes = conciliacion.desajustes()
+        for desajuste in desajustes[:MOSTRAR]:
+            self.stdout.write(
+                f"#{desajuste.cliente_id} {desajuste.nombre}: saldo {desajuste.saldo}, "
+                f"historial {desajuste.libro} ({desajuste.diferencia:+d})"
+            )
+        if len(desajustes) > MOSTRAR:
+            self.stdout.write(f"... y {len(desajustes) - MOSTRAR} más")
+        resumen = f"{len(desajustes)} cliente(s) desajustado(s); verificación en {perf_counter() - inicio:.2f}s."
+        if not desajustes:
+            self.stdout.write(self.style.SUCCESS(resumen))
+            return
+        if not options["reparar"]:
+            if options["estricto"]:
+                raise CommandError(resumen)
+            self.stdout.write(self.style.WARNING(resumen))
+            return
+
+        corregidos = conciliacion.reparar(desajustes)
+        self.stdout.write(
+            self.style.SUCCESS(f"{resumen} {corregidos} saldo(s) corregido(s) en {perf_counter() - inicio:.2f}s.")
+        )
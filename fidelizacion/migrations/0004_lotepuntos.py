@@ -0,0 +1,61 @@
+# Generated by Django 4.2.24 on 2026-10-17 01:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def abrir_lotes_existentes(apps, schema_editor):
+    """El saldo acumulado antes de los lotes queda en un lote sin vencimiento por cliente."""
+    Cliente = apps.get_model("clientes", "Cliente")
+    LotePuntos = apps.get_model("fidelizacion", "LotePuntos")
+    ahora = django.utils.timezone.now()
+    saldos = Cliente.objects.filter(puntos_saldo__gt=0).values_list("pk", "puntos_saldo").iterator(chunk_size=2000)
+    lotes = (
+        LotePuntos(cliente_id=pk, puntos=saldo, disponibles=saldo, ganado=ahora, vence=None)
+        for pk, saldo in saldos
+    )
+    while True:
+        trozo = [lote for _, lote in zip(range(2000), lotes)]
+        if not trozo:
+            break
+        LotePuntos.objects.bulk_create(trozo)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0006_cliente_citas_count_cliente_ultima_cita_and_more'),
+        ('fidelizacion', '0003_alter_configpuntos_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='configpuntos',
+            name='dias_vigencia',
+            field=models.PositiveIntegerField(default=0, help_text='Días que duran los puntos ganados antes de vencer (0 = no vencen).'),
+        ),
+        migrations.CreateModel(
+            name='LotePuntos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('puntos', models.PositiveIntegerField()),
+                ('disponibles', models.PositiveIntegerField()),
+                ('ganado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('vence', models.DateTimeField(blank=True, help_text='Vacío = no vence.', null=True)),
+                ('vigente', models.BooleanField(default=True)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lotes_puntos', to='clientes.cliente')),
+                ('movimiento', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lotes', to='fidelizacion.historialpuntos')),
+            ],
+            options={
+                'verbose_name': 'lote de puntos',
+                'verbose_name_plural': 'lotes de puntos',
+                'ordering': ['ganado', 'pk'],
+                'indexes': [
+                    models.Index(condition=models.Q(('vigente', True)), fields=['cliente', 'ganado'], name='lote_cliente_fifo_idx'),
+                    models.Index(condition=models.Q(('vigente', True)), fields=['vence'], name='lote_vigente_vence_idx'),
+                ],
+            },
+        ),
+        migrations.RunPython(abrir_lotes_existentes, migrations.RunPython.noop),
+    ]
@@ -32,6 +32,10 @@ class ConfigPuntos(models.Model):
         default=0,
         help_text="Tope de puntos otorgados por factura (0 = sin tope).",
     )
+    dias_vigencia = models.PositiveIntegerField(
+        default=0,
+        help_text="Días que duran los puntos ganados antes de vencer (0 = no vencen).",
+    )
     exclusiones_servicios = models.ManyToManyField(
         "servicios.Servicio",
         blank=True,
@@ -125,3 +129,45 @@ class HistorialPuntos(models.Model):
 
     def __str__(self) -> str:
         return f"{self.get_tipo_display()} · {self.cliente} · {self.fecha:%Y-%m-%d}"
+
+
+class LotePuntos(models.Model):
+    """
+    Puntos ganados en un mismo movimiento, con su fecha de vencimiento.
+
+    Los canjes y descuentos consumen los lotes del cliente en orden de llegada
+    (FIFO) y ``expirar_puntos`` da de baja lo que queda de los lotes vencidos.
+    ``vigente`` pasa a False cuando el lote se agota o vence, así los índices
+    solo recorren lotes con saldo.
+    """
+
+    cliente = models.ForeignKey(
+        "clientes.Cliente",
+        on_delete=models.CASCADE,
+        related_name="lotes_puntos",
+    )
+    movimiento = models.ForeignKey(
+        HistorialPuntos,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="lotes",
+    )
+    puntos = models.PositiveIntegerField()
+    disponibles = models.PositiveIntegerField()
+    ganado = models.DateTimeField(default=timezone.now)
+    vence = models.DateTimeField(null=True, blank=True, help_text="Vacío = no vence.")
+    vigente = models.BooleanField(default=True)
+
+    class Meta:
+        verbose_name = "lote de puntos"
+        verbose_name_plural = "lotes de puntos"
+        ordering = ["ganado", "pk"]
+        indexes = [
+            # Parciales: solo los lotes con saldo, que son los que se consumen o vencen
+            models.Index(fields=["cliente", "ganado"], name="lote_cliente_fifo_idx", condition=models.Q(vigente=True)),
+            models.Index(fields=["vence"], name="lote_vigente_vence_idx", condition=models.Q(vigente=True)),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.cliente} · {self.disponibles}/{self.puntos} · {self.ganado:%Y-%m-%d}"
@@ -1,15 +1,18 @@
 ﻿"""Reusable business logic for the loyalty / fidelizacion system."""
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
-from typing import Any, Dict, Iterable, Optional
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
 
 from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
 from django.utils import timezone
 
 from clientes.models import Cliente
-from fidelizacion.models import ConfigPuntos, HistorialPuntos
+from dashboard import cache as dashboard_cache
+from fidelizacion.models import ConfigPuntos, HistorialPuntos, LotePuntos
 
 
 class LoyaltyError(Exception):
@@ -27,9 +30,63 @@ class LoyaltyComputation:
     metadata: Optional[Dict[str, Any]] = None
 
 
+@dataclass(frozen=True)
+class ConfigVigente:
+    """Configuración cargada una vez por versión, con los niveles y exclusiones ya resueltos."""
+
+    version: int
+    config: ConfigPuntos
+    niveles: Tuple[Dict[str, Any], ...]
+    servicios_excluidos: FrozenSet[int]
+
+
+# Caché del proceso; la versión vive en el alias ``dashboard`` para que un cambio
+# hecho en otro proceso también la invalide (ver fidelizacion.signals). Si ese
+# alias es local a cada proceso, la versión caduca como las generaciones del
+# dashboard (``DASHBOARD_CACHE_TTL_LOCAL``) y la configuración se relee a lo sumo
+# con ese retraso.
+CONFIG_VERSION_KEY = "fidelizacion:config:version"
+_vigente: Optional[ConfigVigente] = None
+
+
+def _version_config() -> int:
+    return dashboard_cache.generacion(CONFIG_VERSION_KEY)
+
+
+def invalidar_config() -> None:
+    """Obliga a todos los procesos a recargar la configuración en su próximo uso."""
+    global _vigente
+    dashboard_cache.incrementar(CONFIG_VERSION_KEY)
+    _vigente = None
+
+
+def config_vigente() -> ConfigVigente:
+    """Configuración, niveles normalizados y servicios excluidos, cacheados por versión."""
+    global _vigente
+    version = _version_config()
+    actual = _vigente
+    if actual is None or actual.version != version:
+        config = ConfigPuntos.load()
+        actual = ConfigVigente(
+            version=version,
+            config=config,
+            niveles=tuple(parse_niveles(config)),
+            servicios_excluidos=frozenset(config.exclusiones_servicios.values_list("pk", flat=True)),
+        )
+        _vigente = actual
+    return actual
+
+
 def get_config() -> ConfigPuntos:
-    """Convenience wrapper."""
-    return ConfigPuntos.load()
+    """Configuración vigente (compartida en el proceso: no modificarla; editar con ``ConfigPuntos.load()``)."""
+    return config_vigente().config
+
+
+def _niveles_de(config: ConfigPuntos) -> list[Dict[str, Any]]:
+    actual = _vigente
+    if actual is not None and actual.config is config:
+        return list(actual.niveles)
+    return parse_niveles(config)
 
 
 def servicio_permite_puntos(servicio, config: Optional[ConfigPuntos] = None) -> bool:
@@ -37,11 +94,16 @@ def servicio_permite_puntos(servicio, config: Optional[ConfigPuntos] = None) ->
     if servicio is None:
         return True
     config = config or get_config()
-    try:
-        if config.exclusiones_servicios.filter(pk=servicio.pk).exists():
+    actual = _vigente
+    if actual is not None and actual.config is config:
+        if servicio.pk in actual.servicios_excluidos:
             return False
-    except Exception:
-        pass
+    else:
+        try:
+            if config.exclusiones_servicios.filter(pk=servicio.pk).exists():
+                return False
+        except Exception:
+            pass
     lista_exclu = config.exclusiones_categorias or []
     categoria = getattr(servicio, "categoria", None)
     if categoria and categoria in lista_exclu:
@@ -49,7 +111,7 @@ def servicio_permite_puntos(servicio, config: Optional[ConfigPuntos] = None) ->
     return True
 
 
-def _parse_niveles(config: ConfigPuntos) -> list[Dict[str, Any]]:
+def parse_niveles(config: ConfigPuntos) -> list[Dict[str, Any]]:
     """Return normalized level configuration with thresholds and benefits."""
     raw = config.niveles_config or {}
     if not isinstance(raw, dict):
@@ -118,7 +180,7 @@ def calcular_puntos_detallado(
 ) -> LoyaltyComputation:
     """Calcula los puntos con un detalle completo del calculo."""
     config = config or get_config()
-    niveles_list = list(niveles) if niveles is not None else _parse_niveles(config)
+    niveles_list = list(niveles) if niveles is not None else _niveles_de(config)
 
     if subtotal_cop is None:
         return LoyaltyComputation(0, Decimal("0"), "Subtotal no valido.", metadata={"motivo": "subtotal_nulo"})
@@ -248,12 +310,13 @@ def calcular_redencion_cop(puntos: int, config: Optional[ConfigPuntos] = None) -
     return (Decimal(puntos) * factor).quantize(Decimal("1.00"))
 
 
-def _actualizar_nivel(
+def actualizar_nivel(
     cliente: Cliente,
     config: ConfigPuntos,
     niveles: Optional[Iterable[Dict[str, Any]]] = None,
 ) -> None:
-    niveles_list = list(niveles) if niveles is not None else _parse_niveles(config)
+    """Pone en ``cliente.nivel`` (sin guardar) el nivel que corresponde a su saldo."""
+    niveles_list = list(niveles) if niveles is not None else _niveles_de(config)
     if not niveles_list:
         if cliente.nivel:
             cliente.nivel = ""
@@ -264,6 +327,60 @@ def _actualizar_nivel(
         cliente.nivel = nuevo_nivel
 
 
+# ---------- Lotes ----------
+def vencimiento(config: ConfigPuntos, desde: datetime) -> Optional[datetime]:
+    """Vencimiento de los puntos ganados en ``desde``, o None si no vencen."""
+    dias = config.dias_vigencia or 0
+    return desde + timedelta(days=dias) if dias else None
+
+
+def _abrir_lote(movimiento: HistorialPuntos, config: ConfigPuntos) -> LotePuntos:
+    """Lote (sin guardar) con los puntos que acredita ``movimiento``."""
+    return LotePuntos(
+        cliente_id=movimiento.cliente_id,
+        movimiento=movimiento,
+        puntos=movimiento.puntos_ganados,
+        disponibles=movimiento.puntos_ganados,
+        ganado=movimiento.fecha,
+        vence=vencimiento(config, movimiento.fecha),
+    )
+
+
+def consumir_lotes(cliente_id: int, puntos: int, movimientos: Iterable[int] = ()) -> int:
+    """
+    Descuenta ``puntos`` de los lotes vigentes del cliente, del más antiguo al más
+    nuevo (primero los de ``movimientos``, si se indican). Devuelve lo consumido,
+    que puede ser menos si el saldo viene de antes de los lotes.
+    """
+    if puntos <= 0:
+        return 0
+    lotes = LotePuntos.objects.select_for_update().filter(cliente_id=cliente_id, vigente=True)
+    movimientos = list(movimientos)
+    if movimientos:
+        lotes = lotes.order_by(
+            Case(When(movimiento_id__in=movimientos, then=Value(0)), default=Value(1), output_field=IntegerField()),
+            "ganado",
+            "pk",
+        )
+    else:
+        lotes = lotes.order_by("ganado", "pk")
+    restante = puntos
+    cambiados = []
+    for lote in lotes.only("pk", "disponibles", "vigente").iterator(chunk_size=100):
+        tomado = min(lote.disponibles, restante)
+        lote.disponibles -= tomado
+        lote.vigente = lote.disponibles > 0
+        cambiados.append(lote)
+        restante -= tomado
+        if not restante:
+            break
+    LotePuntos.objects.bulk_update(cambiados, ["disponibles", "vigente"], batch_size=LOTE_TAMANO)
+    return puntos - restante
+
+
+LOTE_TAMANO = 500
+
+
 @transaction.atomic
 def otorgar_puntos(
     cliente: Cliente,
@@ -279,7 +396,7 @@ def otorgar_puntos(
         return 0
 
     cliente_locked = Cliente.objects.select_for_update().get(pk=cliente.pk)
-    niveles = _parse_niveles(config)
+    niveles = _niveles_de(config)
     calculo = calcular_puntos_detallado(
         subtotal_cop,
         config=config,
@@ -291,7 +408,7 @@ def otorgar_puntos(
         return 0
 
     cliente_locked.puntos_saldo += puntos
-    _actualizar_nivel(cliente_locked, config, niveles=niveles)
+    actualizar_nivel(cliente_locked, config, niveles=niveles)
     cliente_locked.save(update_fields=["puntos_saldo", "nivel", "actualizado"])
 
     subtotal_decimal = calculo.subtotal_cop.quantize(Decimal("1.00"))
@@ -302,7 +419,7 @@ def otorgar_puntos(
     if servicio is not None:
         metadata_historial["servicio"] = getattr(servicio, "nombre", str(servicio))
 
-    HistorialPuntos.objects.create(
+    movimiento = HistorialPuntos.objects.create(
         cliente=cliente_locked,
         tipo=HistorialPuntos.Tipo.GANA,
         fecha=timezone.now(),
@@ -314,8 +431,128 @@ def otorgar_puntos(
         motivo=motivo or calculo.descripcion or "Otorgamiento automatico",
         metadata=metadata_historial,
     )
+    _abrir_lote(movimiento, config).save()
     return puntos
 
+@dataclass(frozen=True)
+class LineaPuntos:
+    """Una factura (o línea) a acreditar en ``otorgar_puntos_lote``."""
+
+    cliente_id: int
+    subtotal_cop: Decimal
+    referencia: str
+    servicio: Any = None
+    motivo: str = ""
+    fecha: Optional[datetime] = None
+
+
+@dataclass
+class ResultadoLote:
+    lineas: int = 0
+    duplicadas: int = 0
+    excluidas: int = 0
+    sin_puntos: int = 0
+    sin_cliente: int = 0
+    puntos: int = 0
+    # referencia -> puntos acreditados
+    acreditadas: Dict[str, int] = field(default_factory=dict)
+
+
+def trozos(valores: list, tamano: int = LOTE_TAMANO):
+    """``valores`` en listas de a lo sumo ``tamano`` (para ``IN (...)`` y escrituras por lotes)."""
+    for inicio in range(0, len(valores), tamano):
+        yield valores[inicio : inicio + tamano]
+
+
+@transaction.atomic
+def otorgar_puntos_lote(lineas: Iterable[LineaPuntos], usuario_admin=None) -> ResultadoLote:
+    """
+    Acredita muchas líneas a la vez con las mismas reglas que ``otorgar_puntos``:
+    bloquea los clientes afectados una vez y en orden de pk, calcula en memoria
+    (en el orden de las líneas, así el nivel de cada cliente evoluciona como con
+    llamadas sucesivas) y escribe con ``bulk_create`` / ``bulk_update``.
+
+    Idempotente por ``referencia``: se omite una línea si el cliente ya tiene un
+    movimiento GANA con esa referencia (o si se repite dentro del lote).
+    """
+    lineas = list(lineas)
+    resultado = ResultadoLote(lineas=len(lineas))
+    if not lineas:
+        return resultado
+    vigente = config_vigente()
+    config, niveles = vigente.config, list(vigente.niveles)
+
+    referencias = sorted({linea.referencia for linea in lineas})
+    vistas = set()
+    for trozo in trozos(referencias):
+        vistas.update(
+            HistorialPuntos.objects.filter(tipo=HistorialPuntos.Tipo.GANA, referencia__in=trozo).values_list(
+                "cliente_id", "referencia"
+            )
+        )
+
+    clientes: Dict[int, Cliente] = {}
+    for trozo in trozos(sorted({linea.cliente_id for linea in lineas})):
+        clientes.update((c.pk, c) for c in Cliente.objects.select_for_update().filter(pk__in=trozo).order_by("pk"))
+
+    ahora = timezone.now()
+    movimientos = []
+    modificados: Dict[int, Cliente] = {}
+    for linea in lineas:
+        cliente = clientes.get(linea.cliente_id)
+        if cliente is None:
+            resultado.sin_cliente += 1
+            continue
+        if (linea.cliente_id, linea.referencia) in vistas:
+            resultado.duplicadas += 1
+            continue
+        vistas.add((linea.cliente_id, linea.referencia))
+        if not servicio_permite_puntos(linea.servicio, config=config):
+            resultado.excluidas += 1
+            continue
+        calculo = calcular_puntos_detallado(linea.subtotal_cop, config=config, cliente=cliente, niveles=niveles)
+        puntos = calculo.puntos
+        if puntos <= 0:
+            resultado.sin_puntos += 1
+            continue
+
+        cliente.puntos_saldo += puntos
+        actualizar_nivel(cliente, config, niveles=niveles)
+        cliente.actualizado = ahora
+        modificados[cliente.pk] = cliente
+
+        metadata = dict(calculo.metadata or {})
+        metadata.setdefault("detalle", calculo.descripcion)
+        metadata["puntos_ganados"] = puntos
+        metadata["servicio_id"] = getattr(linea.servicio, "pk", None)
+        if linea.servicio is not None:
+            metadata["servicio"] = getattr(linea.servicio, "nombre", str(linea.servicio))
+        metadata["lote"] = True
+        movimientos.append(
+            HistorialPuntos(
+                cliente=cliente,
+                tipo=HistorialPuntos.Tipo.GANA,
+                fecha=linea.fecha or ahora,
+                monto_pesos=calculo.subtotal_cop.quantize(Decimal("1.00")),
+                puntos_ganados=puntos,
+                saldo_resultante=cliente.puntos_saldo,
+                referencia=linea.referencia,
+                usuario_admin=usuario_admin,
+                motivo=linea.motivo or calculo.descripcion or "Otorgamiento automatico",
+                metadata=metadata,
+            )
+        )
+        resultado.puntos += puntos
+        resultado.acreditadas[linea.referencia] = puntos
+
+    HistorialPuntos.objects.bulk_create(movimientos, batch_size=LOTE_TAMANO)
+    LotePuntos.objects.bulk_create([_abrir_lote(m, config) for m in movimientos], batch_size=LOTE_TAMANO)
+    Cliente.objects.bulk_update(
+        list(modificados.values()), ["puntos_saldo", "nivel", "actualizado"], batch_size=LOTE_TAMANO
+    )
+    return resultado
+
+
 @transaction.atomic
 def canjear_puntos(cliente: Cliente, puntos: int, referencia: str, usuario_admin=None, motivo="") -> Decimal:
     """Debita puntos del cliente, valida saldo y registra el descuento."""
@@ -332,8 +569,9 @@ def canjear_puntos(cliente: Cliente, puntos: int, referencia: str, usuario_admin
         raise LoyaltyError("El cliente no tiene puntos suficientes.")
 
     cliente_locked.puntos_saldo -= puntos
-    _actualizar_nivel(cliente_locked, config)
+    actualizar_nivel(cliente_locked, config)
     cliente_locked.save(update_fields=["puntos_saldo", "nivel", "actualizado"])
+    consumir_lotes(cliente_locked.pk, puntos)
 
     HistorialPuntos.objects.create(
         cliente=cliente_locked,
@@ -362,12 +600,14 @@ def bonificar_puntos(cliente: Cliente, puntos: int, referencia: str, usuario_adm
         raise LoyaltyError("El ajuste dejaria el saldo del cliente en negativo.")
 
     cliente_locked.puntos_saldo = nuevo_saldo
-    _actualizar_nivel(cliente_locked, config)
+    actualizar_nivel(cliente_locked, config)
     cliente_locked.save(update_fields=["puntos_saldo", "nivel", "actualizado"])
 
     tipo = HistorialPuntos.Tipo.BONO if puntos > 0 else HistorialPuntos.Tipo.AJUSTE
+    if puntos < 0:
+        consumir_lotes(cliente_locked.pk, -puntos)
 
-    HistorialPuntos.objects.create(
+    movimiento = HistorialPuntos.objects.create(
         cliente=cliente_locked,
         tipo=tipo,
         fecha=timezone.now(),
@@ -379,6 +619,8 @@ def bonificar_puntos(cliente: Cliente, puntos: int, referencia: str, usuario_adm
         usuario_admin=usuario_admin,
         motivo=motivo,
     )
+    if puntos > 0:
+        _abrir_lote(movimiento, config).save()
 
 
 @transaction.atomic
@@ -392,28 +634,119 @@ def revertir_puntos(cliente: Cliente, referencia: str, usuario_admin=None, motiv
         return 0
 
     cliente_locked = Cliente.objects.select_for_update().get(pk=cliente.pk)
-    nuevo_saldo = cliente_locked.puntos_saldo - delta
+    ids = [m.pk for m in movimientos]
+    revertidos = delta
+    if delta > 0:
+        # Solo sale lo que queda en los lotes de la referencia: lo vencido ya se
+        # descontó al expirar y lo canjeado ya se usó. Sin lotes (puntos anteriores
+        # a ellos) se descuenta de los lotes vigentes como antes.
+        propios = LotePuntos.objects.select_for_update().filter(movimiento_id__in=ids)
+        if propios.exists():
+            revertidos = min(delta, sum(propios.filter(vigente=True).values_list("disponibles", flat=True)))
+            if revertidos == 0:
+                return 0
+    nuevo_saldo = cliente_locked.puntos_saldo - revertidos
     if nuevo_saldo < 0:
         nuevo_saldo = 0
+    # Salen primero los puntos de los lotes que abrió la referencia
+    consumir_lotes(cliente_locked.pk, cliente_locked.puntos_saldo - nuevo_saldo, ids)
 
     cliente_locked.puntos_saldo = nuevo_saldo
     config = get_config()
-    _actualizar_nivel(cliente_locked, config)
+    actualizar_nivel(cliente_locked, config)
     cliente_locked.save(update_fields=["puntos_saldo", "nivel", "actualizado"])
 
-    HistorialPuntos.objects.create(
+    reversa = HistorialPuntos.objects.create(
         cliente=cliente_locked,
         tipo=HistorialPuntos.Tipo.REVERSA,
         fecha=timezone.now(),
         monto_pesos=Decimal("0.00"),
-        puntos_usados=max(delta, 0),
-        puntos_ganados=abs(delta) if delta < 0 else 0,
+        puntos_usados=max(revertidos, 0),
+        puntos_ganados=abs(revertidos) if revertidos < 0 else 0,
         saldo_resultante=cliente_locked.puntos_saldo,
         referencia=referencia,
         usuario_admin=usuario_admin,
         motivo=motivo,
+        metadata={"no_disponibles": delta - revertidos} if revertidos != delta else {},
+    )
+    if revertidos < 0:
+        _abrir_lote(reversa, config).save()
+    return revertidos
+
+
+# ---------- Vencimiento ----------
+@dataclass
+class ResultadoVencimiento:
+    clientes: int = 0
+    lotes: int = 0
+    puntos: int = 0
+
+
+def clientes_con_vencidos(corte: datetime, limite: int = LOTE_TAMANO) -> list[int]:
+    """Clientes de los primeros ``limite`` lotes vencidos a ``corte`` (índice parcial sobre ``vence``)."""
+    ids = LotePuntos.objects.filter(vigente=True, vence__lte=corte).order_by("vence", "pk")
+    return sorted(set(ids.values_list("cliente_id", flat=True)[:limite]))
+
+
+@transaction.atomic
+def expirar_lotes(cliente_ids: Iterable[int], corte: Optional[datetime] = None) -> ResultadoVencimiento:
+    """
+    Da de baja los lotes vencidos a ``corte`` de esos clientes: descuenta lo que
+    les quedaba del saldo con un único movimiento REVERSA por cliente. Pensado
+    para grupos acotados (ver ``clientes_con_vencidos``), cada uno en su propia
+    transacción corta.
+    """
+    corte = corte or timezone.now()
+    resultado = ResultadoVencimiento()
+    vigente = config_vigente()
+    config, niveles = vigente.config, list(vigente.niveles)
+    clientes = {
+        c.pk: c for c in Cliente.objects.select_for_update().filter(pk__in=list(cliente_ids)).order_by("pk")
+    }
+    por_cliente: Dict[int, list] = {}
+    for lote in (
+        LotePuntos.objects.select_for_update()
+        .filter(cliente_id__in=list(clientes), vigente=True, vence__lte=corte)
+        .only("pk", "cliente_id", "disponibles")
+        .order_by()
+    ):
+        por_cliente.setdefault(lote.cliente_id, []).append(lote)
+
+    ahora = timezone.now()
+    movimientos = []
+    for cliente_id, lotes in por_cliente.items():
+        cliente = clientes[cliente_id]
+        puntos = min(sum(lote.disponibles for lote in lotes), cliente.puntos_saldo)
+        resultado.lotes += len(lotes)
+        if puntos <= 0:
+            continue
+        cliente.puntos_saldo -= puntos
+        actualizar_nivel(cliente, config, niveles=niveles)
+        cliente.actualizado = ahora
+        movimientos.append(
+            HistorialPuntos(
+                cliente=cliente,
+                tipo=HistorialPuntos.Tipo.REVERSA,
+                fecha=ahora,
+                monto_pesos=Decimal("0.00"),
+                puntos_usados=puntos,
+                saldo_resultante=cliente.puntos_saldo,
+                referencia=f"vencimiento:{timezone.localdate(corte):%Y-%m-%d}",
+                motivo="Vencimiento de puntos",
+                metadata={"lotes": [lote.pk for lote in lotes], "corte": corte.isoformat()},
+            )
+        )
+        resultado.clientes += 1
+        resultado.puntos += puntos
+
+    vencidos = [lote.pk for lotes in por_cliente.values() for lote in lotes]
+    for trozo in trozos(vencidos):
+        LotePuntos.objects.filter(pk__in=trozo).update(disponibles=0, vigente=False)
+    HistorialPuntos.objects.bulk_create(movimientos, batch_size=LOTE_TAMANO)
+    Cliente.objects.bulk_update(
+        [m.cliente for m in movimientos], ["puntos_saldo", "nivel", "actualizado"], batch_size=LOTE_TAMANO
     )
-    return delta
+    return resultado
 
 
 def obtener_saldo(cliente: Cliente) -> int:
@@ -0,0 +1,25 @@
+"""
+Señales de fidelización: cualquier cambio en ``ConfigPuntos`` (campos o
+servicios excluidos) invalida la configuración cacheada en los procesos
+(``services.config_vigente``) después del commit.
+"""
+from __future__ import annotations
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import services
+from .models import ConfigPuntos
+
+
+@receiver(post_save, sender=ConfigPuntos, dispatch_uid="fidelizacion_config_save")
+@receiver(post_delete, sender=ConfigPuntos, dispatch_uid="fidelizacion_config_delete")
+def _invalidar_config(sender, **kwargs):
+    transaction.on_commit(services.invalidar_config)
+
+
+@receiver(m2m_changed, sender=ConfigPuntos.exclusiones_servicios.through, dispatch_uid="fidelizacion_config_exclusiones")
+def _invalidar_config_exclusiones(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        transaction.on_commit(services.invalidar_config)
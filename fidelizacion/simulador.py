@@ -0,0 +1,229 @@
+"""
+Simulador de configuraciones de puntos sobre las transacciones históricas.
+
+Carga una vez las transacciones facturables del periodo (subtotal, cliente,
+servicio) y los saldos y niveles de los clientes en arreglos de NumPy, y vuelve
+a aplicar las reglas de ``services.calcular_puntos_detallado`` de forma
+vectorizada para cada configuración candidata:
+
+* puntos base con redondeo ``ROUND_HALF_UP`` (aritmética entera en centavos),
+* multiplicador y bono fijo del nivel que da el saldo del cliente antes de
+  cada compra (o, si ningún umbral alcanza, el nivel guardado con ese nombre),
+* tope por factura y servicios excluidos de la configuración vigente.
+
+Es una proyección desde los saldos actuales: "si el próximo periodo repite la
+actividad de los últimos ``dias``". El nivel depende de los puntos ganados en
+las compras anteriores del mismo cliente, así que el cálculo se repite con los
+saldos acumulados hasta que ningún punto cambia: ese punto fijo es
+exactamente el resultado de otorgar las compras una a una con
+``otorgar_puntos``. No se descuentan canjes ni vencimientos.
+
+Como ``dashboard.forecast``, NumPy solo se importa al simular.
+"""
+from __future__ import annotations
+
+import copy
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from django.db.models import F, IntegerField
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
+
+from clientes.models import Cliente
+from fidelizacion import services
+from fidelizacion.models import ConfigPuntos
+from transacciones.models import Transaccion
+
+DIAS_DEFECTO = 365
+ITERACIONES_MAX = 50
+SIN_NIVEL = "Sin nivel"
+
+
+@dataclass
+class Escenario:
+    nombre: str
+    config: ConfigPuntos
+
+
+@dataclass
+class ResultadoEscenario:
+    nombre: str
+    transacciones: int
+    transacciones_con_puntos: int
+    puntos: int
+    costo_cop: Any
+    pasivo_cop: Any
+    exacto: bool
+    # [{"desde", "hacia", "clientes"}] solo las combinaciones con clientes
+    movimientos: List[Dict[str, Any]] = field(default_factory=list)
+    # {nivel: clientes} antes (configuración vigente) y después (candidata)
+    niveles_antes: Dict[str, int] = field(default_factory=dict)
+    niveles_despues: Dict[str, int] = field(default_factory=dict)
+
+    def como_dict(self) -> Dict[str, Any]:
+        datos = dict(self.__dict__)
+        datos["costo_cop"] = str(self.costo_cop)
+        datos["pasivo_cop"] = str(self.pasivo_cop)
+        return datos
+
+
+class Datos:
+    """Transacciones y clientes del periodo en arreglos, listos para simular varias veces."""
+
+    def __init__(self, dias: int = DIAS_DEFECTO, hasta=None):
+        import numpy as np
+
+        hasta = hasta or timezone.now()
+        # Subtotal en centavos enteros: el redondeo se hace sin error de coma flotante.
+        # Sin ORDER BY: se ordena por cliente y llegada (pk) con NumPy, más barato que en la base.
+        filas = (
+            Transaccion.objects.filter(cita__estado="completada", fecha__gt=hasta - timedelta(days=dias), fecha__lte=hasta)
+            .order_by()
+            .annotate(centavos=Cast(Round(F("subtotal") * 100), IntegerField()))
+            .values_list("cita__cliente_id", "centavos", "cita__servicio_id", "pk")
+        )
+        filas = np.array(list(filas), dtype=np.int64).reshape(-1, 4)
+        filas = filas[np.lexsort((filas[:, 3], filas[:, 0]))]
+        clientes = filas[:, 0]
+        saldos = list(Cliente.objects.order_by("pk").values_list("pk", "puntos_saldo", "nivel"))
+        self.dias = dias
+        self.centavos = filas[:, 1]
+        self.servicio = filas[:, 2]
+
+        pks, saldos, niveles = zip(*saldos) if saldos else ((), (), ())
+        self.cliente_pk = np.array(pks, dtype=np.int64)
+        self.saldo = np.array(saldos, dtype=np.int64)
+        self.nivel_guardado = np.array(niveles, dtype=object)
+        # Índice de cliente de cada transacción y dónde empieza el grupo de cada una
+        self.cliente = np.searchsorted(self.cliente_pk, clientes)
+        nuevo = np.ones(len(self.cliente), dtype=bool)
+        nuevo[1:] = self.cliente[1:] != self.cliente[:-1]
+        self.inicio_grupo = np.maximum.accumulate(np.where(nuevo, np.arange(len(self.cliente)), 0))
+
+    # ---------- Reglas ----------
+    def _niveles(self, config: ConfigPuntos):
+        import numpy as np
+
+        niveles = services.parse_niveles(config)
+        nombres = [n["nombre"] for n in niveles]
+        umbrales = np.array([n["umbral"] for n in niveles], dtype=np.int64)
+        # Multiplicador en diezmilésimas (viene redondeado a 4 decimales)
+        mult = np.array([round(n["multiplicador"] * 10000) for n in niveles], dtype=np.int64)
+        bono = np.array([n["bono_fijo"] for n in niveles], dtype=np.int64)
+        # Respaldo por nombre guardado cuando ningún umbral alcanza (el último con ese nombre)
+        por_nombre = {nombre: i for i, nombre in enumerate(nombres)}
+        respaldo = np.array([por_nombre.get(n, -1) for n in self.nivel_guardado], dtype=np.int64)
+        return nombres, umbrales, mult, bono, respaldo
+
+    @staticmethod
+    def _nivel(saldo, umbrales, respaldo):
+        import numpy as np
+
+        if not len(umbrales):
+            return np.full(len(saldo), -1, dtype=np.int64)
+        indice = np.searchsorted(umbrales, saldo, side="right") - 1
+        return np.where(indice >= 0, indice, respaldo)
+
+    def _puntos_base(self, config: ConfigPuntos, excluidos):
+        """Puntos base por transacción y a cuáles aplica la regla (subtotal > 0, servicio no excluido)."""
+        import numpy as np
+
+        base = int(config.monto_base_cop or 0)
+        por_monto = int(config.puntos_por_monto or 0)
+        aplica = self.centavos > 0
+        if base <= 0 or por_monto <= 0:
+            aplica = np.zeros(len(self.centavos), dtype=bool)
+        if excluidos:
+            aplica &= ~np.isin(self.servicio, list(excluidos))
+        divisor = base * 100 or 1
+        puntos = np.maximum((2 * self.centavos * por_monto + divisor) // (2 * divisor), 0)
+        return np.where(aplica, puntos, 0), aplica
+
+    def simular(self, escenario: Escenario, actual: ConfigPuntos, excluidos=frozenset()) -> ResultadoEscenario:
+        import numpy as np
+
+        config = escenario.config
+        nombres, umbrales, mult, bono, respaldo = self._niveles(config)
+        base, aplica = self._puntos_base(config, excluidos)
+        tope = int(config.puntos_max_por_factura or 0)
+        saldo_inicial = self.saldo[self.cliente]
+        respaldo_tx = respaldo[self.cliente]
+        # Índice -1 (sin nivel): multiplicador 1 y sin bono
+        mult, bono = np.append(mult, 10000), np.append(bono, 0)
+
+        saldo_antes = saldo_inicial
+        sin_otorgar = np.ones(len(base), dtype=bool)
+        exacto = False
+        for _ in range(ITERACIONES_MAX):
+            # El nivel guardado solo cuenta hasta el primer otorgamiento, que lo recalcula
+            nivel = self._nivel(saldo_antes, umbrales, np.where(sin_otorgar, respaldo_tx, -1))
+            puntos = np.maximum((2 * base * mult[nivel] + 10000) // 20000 + bono[nivel], 0)
+            if tope:
+                puntos = np.minimum(puntos, tope)
+            puntos = np.where(aplica, puntos, 0)
+            acumulado = _acumulado_previo(puntos, self.inicio_grupo)
+            otorgados = _acumulado_previo((puntos > 0).astype(np.int64), self.inicio_grupo)
+            siguiente = saldo_inicial + acumulado
+            if np.array_equal(siguiente, saldo_antes) and np.array_equal(otorgados == 0, sin_otorgar):
+                exacto = True
+                break
+            saldo_antes, sin_otorgar = siguiente, otorgados == 0
+
+        total = int(puntos.sum())
+        ganados = np.bincount(self.cliente, weights=puntos, minlength=len(self.saldo)).astype(np.int64)
+        saldo_final = self.saldo + ganados
+
+        # Movimiento de niveles: hoy (configuración vigente) -> al final (candidata)
+        nombres_actual, umbrales_actual, _, _, respaldo_actual = self._niveles(actual)
+        antes = self._nivel(self.saldo, umbrales_actual, respaldo_actual)
+        despues = self._nivel(saldo_final, umbrales, np.where(ganados > 0, -1, respaldo))
+        etiquetas_antes, etiquetas_despues = nombres_actual + [SIN_NIVEL], nombres + [SIN_NIVEL]
+        # El índice -1 (sin nivel) cae en la última fila/columna
+        matriz = np.zeros((len(etiquetas_antes), len(etiquetas_despues)), dtype=np.int64)
+        np.add.at(matriz, (antes, despues), 1)
+        movimientos = [
+            {"desde": etiquetas_antes[a], "hacia": etiquetas_despues[d], "clientes": int(matriz[a, d])}
+            for a, d in zip(*np.nonzero(matriz))
+        ]
+        return ResultadoEscenario(
+            nombre=escenario.nombre,
+            transacciones=len(puntos),
+            transacciones_con_puntos=int((puntos > 0).sum()),
+            puntos=total,
+            costo_cop=services.calcular_redencion_cop(total, config=config),
+            pasivo_cop=services.calcular_redencion_cop(int(saldo_final.sum()), config=config),
+            exacto=exacto,
+            movimientos=movimientos,
+            niveles_antes=_conteo(etiquetas_antes, matriz.sum(axis=1)),
+            niveles_despues=_conteo(etiquetas_despues, matriz.sum(axis=0)),
+        )
+
+
+def _acumulado_previo(valores, inicio_grupo):
+    """Suma de los valores anteriores dentro del mismo cliente (0 en su primera transacción)."""
+    import numpy as np
+
+    acumulado = np.cumsum(valores) - valores
+    return acumulado - acumulado[inicio_grupo] if len(valores) else acumulado
+
+
+def _conteo(etiquetas: List[str], totales) -> Dict[str, int]:
+    return {etiqueta: int(n) for etiqueta, n in zip(etiquetas, totales) if n}
+
+
+def config_candidata(cambios: Optional[Dict[str, Any]] = None) -> ConfigPuntos:
+    """Copia sin guardar de la configuración vigente con ``cambios`` aplicados."""
+    config = copy.copy(services.get_config())
+    for campo, valor in (cambios or {}).items():
+        setattr(config, campo, valor)
+    return config
+
+
+def simular(escenarios: Sequence[Escenario], dias: int = DIAS_DEFECTO) -> List[ResultadoEscenario]:
+    """Simula la configuración vigente ("Actual") y cada escenario sobre los últimos ``dias``."""
+    vigente = services.config_vigente()
+    datos = Datos(dias)
+    actual = Escenario("Actual", vigente.config)
+    return [datos.simular(e, vigente.config, vigente.servicios_excluidos) for e in [actual, *escenarios]]
@@ -8,4 +8,7 @@ urlpatterns = [
     path('clientes/<int:cliente_id>/', views.historial_cliente, name='historial_cliente'),
     path('clientes/<int:cliente_id>/ajustar/', views.ajustar_puntos, name='ajustar_cliente'),
     path('configuracion/', views.configuracion, name='configuracion'),
+    path('conciliacion/', views.conciliacion, name='conciliacion'),
+    path('simulador/', views.simulador, name='simulador'),
+    path('simulador/api/', views.api_simulador, name='api_simulador'),
 ]
@@ -1,14 +1,21 @@
 from __future__ import annotations
 
+import json
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.core.paginator import Paginator
+from django.forms.models import model_to_dict
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
+from django.views.decorators.http import require_POST
 
 from clientes.models import Cliente
+from dashboard.paginacion import PARAMETRO, KeysetPaginator
+from fidelizacion import conciliacion as conciliacion_puntos
 from fidelizacion import services as loyalty
-from fidelizacion.forms import AjustePuntosForm, ConfigPuntosForm
+from fidelizacion import simulador as simulador_puntos
+from fidelizacion.forms import AjustePuntosForm, ConfigPuntosForm, SimulacionForm
 from fidelizacion.models import ConfigPuntos
 
 
@@ -20,8 +27,8 @@ ADMIN_CHECK = lambda u: u.is_superuser or u.is_staff
 def historial_cliente(request, cliente_id: int):
     cliente = get_object_or_404(Cliente, pk=cliente_id)
     movimientos = loyalty.obtener_historial(cliente)
-    paginator = Paginator(movimientos, 25)
-    page_obj = paginator.get_page(request.GET.get('page'))
+    paginator = KeysetPaginator(movimientos, 25)
+    page_obj = paginator.page(request.GET.get(PARAMETRO))
     contexto = {
         'cliente': cliente,
         'page_obj': page_obj,
@@ -74,3 +81,80 @@ def configuracion(request):
     else:
         form = ConfigPuntosForm(instance=config)
     return render(request, 'fidelizacion/configuracion.html', {'form': form})
+
+
+@login_required
+@user_passes_test(ADMIN_CHECK)
+def conciliacion(request):
+    desajustes = conciliacion_puntos.desajustes()
+    if request.method == 'POST':
+        corregidos = conciliacion_puntos.reparar(desajustes, usuario_admin=request.user)
+        messages.success(request, f'{corregidos} saldo(s) corregido(s) según el historial.')
+        return redirect('fidelizacion:conciliacion')
+    contexto = {
+        'desajustes': desajustes[:200],
+        'total': len(desajustes),
+        'diferencia_total': sum(d.diferencia for d in desajustes),
+    }
+    return render(request, 'fidelizacion/conciliacion.html', contexto)
+
+
+def _form_simulacion(cambios=None):
+    """``SimulacionForm`` sobre una copia de la configuración vigente; lo que no venga en ``cambios`` se conserva."""
+    instancia = simulador_puntos.config_candidata()
+    datos = model_to_dict(instancia, fields=SimulacionForm._meta.fields)
+    datos['dias'] = simulador_puntos.DIAS_DEFECTO
+    datos.update(cambios or {})
+    if not isinstance(datos.get('niveles_config'), str):
+        datos['niveles_config'] = json.dumps(datos.get('niveles_config') or {})
+    return SimulacionForm(datos, instance=instancia)
+
+
+@login_required
+@user_passes_test(ADMIN_CHECK)
+def simulador(request):
+    resultados = None
+    if request.method == 'POST':
+        form = _form_simulacion(request.POST.dict())
+        if form.is_valid():
+            propuesta = simulador_puntos.Escenario('Propuesta', form.instance)
+            resultados = simulador_puntos.simular([propuesta], dias=form.cleaned_data['dias'])
+    else:
+        form = SimulacionForm(
+            instance=simulador_puntos.config_candidata(), initial={'dias': simulador_puntos.DIAS_DEFECTO}
+        )
+    return render(request, 'fidelizacion/simulador.html', {'form': form, 'resultados': resultados})
+
+
+@login_required
+@user_passes_test(ADMIN_CHECK)
+@require_POST
+def api_simulador(request):
+    """
+    Simula escenarios enviados como JSON:
+    ``{"dias": 365, "escenarios": [{"nombre": "...", "puntos_por_monto": 2, "niveles_config": {...}}, ...]}``.
+    Responde la configuración vigente ("Actual") y cada escenario.
+    """
+    try:
+        datos = json.loads(request.body or b'{}')
+        pedidos = list(datos.get('escenarios') or [])
+        dias = int(datos.get('dias') or simulador_puntos.DIAS_DEFECTO)
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': 'Se esperaba un JSON con "escenarios" (lista) y "dias".'}, status=400)
+    if not 1 <= dias <= 3650:
+        return JsonResponse({'error': '"dias" debe estar entre 1 y 3650.'}, status=400)
+    escenarios, errores = [], {}
+    for indice, pedido in enumerate(pedidos, start=1):
+        if not isinstance(pedido, dict):
+            errores[f'escenario {indice}'] = 'Debe ser un objeto.'
+            continue
+        nombre = str(pedido.pop('nombre', '') or f'Escenario {indice}')
+        form = _form_simulacion({**pedido, 'dias': dias})
+        if form.is_valid():
+            escenarios.append(simulador_puntos.Escenario(nombre, form.instance))
+        else:
+            errores[nombre] = form.errors.get_json_data()
+    if errores:
+        return JsonResponse({'error': 'Escenarios inválidos.', 'detalle': errores}, status=400)
+    resultados = simulador_puntos.simular(escenarios, dias=dias)
+    return JsonResponse({'dias': dias, 'resultados': [r.como_dict() for r in resultados]})
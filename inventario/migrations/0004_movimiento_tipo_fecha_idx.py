@@ -0,0 +1,17 @@
+# Generated by Django 4.2.24 on 2026-10-17 00:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0003_movimientoinventario'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['tipo', 'fecha'], name='movinv_tipo_fecha_idx'),
+        ),
+    ]
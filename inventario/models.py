@@ -113,6 +113,7 @@ class MovimientoInventario(models.Model):
 
     class Meta:
         ordering = ["-fecha"]
+        indexes = [models.Index(fields=["tipo", "fecha"], name="movinv_tipo_fecha_idx")]
         verbose_name = "Movimiento de inventario"
         verbose_name_plural = "Movimientos de inventario"
 
@@ -13,7 +13,6 @@ from django.db.models import (
     DecimalField,
     ExpressionWrapper,
     F,
-    Q,
     Sum,
     Value,
     When,
@@ -31,6 +30,9 @@ from django.views.generic import (
     UpdateView,
 )
 
+from dashboard import busqueda
+from dashboard.paginacion import PaginacionKeysetMixin
+
 from .forms import MovimientoInventarioForm, RepuestoForm
 from .models import CategoriaRepuesto, MovimientoInventario, Repuesto
 from .utils import tabla_existe
@@ -63,10 +65,11 @@ def _annotate_metricas(queryset):
     )
 
 
-class InventarioListView(LoginRequiredMixin, ListView):
+class InventarioListView(LoginRequiredMixin, PaginacionKeysetMixin, ListView):
     model = Repuesto
     template_name = "inventario/list.html"
     context_object_name = "repuestos"
+    paginate_by = 25
 
     inventario_migrado: bool = True
     mensaje_bd: str = ""
@@ -97,12 +100,7 @@ class InventarioListView(LoginRequiredMixin, ListView):
         order = (self.request.GET.get("o") or "").strip()
 
         if search_query:
-            queryset = queryset.filter(
-                Q(nombre__icontains=search_query)
-                | Q(codigo__icontains=search_query)
-                | Q(descripcion__icontains=search_query)
-                | Q(proveedor__icontains=search_query)
-            )
+            queryset = busqueda.filtrar(queryset, search_query)
 
         if categoria:
             queryset = queryset.filter(categoria=categoria)
@@ -134,7 +132,9 @@ class InventarioListView(LoginRequiredMixin, ListView):
             "valor": "valor_inventario_calc",
             "-valor": "-valor_inventario_calc",
         }
-        return queryset.order_by(order_map.get(order, "nombre"))
+        if order in order_map:
+            return queryset.order_by(order_map[order])
+        return busqueda.por_relevancia(queryset, "nombre")
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
@@ -146,6 +146,7 @@ class InventarioListView(LoginRequiredMixin, ListView):
 
         params = self.request.GET.copy()
         params.pop("page", None)
+        params.pop("cursor", None)
 
         stats_qs = self.object_list
         stats = stats_qs.aggregate(
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.24 on 2026-10-17 00:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicios', '0002_servicio_costo_alter_servicio_duracion_minutos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicio',
+            name='citas_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Citas'),
+        ),
+        migrations.AddField(
+            model_name='servicio',
+            name='ultima_cita',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Última cita'),
+        ),
+    ]
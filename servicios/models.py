@@ -7,8 +7,10 @@ from decimal import Decimal
 
 from django.db import models
 
+from citas.contadores_modelo import ContadoresMixin
 
-class Servicio(models.Model):
+
+class Servicio(ContadoresMixin, models.Model):
     """Represents a service offered by the workshop."""
 
     nombre = models.CharField(max_length=100)
@@ -17,6 +19,9 @@ class Servicio(models.Model):
     costo = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text='Costo interno estimado')
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     activo = models.BooleanField(default=True)
+    # Actividad desnormalizada (citas.contadores; ``python manage.py recount`` la repara)
+    citas_count = models.PositiveIntegerField('Citas', default=0, editable=False)
+    ultima_cita = models.DateTimeField('Última cita', blank=True, null=True, editable=False)
     creado = models.DateTimeField(auto_now_add=True)
     actualizado = models.DateTimeField(auto_now=True)
 
@@ -28,6 +33,8 @@ class Servicio(models.Model):
     def __str__(self) -> str:
         return self.nombre
 
+    CONTADORES = ('citas_count', 'ultima_cita')
+
     @property
     def margen_bruto(self) -> Decimal:
         precio = self.precio or Decimal('0')
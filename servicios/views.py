@@ -9,6 +9,8 @@ from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView
 
+from dashboard import rentabilidad
+
 from .forms import ServicioForm
 from .models import Servicio
 
@@ -33,7 +35,6 @@ class ServicioListView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         queryset = Servicio.objects.annotate(
-            citas_count=Count("citas", distinct=True),
             margen=ExpressionWrapper(
                 F("precio") - F("costo"),
                 output_field=DecimalField(max_digits=10, decimal_places=2),
@@ -66,6 +67,8 @@ class ServicioListView(LoginRequiredMixin, ListView):
             "-costo",
             "margen",
             "-margen",
+            "citas_count",
+            "-citas_count",
         }
         queryset = queryset.order_by(order if order in allowed_orders else "nombre")
         return queryset
@@ -150,6 +153,18 @@ class ServicioDetailView(LoginRequiredMixin, DetailView):
             .annotate(total=Count("id"))
             .order_by("-total")[:5]
         )
+        # Rentabilidad de los últimos 12 meses con precio/costo vigentes en cada cita
+        meses = list(
+            rentabilidad.agrupar(rentabilidad.consulta(servicio_id=self.object.pk), "mes")
+            .order_by("-mes")[:12]
+        )
+        context["rentabilidad_mensual"] = meses
+        context["rentabilidad_desde"] = meses[-1]["mes"] if meses else None
+        context["rentabilidad_total"] = {
+            "citas": sum(m["n"] or 0 for m in meses),
+            "ingresos": sum(m["ingresos_total"] or 0 for m in meses),
+            "margen": sum(m["margen_total"] or 0 for m in meses),
+        }
         return context
 
 
@@ -0,0 +1,130 @@
+/**
+ * Exportaciones en segundo plano.
+ *
+ * Un enlace con data-export-job="<tipo>" encola la exportación en vez de
+ * descargarla directamente: el querystring se toma de data-export-query o,
+ * si no existe, del propio href (que sigue sirviendo de descarga directa sin
+ * JavaScript).  Mientras el worker (python manage.py run_export_worker)
+ * trabaja, el botón muestra el avance y la ETA; al terminar se descarga el
+ * archivo.
+ *
+ * También expone window.Exportaciones.iniciar(tipo, consulta, boton) para
+ * botones que arman su consulta en JavaScript (dashboard).
+ */
+(function () {
+  const script = document.currentScript;
+  const endpoint = script ? script.dataset.endpoint : null;
+  const POLL_MS = 1500;
+
+  const getCookie = (name) => {
+    const match = document.cookie.match(new RegExp('(?:^|; )' + name + '=([^;]*)'));
+    return match ? decodeURIComponent(match[1]) : '';
+  };
+
+  const formatoEta = (segundos) => {
+    if (segundos == null) return '';
+    if (segundos < 60) return ` · ~${Math.ceil(segundos)} s`;
+    return ` · ~${Math.ceil(segundos / 60)} min`;
+  };
+
+  const textoAvance = (estado) => {
+    if (estado.estado === 'pendiente') return 'En cola…';
+    if (estado.progreso == null) return 'Exportando…';
+    const pct = Math.floor(estado.progreso * 100);
+    return `Exportando ${pct}% (${estado.filas_escritas}/${estado.filas_total})${formatoEta(estado.eta_segundos)}`;
+  };
+
+  const avisar = (mensaje) => {
+    const contenedor = document.getElementById('appToastContainer');
+    if (!contenedor || !window.bootstrap || typeof window.bootstrap.Toast !== 'function') {
+      window.alert(mensaje);
+      return;
+    }
+    const toastEl = document.createElement('div');
+    toastEl.className = 'toast align-items-center text-bg-danger border-0 shadow-sm';
+    toastEl.setAttribute('role', 'status');
+    const wrapper = document.createElement('div');
+    wrapper.className = 'd-flex';
+    const bodyEl = document.createElement('div');
+    bodyEl.className = 'toast-body';
+    bodyEl.textContent = mensaje;
+    const closeBtn = document.createElement('button');
+    closeBtn.type = 'button';
+    closeBtn.className = 'btn-close btn-close-white me-2 m-auto';
+    closeBtn.setAttribute('data-bs-dismiss', 'toast');
+    closeBtn.setAttribute('aria-label', 'Cerrar');
+    wrapper.append(bodyEl, closeBtn);
+    toastEl.appendChild(wrapper);
+    contenedor.appendChild(toastEl);
+    toastEl.addEventListener('hidden.bs.toast', () => toastEl.remove());
+    new window.bootstrap.Toast(toastEl, { delay: 6000 }).show();
+  };
+
+  function iniciar(tipo, consulta, boton) {
+    if (!endpoint || !window.axios) return Promise.resolve(null);
+    if (boton && boton.dataset.exportando === '1') return Promise.resolve(null);
+
+    const original = boton ? boton.innerHTML : '';
+    const mostrar = (texto) => {
+      if (boton) boton.textContent = texto;
+    };
+    const restaurar = () => {
+      if (!boton) return;
+      boton.innerHTML = original;
+      boton.classList.remove('disabled');
+      delete boton.dataset.exportando;
+    };
+    if (boton) {
+      boton.dataset.exportando = '1';
+      boton.classList.add('disabled');
+    }
+    mostrar('En cola…');
+
+    const datos = new URLSearchParams();
+    datos.append('tipo', tipo);
+    datos.append('consulta', consulta || '');
+
+    return window.axios
+      .post(endpoint, datos, { headers: { 'X-CSRFToken': getCookie('csrftoken') } })
+      .then(({ data }) => new Promise((resolve, reject) => {
+        const consultar = () => {
+          window.axios.get(data.estado_url).then(({ data: estado }) => {
+            if (estado.estado === 'completado') {
+              resolve(estado);
+            } else if (estado.estado === 'fallido') {
+              reject(new Error(estado.error || 'La exportación falló.'));
+            } else {
+              mostrar(textoAvance(estado));
+              setTimeout(consultar, POLL_MS);
+            }
+          }).catch(reject);
+        };
+        consultar();
+      }))
+      .then((estado) => {
+        restaurar();
+        window.location.href = estado.descarga_url;
+        return estado;
+      })
+      .catch((err) => {
+        restaurar();
+        const detalle = err.response && err.response.data && err.response.data.error;
+        avisar(`No se pudo exportar: ${detalle || err.message}`);
+        return null;
+      });
+  }
+
+  document.addEventListener('click', (ev) => {
+    const enlace = ev.target.closest('[data-export-job]');
+    if (!enlace || !endpoint) return;
+    ev.preventDefault();
+    let consulta = enlace.dataset.exportQuery;
+    if (consulta == null) {
+      const href = enlace.getAttribute('href') || '';
+      consulta = href.includes('?') ? href.slice(href.indexOf('?') + 1) : '';
+    }
+    iniciar(enlace.dataset.exportJob, consulta, enlace);
+  });
+
+  window.Exportaciones = { iniciar };
+})();
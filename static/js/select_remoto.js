@@ -0,0 +1,154 @@
+/**
+ * Selects con búsqueda remota (dashboard.widgets.SelectRemoto).
+ *
+ * Cada <select data-select-remoto="<url>"> trae solo la opción elegida; se le
+ * antepone un campo de búsqueda que consulta <url>?q=<texto> (más los campos
+ * de data-parametros="param:id_campo,...") y muestra los resultados en una
+ * lista. Elegir uno agrega la opción al select, la selecciona y dispara
+ * "change", así que el resto del formulario reacciona como con un select normal.
+ */
+(function () {
+  const ESPERA_MS = 250;
+
+  const iniciar = (select) => {
+    if (select.dataset.selectRemotoListo) return;
+    select.dataset.selectRemotoListo = "1";
+    const url = select.dataset.selectRemoto;
+    const minimo = Number(select.dataset.minimo || 1);
+    const parametros = (select.dataset.parametros || "")
+      .split(",")
+      .filter(Boolean)
+      .map((par) => par.split(":"));
+
+    const contenedor = document.createElement("div");
+    contenedor.className = "position-relative mb-1";
+    const buscador = document.createElement("input");
+    buscador.type = "search";
+    buscador.autocomplete = "off";
+    buscador.className = "form-control form-control-sm";
+    buscador.placeholder = select.dataset.placeholder || "Buscar…";
+    buscador.setAttribute("aria-label", buscador.placeholder);
+    const lista = document.createElement("div");
+    lista.className = "list-group position-absolute w-100 shadow-sm d-none";
+    lista.style.zIndex = 1050;
+    lista.style.maxHeight = "18rem";
+    lista.style.overflowY = "auto";
+    contenedor.append(buscador, lista);
+    select.parentNode.insertBefore(contenedor, select);
+
+    let temporizador = null;
+    let controlador = null;
+    let activo = -1;
+
+    const cerrar = () => {
+      lista.classList.add("d-none");
+      lista.innerHTML = "";
+      activo = -1;
+    };
+
+    const elegir = (item) => {
+      let opcion = Array.from(select.options).find((o) => o.value === String(item.id));
+      if (!opcion) {
+        opcion = new Option(item.text, item.id);
+        select.appendChild(opcion);
+      }
+      select.value = String(item.id);
+      select.dispatchEvent(new Event("change", { bubbles: true }));
+      buscador.value = "";
+      cerrar();
+    };
+
+    const marcar = (indice) => {
+      const items = lista.querySelectorAll(".list-group-item-action");
+      items.forEach((el, i) => el.classList.toggle("active", i === indice));
+      activo = indice;
+      if (items[indice]) items[indice].scrollIntoView({ block: "nearest" });
+    };
+
+    const mostrar = (resultados) => {
+      lista.innerHTML = "";
+      activo = -1;
+      if (!resultados.length) {
+        const vacio = document.createElement("div");
+        vacio.className = "list-group-item small text-muted";
+        vacio.textContent = "Sin resultados";
+        lista.appendChild(vacio);
+      }
+      resultados.forEach((item) => {
+        const boton = document.createElement("button");
+        boton.type = "button";
+        boton.className = "list-group-item list-group-item-action small";
+        boton.textContent = item.text;
+        boton.addEventListener("mousedown", (ev) => {
+          ev.preventDefault();
+          elegir(item);
+        });
+        boton._item = item;
+        lista.appendChild(boton);
+      });
+      lista.classList.remove("d-none");
+    };
+
+    const buscar = async () => {
+      const texto = buscador.value.trim();
+      if (texto.length < minimo) {
+        cerrar();
+        return;
+      }
+      const consulta = new URLSearchParams({ q: texto });
+      parametros.forEach(([param, id]) => {
+        const campo = document.getElementById(id);
+        if (campo && campo.value) consulta.set(param, campo.value);
+      });
+      if (controlador) controlador.abort();
+      controlador = new AbortController();
+      try {
+        const r = await fetch(`${url}?${consulta}`, {
+          headers: { "X-Requested-With": "fetch" },
+          signal: controlador.signal,
+        });
+        const data = await r.json();
+        mostrar(data.results || []);
+      } catch (e) {
+        if (e.name !== "AbortError") cerrar();
+      }
+    };
+
+    buscador.addEventListener("input", () => {
+      clearTimeout(temporizador);
+      temporizador = setTimeout(buscar, ESPERA_MS);
+    });
+    buscador.addEventListener("keydown", (ev) => {
+      const items = lista.querySelectorAll(".list-group-item-action");
+      if (ev.key === "ArrowDown" && items.length) {
+        ev.preventDefault();
+        marcar(Math.min(activo + 1, items.length - 1));
+      } else if (ev.key === "ArrowUp" && items.length) {
+        ev.preventDefault();
+        marcar(Math.max(activo - 1, 0));
+      } else if (ev.key === "Enter") {
+        if (items[activo]) {
+          ev.preventDefault();
+          elegir(items[activo]._item);
+        }
+      } else if (ev.key === "Escape") {
+        cerrar();
+      }
+    });
+    buscador.addEventListener("blur", () => setTimeout(cerrar, 150));
+    if (minimo === 0) {
+      // Sin mínimo: al entrar se ofrecen las opciones por defecto del endpoint
+      buscador.addEventListener("focus", () => {
+        if (lista.classList.contains("d-none")) buscar();
+      });
+    }
+  };
+
+  const iniciarTodos = () => document.querySelectorAll("select[data-select-remoto]").forEach(iniciar);
+  if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", iniciarTodos);
+  } else {
+    iniciarTodos();
+  }
+  window.SelectRemoto = { iniciar };
+})();
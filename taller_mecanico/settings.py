@@ -84,13 +84,39 @@ WSGI_APPLICATION = 'taller_mecanico.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES: dict[str, dict[str, str]] = {
+DATABASES: dict[str, dict[str, object]] = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file (not in-memory) test database, so the concurrency tests in
+        # citas/tests.py get one real connection per thread.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The 'dashboard' alias stores the versioned panel cache (see dashboard/cache.py).
+# LocMemCache is per process: when running several workers point it to a shared
+# backend (Redis, Memcached, database) through the environment variables below.
+# With a per-process backend, invalidations made by other workers or by
+# management commands are not seen, so panels, their generation keys and the
+# loyalty configuration version only live DASHBOARD_CACHE_TTL_LOCAL seconds
+# (that is how stale they can get); `manage.py check` warns (dashboard.W001)
+# when DEBUG is off.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'dashboard': {
+        'BACKEND': os.environ.get('DASHBOARD_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DASHBOARD_CACHE_LOCATION', 'dashboard'),
+        'TIMEOUT': int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', '3600')),
+    },
+}
+DASHBOARD_CACHE_TTL_LOCAL = int(os.environ.get('DASHBOARD_CACHE_TTL_LOCAL', '60'))
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -131,6 +157,11 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# User-generated files (background exports are written under MEDIA_ROOT/exports).
+# Downloads go through an authenticated view, so MEDIA_URL is not served publicly.
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Authentication settings
 # These values control where Django redirects users after login and logout,
 # and the URL where the login page can be found.  When adding new views
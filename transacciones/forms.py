@@ -4,10 +4,42 @@ Forms for transacciones app.
 from __future__ import annotations
 
 from django import forms
+from django.db.models import Exists, OuterRef
+from django.urls import reverse_lazy
+from django.utils import timezone
 
+from citas.models import Cita
+from dashboard.widgets import SelectRemoto
 from fidelizacion import services as loyalty
 from .models import Transaccion
 
+# Citas que se pueden facturar: terminadas o en curso y sin transacción registrada
+ESTADOS_FACTURABLES = ("completada", "en_proceso")
+# Columnas de la etiqueta del selector de citas (ver ``etiqueta_cita``)
+CAMPOS_SELECTOR = ("titulo", "fecha_inicio", "cliente__nombre", "vehiculo__placa", "servicio__nombre")
+
+
+def citas_facturables(queryset=None):
+    queryset = Cita.objects.all() if queryset is None else queryset
+    return queryset.filter(estado__in=ESTADOS_FACTURABLES).exclude(
+        Exists(Transaccion.objects.filter(cita=OuterRef("pk")))
+    )
+
+
+def etiqueta_cita(valores: dict) -> str:
+    """"Título - cliente · placa · servicio (fecha)" a partir de ``CAMPOS_SELECTOR``."""
+    partes = [valores.get(c) for c in ("cliente__nombre", "vehiculo__placa", "servicio__nombre")]
+    detalle = " · ".join(str(p) for p in partes if p)
+    inicio = valores.get("fecha_inicio")
+    fecha = f" ({timezone.localtime(inicio):%Y-%m-%d %H:%M})" if inicio else ""
+    return f"{valores.get('titulo') or 'Cita'} - {detalle}{fecha}"
+
+
+def _valor(obj, campo: str):
+    for parte in campo.split("__"):
+        obj = getattr(obj, parte, None) if obj is not None else None
+    return obj
+
 
 class TransaccionForm(forms.ModelForm):
     """Formulario para registrar una transacción y gestionar puntos de fidelización."""
@@ -24,7 +56,13 @@ class TransaccionForm(forms.ModelForm):
         model = Transaccion
         fields = ["cita", "subtotal", "monto", "metodo_pago"]
         widgets = {
-            "cita": forms.Select(attrs={"class": "form-select"}),
+            # Solo se renderiza la cita elegida; el resto se busca (transacciones:api_citas)
+            "cita": SelectRemoto(
+                reverse_lazy("transacciones:api_citas"),
+                attrs={"class": "form-select"},
+                placeholder="Buscar cita por cliente, placa o servicio…",
+                minimo=0,
+            ),
             "subtotal": forms.NumberInput(attrs={"class": "form-control", "min": "0", "step": "0.01"}),
             "monto": forms.NumberInput(attrs={"class": "form-control", "min": "0", "step": "0.01"}),
             "metodo_pago": forms.Select(attrs={"class": "form-select"}),
@@ -33,12 +71,15 @@ class TransaccionForm(forms.ModelForm):
     def __init__(self, *args, request=None, **kwargs):
         self.request = request
         super().__init__(*args, **kwargs)
+        self.fields["cita"].queryset = Cita.objects.select_related("cliente", "vehiculo", "servicio")
+        self.fields["cita"].label_from_instance = lambda c: etiqueta_cita(
+            {campo: _valor(c, campo) for campo in CAMPOS_SELECTOR}
+        )
         self.cliente = None
         self.available_points = 0
         self.config = loyalty.get_config()
         cita = self.initial.get("cita") or self.data.get("cita")
         if cita:
-            from citas.models import Cita  # import local to avoid circular
             try:
                 self.cliente = Cita.objects.select_related("cliente").get(pk=cita).cliente
             except Cita.DoesNotExist:
@@ -13,4 +13,5 @@ app_name = 'transacciones'
 urlpatterns = [
     path('', views.lista_transacciones, name='list'),
     path('nueva/', views.crear_transaccion, name='create'),
+    path('api/citas/', views.api_citas, name='api_citas'),
 ]
\ No newline at end of file
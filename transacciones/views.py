@@ -6,11 +6,15 @@ from decimal import Decimal, InvalidOperation
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.db import transaction
+from django.db.models import Q
+from django.http import JsonResponse
 from django.shortcuts import redirect, render
 
+from citas.models import Cita
+from dashboard import busqueda
 from fidelizacion import services as loyalty
 from fidelizacion.models import HistorialPuntos
-from .forms import TransaccionForm
+from .forms import CAMPOS_SELECTOR, ESTADOS_FACTURABLES, TransaccionForm, citas_facturables, etiqueta_cita
 from .models import Transaccion
 
 
@@ -27,6 +31,30 @@ def lista_transacciones(request):
     return render(request, "transacciones/list.html", {"transacciones": transacciones})
 
 
+@login_required
+@user_passes_test(ADMIN_CHECK)
+def api_citas(request):
+    """
+    Citas para el selector del formulario: por defecto solo las facturables
+    (``todas=1`` busca en todas), filtradas por ``q`` y las más recientes primero.
+    """
+    citas = Cita.objects.order_by("-fecha_inicio")
+    partes = ()
+    if request.GET.get("todas") != "1":
+        citas = citas_facturables(citas)
+        # Una consulta por estado sobre el índice (estado, fecha_inicio), sin ordenar todo
+        partes = [Q(estado=estado) for estado in ESTADOS_FACTURABLES]
+    resultados = busqueda.sugerencias(
+        citas,
+        request.GET.get("q") or "",
+        CAMPOS_SELECTOR,
+        etiqueta_cita,
+        depende_de=(Transaccion,),
+        partes=partes,
+    )
+    return JsonResponse({"results": resultados})
+
+
 @login_required
 @user_passes_test(ADMIN_CHECK)
 def crear_transaccion(request):
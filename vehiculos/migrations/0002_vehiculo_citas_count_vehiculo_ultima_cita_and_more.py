@@ -0,0 +1,31 @@
+# Generated by Django 4.2.24 on 2026-10-17 00:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehiculos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehiculo',
+            name='citas_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Citas'),
+        ),
+        migrations.AddField(
+            model_name='vehiculo',
+            name='ultima_cita',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Última cita'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiculo',
+            index=models.Index(fields=['citas_count'], name='vehiculos_v_citas_c_794b92_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiculo',
+            index=models.Index(fields=['ultima_cita'], name='vehiculos_v_ultima__579433_idx'),
+        ),
+    ]
@@ -8,8 +8,10 @@ from __future__ import annotations
 
 from django.db import models
 
+from citas.contadores_modelo import ContadoresMixin
 
-class Vehiculo(models.Model):
+
+class Vehiculo(ContadoresMixin, models.Model):
     """Represents a vehicle associated to a client."""
 
     cliente = models.ForeignKey('clientes.Cliente', on_delete=models.CASCADE, related_name='vehiculos')
@@ -18,6 +20,9 @@ class Vehiculo(models.Model):
     anio = models.PositiveIntegerField(verbose_name='Año')
     placa = models.CharField(max_length=10, unique=True)
     color = models.CharField(max_length=30, blank=True)
+    # Actividad desnormalizada (citas.contadores; ``python manage.py recount`` la repara)
+    citas_count = models.PositiveIntegerField('Citas', default=0, editable=False)
+    ultima_cita = models.DateTimeField('Última cita', blank=True, null=True, editable=False)
     creado = models.DateTimeField(auto_now_add=True)
     actualizado = models.DateTimeField(auto_now=True)
 
@@ -25,6 +30,12 @@ class Vehiculo(models.Model):
         verbose_name = 'vehículo'
         verbose_name_plural = 'vehículos'
         ordering = ['placa']
+        indexes = [
+            models.Index(fields=['citas_count']),
+            models.Index(fields=['ultima_cita']),
+        ]
 
     def __str__(self) -> str:
-        return f"{self.placa} ({self.marca} {self.modelo})"
\ No newline at end of file
+        return f"{self.placa} ({self.marca} {self.modelo})"
+
+    CONTADORES = ('citas_count', 'ultima_cita')
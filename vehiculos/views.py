@@ -5,11 +5,12 @@ from typing import Any
 
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Count, Q
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView
 
 from clientes.models import Cliente
+from dashboard import busqueda
+from dashboard.paginacion import PaginacionKeysetMixin
 
 from .forms import VehiculoForm
 from .models import Vehiculo
@@ -25,7 +26,7 @@ class StaffOrAdminRequiredMixin(UserPassesTestMixin):
         return bool(user and (user.is_superuser or user.is_staff))
 
 
-class VehiculoListView(LoginRequiredMixin, ListView):
+class VehiculoListView(LoginRequiredMixin, PaginacionKeysetMixin, ListView):
     """List the vehicles in the system, optionally filtered by querystring."""
 
     model = Vehiculo
@@ -34,10 +35,7 @@ class VehiculoListView(LoginRequiredMixin, ListView):
     paginate_by = 20
 
     def get_queryset(self):
-        queryset = (
-            Vehiculo.objects.select_related("cliente")
-            .annotate(citas_count=Count("citas"))
-        )
+        queryset = Vehiculo.objects.select_related("cliente")
 
         cliente_id = (self.request.GET.get("cliente") or "").strip()
         if cliente_id.isdigit():
@@ -45,12 +43,7 @@ class VehiculoListView(LoginRequiredMixin, ListView):
 
         search = (self.request.GET.get("q") or "").strip()
         if search:
-            queryset = queryset.filter(
-                Q(placa__icontains=search)
-                | Q(marca__icontains=search)
-                | Q(modelo__icontains=search)
-                | Q(cliente__nombre__icontains=search)
-            )
+            queryset = busqueda.filtrar(queryset, search)
 
         order = (self.request.GET.get("o") or "").strip()
         allowed_orders = {
@@ -64,8 +57,15 @@ class VehiculoListView(LoginRequiredMixin, ListView):
             "-anio",
             "creado",
             "-creado",
+            "citas_count",
+            "-citas_count",
+            "ultima_cita",
+            "-ultima_cita",
         }
-        queryset = queryset.order_by(order if order in allowed_orders else "placa")
+        if order in allowed_orders:
+            queryset = queryset.order_by(order)
+        else:
+            queryset = busqueda.por_relevancia(queryset, "placa")
         return queryset
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
@@ -82,6 +82,7 @@ class VehiculoListView(LoginRequiredMixin, ListView):
         context["clientes_options"] = Cliente.objects.order_by("nombre").values("id", "nombre")
         params = self.request.GET.copy()
         params.pop("page", None)
+        params.pop("cursor", None)
         context["query_string"] = params.urlencode()
         context["summary"] = {
             "filtered": self.object_list.count(),